@@ -0,0 +1,574 @@
+"""
+Asyncio JengaAPI Client
+
+:class:`AsyncJengaAPI` has the same endpoint methods as
+:class:`equity_jenga.api.auth.JengaAPI` but each of them returns a coroutine.
+Requests are sent over a shared :mod:`aiohttp` connection pool and request
+signing runs in an executor so it never blocks the event loop. The iterators
+are asynchronous, :meth:`AsyncJengaAPI.sign_batch` returns a coroutine and
+the background token refresh runs as a task.
+
+Requires the ``aiohttp`` extra:
+
+.. code-block:: console
+
+    $ pip install equity-jenga-api[async]
+
+**Example**
+
+.. code-block:: python
+
+    import asyncio
+    from equity_jenga.api.aio import AsyncJengaAPI
+
+    async def main():
+        async with AsyncJengaAPI(
+            api_key="Basic TofFGUeU9y448idLCKVAe35LmAtLU9y448idLCKVAe35LmAtL",
+            password="TofFGUeU9y448idLCKVAe35LmAtL",
+            merchant_code="4144142283",
+            env="sandbox",
+        ) as jengaApi:
+            balances = await asyncio.gather(
+                jengaApi.get_account_available_balance("KE", "0011547896523"),
+                jengaApi.get_forex_rates("KE", "USD"),
+            )
+
+    asyncio.run(main())
+"""
+
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from . import helpers
+from .auth import JengaAPI, _PENDING, _cut_short, _settle
+from .cache import AsyncCoalescingCache
+from .deadline import deadline, request_timeout, current as current_deadline
+from .exceptions import (
+    handle_response,
+    generate_reference,
+    error_code,
+    DeadlineExceeded,
+    ENDPOINT_PRODUCTS,
+)
+from .hooks import CallEvent, emit
+from .pagination import aiter_pages
+from .statement import aiter_statement
+
+
+class AsyncResponse:
+    """A fully read response from :class:`AsyncTransport`."""
+
+    def __init__(self, status_code, headers, content):
+        """Create AsyncResponse object."""
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    def json(self):
+        """Decode the response body."""
+        return json.loads(self.content)
+
+
+class AsyncTransport:
+    """
+    Non-blocking HTTP transport over a shared :class:`aiohttp.ClientSession`.
+
+    **Params**
+
+    :limit:: maximum number of simultaneous connections
+    :limit_per_host:: maximum number of simultaneous connections per host,
+        ``0`` means no per host limit
+    :session:: an existing :class:`aiohttp.ClientSession` to use
+    """
+
+    def __init__(self, limit=100, limit_per_host=0, session=None):
+        """Create AsyncTransport object."""
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.session = session
+
+    def _session(self):
+        if self.session is None or self.session.closed:
+            import aiohttp
+
+            connector = aiohttp.TCPConnector(
+                limit=self.limit, limit_per_host=self.limit_per_host
+            )
+            self.session = aiohttp.ClientSession(connector=connector)
+        return self.session
+
+    async def request(self, method, url, timeout=None, **kwargs):
+        """
+        Send a request and return an :class:`AsyncResponse`.
+
+        :timeout:: seconds or a ``(connect, read)`` tuple as taken by
+            :mod:`requests`, or an :class:`aiohttp.ClientTimeout`
+        """
+        if timeout is not None and not hasattr(timeout, "sock_read"):
+            import aiohttp
+
+            if isinstance(timeout, tuple):
+                connect, read = timeout
+                timeout = aiohttp.ClientTimeout(sock_connect=connect, sock_read=read)
+            else:
+                timeout = aiohttp.ClientTimeout(total=timeout)
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+        async with self._session().request(method, url, **kwargs) as response:
+            content = await response.read()
+            return AsyncResponse(response.status, response.headers, content)
+
+    async def get(self, url, **kwargs):
+        """Send a GET request."""
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url, **kwargs):
+        """Send a POST request."""
+        return await self.request("POST", url, **kwargs)
+
+    async def close(self):
+        """Close the underlying session and its connections."""
+        if self.session is not None:
+            await self.session.close()
+
+
+class AsyncJengaAPI(JengaAPI):
+    """
+    Asyncio Jenga API Client
+
+    Takes the same parameters as :class:`equity_jenga.api.auth.JengaAPI`.
+
+    **Params**
+
+    :transport:: defaults to an :class:`AsyncTransport`
+    :executor:: a :class:`concurrent.futures.Executor` used for request
+        signing, defaults to the event loop's default executor
+    :balance_ttl:: cache :meth:`get_account_available_balance` results in
+        an :class:`equity_jenga.api.cache.AsyncCoalescingCache`
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        password: str,
+        merchant_code: str,
+        env="sandbox",
+        private_key=os.path.expanduser("~") + "/.JengaApi/keys/privatekey.pem",
+        sandbox_url="https://sandbox.jengahq.io",
+        live_url="https://api.jengahq.io",
+        transport=None,
+        executor=None,
+        refresh_margin=60,
+        background_refresh=False,
+        token_store=None,
+        balance_ttl=None,
+        balance_stale_ttl=0,
+        retry=None,
+        limits=None,
+        breakers=None,
+        timeout=(3.05, 30),
+        call_timeout=None,
+        serializer=None,
+        signing_pool=None,
+        crypto_backend=None,
+    ):
+        """ """
+        super().__init__(
+            api_key,
+            password,
+            merchant_code,
+            env=env,
+            private_key=private_key,
+            sandbox_url=sandbox_url,
+            live_url=live_url,
+            transport=transport if transport is not None else AsyncTransport(),
+            refresh_margin=refresh_margin,
+            background_refresh=background_refresh,
+            token_store=token_store,
+            retry=retry,
+            limits=limits,
+            breakers=breakers,
+            timeout=timeout,
+            call_timeout=call_timeout,
+            serializer=serializer,
+            signing_pool=signing_pool,
+            crypto_backend=crypto_backend,
+        )
+        self.executor = executor
+        self._token_lock = None
+        self._refresh_task = None
+        self._lock_waiter = None
+        if balance_ttl:
+            self.balance_cache = AsyncCoalescingCache(balance_ttl, balance_stale_ttl)
+
+    @property
+    def authorization_token(self) -> str:
+        """
+        The last fetched bearer token, use :meth:`get_authorization_token` to
+        fetch or refresh it.
+        """
+        return self._prev_token
+
+    async def get_authorization_token(self) -> str:
+        """
+        Returns a str like to be used in header as Authorization value,
+        fetching a new token only once when several calls find it expired.
+        """
+        if self._token_valid():
+            return self._prev_token
+        if self._token_lock is None:
+            self._token_lock = asyncio.Lock()
+        limit = current_deadline()
+        try:
+            await asyncio.wait_for(
+                self._token_lock.acquire(),
+                None if limit is None else max(limit.remaining(), 0),
+            )
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded("token", limit.seconds)
+        try:
+            if self._token_valid() or await self._adopt_stored_token():
+                return self._prev_token
+            return await self._refresh_token()
+        finally:
+            self._token_lock.release()
+
+    async def _refresh_token(self):
+        """
+        Fetch a token as the client holding the token store's refresh lock,
+        unless another client refreshed it while we waited. File and Redis
+        stores block while waiting for the lock, so it is taken in a thread
+        of the client's own, leaving the executor free for the holder of the
+        lock to read and write the store. The caller must hold the token
+        lock.
+        """
+        lock = self._store_lock()
+        loop = asyncio.get_running_loop()
+        if self._lock_waiter is None:
+            self._lock_waiter = ThreadPoolExecutor(max_workers=1)
+        entered = loop.run_in_executor(self._lock_waiter, lock.__enter__)
+        try:
+            await asyncio.shield(entered)
+        except TimeoutError:
+            raise DeadlineExceeded("token", current_deadline().seconds) from None
+        except asyncio.CancelledError:
+            # release the lock once the executor has taken it
+            entered.add_done_callback(
+                lambda future: future.cancelled()
+                or future.exception() is not None
+                or lock.__exit__(None, None, None)
+            )
+            raise
+        try:
+            if await self._adopt_stored_token():
+                return self._prev_token
+            url = self._token_url()
+            response = await self._attempt(
+                self._breaker(url), self.limits, url, self._post_token, url
+            )
+            return await self._store_token(response)
+        finally:
+            lock.__exit__(None, None, None)
+
+    async def _adopt_stored_token(self):
+        """
+        Use the token store's entry if it is valid, return True if so. The
+        entry is read in the executor, as file and Redis stores block.
+        """
+        loop = asyncio.get_running_loop()
+        entry = await loop.run_in_executor(
+            self.executor, self.token_store.get, self._token_key
+        )
+        return self._adopt_entry(entry)
+
+    async def _store_token(self, response):
+        """Cache the token from a token response in the executor and return it."""
+        entry = self._token_entry(response)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(
+            self.executor, self.token_store.set, self._token_key, entry
+        )
+        if self.background_refresh:
+            self._schedule_refresh()
+        return entry["token"]
+
+    def _schedule_refresh(self):
+        """Schedule a task refreshing the token before it expires."""
+        if self._refresh_timer is not None:
+            self._refresh_timer.cancel()
+        expires_at = self._last_auth.timestamp() + self._expires_in
+        margin = helpers.refresh_margin(self._expires_in, self.refresh_margin)
+        delay = max(expires_at - margin - time.time(), 1)
+        self._refresh_timer = asyncio.get_running_loop().call_later(
+            delay, self._start_background_refresh
+        )
+
+    def _start_background_refresh(self):
+        self._refresh_task = asyncio.ensure_future(self._background_refresh())
+
+    async def _background_refresh(self):
+        if self._token_lock is None:
+            self._token_lock = asyncio.Lock()
+        async with self._token_lock:
+            try:
+                await self._refresh_token()
+            except Exception:
+                # leave the next call to refresh and surface the error
+                self._last_auth = None
+
+    async def _post_token(self, url):
+        """Send the token request and return the decoded response."""
+        return handle_response(await self.transport.post(url, **self._token_request()))
+
+    async def _call(
+        self,
+        endpoint,
+        method,
+        url,
+        headers=None,
+        signature=None,
+        product=None,
+        reference=None,
+        **kwargs
+    ):
+        """
+        Authorize and optionally sign a request in the executor, send it over
+        the transport and return the decoded response, retrying failures as
+        allowed by :attr:`retry` within the limits of :attr:`limits`, and
+        failing fast while the circuit of its service is open in
+        :attr:`breakers`.
+        """
+        if product is None:
+            product = ENDPOINT_PRODUCTS.get(endpoint)
+        with deadline(self.call_timeout) as limit:
+            policy = self.retry
+            governor = self.limits
+            breaker = self._breaker(url)
+            policy.started(endpoint)
+            began = time.monotonic()
+            attempt = 1
+            while True:
+                try:
+                    mark = time.perf_counter()
+                    token = await self.get_authorization_token()
+                    return await self._attempt(
+                        breaker,
+                        governor,
+                        url,
+                        self._send,
+                        endpoint,
+                        method,
+                        url,
+                        headers,
+                        signature,
+                        product,
+                        token,
+                        time.perf_counter() - mark,
+                        **kwargs
+                    )
+                except Exception as error:
+                    exc = error
+                    if (
+                        limit is not None
+                        and limit.expired
+                        and not isinstance(exc, DeadlineExceeded)
+                    ):
+                        # the timeout was cut short by the deadline
+                        exc = DeadlineExceeded(endpoint, limit.seconds)
+                        exc.__cause__ = error
+                    delay = policy.delay(
+                        endpoint, exc, attempt, time.monotonic() - began, reference
+                    )
+                    if delay is None or (
+                        limit is not None and delay >= limit.remaining()
+                    ):
+                        raise exc
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    async def _attempt(self, breaker, governor, url, send, *args, **kwargs):
+        """
+        Send one attempt of a call to url with send, through its breaker and
+        governor, giving back its slot and probe when it is cancelled or
+        its timeout is cut short by the deadline.
+        """
+        if breaker is not None:
+            breaker.allow()
+        family = sent = None
+        outcome = _PENDING
+        try:
+            if governor is not None:
+                family = await governor.aacquire(url)
+                sent = time.monotonic()
+            try:
+                result = await send(*args, **kwargs)
+            except Exception as error:
+                if not _cut_short(error):
+                    outcome = error
+                raise
+            outcome = None
+            return result
+        finally:
+            _settle(breaker, governor, family, sent, outcome)
+
+    async def _send(
+        self,
+        endpoint,
+        method,
+        url,
+        headers,
+        signature,
+        product,
+        token,
+        token_seconds,
+        **kwargs
+    ):
+        """
+        Send a single attempt of :meth:`_call` authorized with token, which
+        took token_seconds to resolve.
+        """
+        hooks = self.hooks
+        if hooks:
+            event = CallEvent(endpoint, method, url, time.time() - token_seconds)
+            timings = event.timings
+            timings["token"] = token_seconds
+            began = mark = time.perf_counter()
+        try:
+            headers = dict(headers) if headers else {}
+            headers["Authorization"] = token
+            if signature is not None:
+                if not isinstance(signature, bytes):
+                    loop = asyncio.get_running_loop()
+                    signature = await loop.run_in_executor(
+                        self.executor, self.signature, signature
+                    )
+                headers["signature"] = signature.decode()
+                if hooks:
+                    now = time.perf_counter()
+                    timings["sign"], mark = now - mark, now
+            response = await self.transport.request(
+                method,
+                url,
+                headers=headers,
+                timeout=request_timeout(self.timeout),
+                **kwargs
+            )
+            if hooks:
+                now = time.perf_counter()
+                event.status = response.status_code
+                timings["transport"], mark = now - mark, now
+            result = handle_response(response, product)
+            if hooks:
+                timings["decode"] = time.perf_counter() - mark
+            return result
+        except Exception as exc:
+            if hooks:
+                event.error = exc
+                event.response_code = error_code(exc)
+            raise
+        finally:
+            if hooks:
+                timings["total"] = time.perf_counter() - began + token_seconds
+                emit(hooks, event)
+
+    async def sign_batch(self, sigkeys):
+        """
+        Sign a sequence of request field tuples in the executor, returning
+        the signatures in the same order, see
+        :meth:`equity_jenga.api.auth.JengaAPI.sign_batch`.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, super().sign_batch, sigkeys)
+
+    async def send_money(self, transfer, signature=None):
+        """
+        Send money using one of the :mod:`equity_jenga.api.send_money`
+        transfer objects, invalidating any cached balance of the source
+        account once it is sent.
+        """
+        try:
+            return await self._send_money(transfer, signature)
+        finally:
+            if self.balance_cache is not None:
+                source = transfer.source
+                self.balance_cache.invalidate(
+                    (source.countryCode, source.accountNumber)
+                )
+
+    async def purchase_airtime(self, customer: dict, airtime: dict) -> dict:
+        """
+        Purchase airtime, see
+        :meth:`equity_jenga.api.auth.JengaAPI.purchase_airtime`. The
+        reference is allocated in the executor, as it locks and syncs the
+        shared counter file.
+        """
+        loop = asyncio.get_running_loop()
+        airtime["reference"] = await loop.run_in_executor(
+            self.executor, generate_reference
+        )
+        return await self._purchase_airtime(customer, airtime)
+
+    async def get_account_available_balance(self, countryCode, accountId) -> dict:
+        """
+        Retrieve the current and available balance of an account, served
+        from :attr:`balance_cache` when created with ``balance_ttl``.
+        """
+        if self.balance_cache is not None:
+            return await self.balance_cache.get(
+                (countryCode, accountId),
+                lambda: self._account_available_balance(countryCode, accountId),
+            )
+        return await self._account_available_balance(countryCode, accountId)
+
+    def iter_account_full_statement(
+        self, countryCode, accountNumber, fromDate, toDate, window_days=7, limit=1000
+    ):
+        """
+        Asynchronously iterate over every transaction between fromDate and
+        toDate in date order, fetching the range in concurrent windows of
+        window_days days.
+        See :func:`equity_jenga.api.statement.aiter_statement`.
+        """
+        return aiter_statement(
+            self,
+            countryCode,
+            accountNumber,
+            fromDate,
+            toDate,
+            window_days=window_days,
+            limit=limit,
+        )
+
+    def iter_eazzypay_merchants(self, per_page=50, window=2):
+        """
+        Asynchronously iterate over every EazzyPay merchant, fetching
+        ``window`` pages ahead.
+        """
+        return aiter_pages(
+            self.get_all_eazzypay_merchants, "merchants", per_page, window
+        )
+
+    def iter_billers(self, per_page=50, window=2):
+        """
+        Asynchronously iterate over every biller, fetching ``window`` pages
+        ahead.
+        """
+        return aiter_pages(self.get_all_billers, "billers", per_page, window)
+
+    async def close(self):
+        """Stop the background token refresh and close the transport's connections."""
+        if self._refresh_timer is not None:
+            self._refresh_timer.cancel()
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+        if self._lock_waiter is not None:
+            self._lock_waiter.shutdown(wait=False)
+        await self.transport.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
@@ -1,11 +1,65 @@
-import base64
+import asyncio
+import contextlib
+import hashlib
 import os
+import threading
+import time
 import requests
-from Crypto.PublicKey import RSA
-from Crypto.Signature import PKCS1_v1_5
-from Crypto.Hash import SHA256
-from .exceptions import handle_response, generate_reference
+from datetime import datetime
+from .exceptions import (
+    handle_response,
+    generate_reference,
+    error_code,
+    DeadlineExceeded,
+    ENDPOINT_PRODUCTS,
+)
 from . import helpers
+from .cache import CoalescingCache
+from .deadline import deadline, request_timeout, current as current_deadline
+from .endpoints import resolve as resolve_routes
+from .hooks import CallEvent, emit
+from .pagination import iter_pages
+from .retry import RetryPolicy
+from .serialization import dumps
+from .signer import Signer
+from .statement import iter_statement
+from .tokenstore import MemoryTokenStore
+from .transport import Transport
+
+_PENDING = object()
+
+TIMEOUTS = (
+    requests.exceptions.Timeout,
+    TimeoutError,
+    asyncio.TimeoutError,
+    DeadlineExceeded,
+)
+
+
+def _cut_short(error):
+    """
+    True if error is a timeout of an attempt whose deadline has run out, so
+    that it was cut short by the caller rather than by the upstream.
+    """
+    limit = current_deadline()
+    return limit is not None and limit.expired and isinstance(error, TIMEOUTS)
+
+
+def _settle(breaker, governor, family, sent, outcome):
+    """
+    Record the outcome of an attempt with its breaker and governor, or give
+    back its probe and slot if it never completed.
+    """
+    if family is not None:
+        if outcome is _PENDING:
+            governor.cancel(family)
+        else:
+            governor.release(family, time.monotonic() - sent, outcome)
+    if breaker is not None:
+        if outcome is _PENDING:
+            breaker.cancel()
+        else:
+            breaker.record(outcome)
 
 
 class JengaAPI:
@@ -27,6 +81,37 @@ class JengaAPI:
     :private_key:: the path to the merchant private key default is "~/.JengaAPI/keys/privatekey.pem"
     :sandbox_url:: the url used to access the Sandbox API
     :live_url:: the url used to access the Production API
+    :transport:: the HTTP transport used for all calls, defaults to a pooled
+        keep-alive :class:`equity_jenga.api.transport.Transport`
+    :refresh_margin:: number of seconds before the token's ``expires_in``
+        lifetime runs out at which it is refreshed, at most half the
+        lifetime
+    :background_refresh:: refresh the token from a background thread
+        ``refresh_margin`` seconds before it expires instead of on the first
+        call that finds it expiring
+    :token_store:: where the bearer token is cached, share a
+        :mod:`equity_jenga.api.tokenstore` store between clients or worker
+        processes so that only one of them fetches the token
+    :balance_ttl:: cache :meth:`get_account_available_balance` results for
+        this many seconds, coalescing concurrent requests for an account
+    :balance_stale_ttl:: keep serving an expired balance for this many
+        seconds while it is refreshed in the background
+    :retry:: the :class:`equity_jenga.api.retry.RetryPolicy` for failed
+        calls, defaults to retrying idempotent calls and money moving calls
+        with their original reference up to 3 times
+    :limits:: an :class:`equity_jenga.api.limits.Governor` limiting the rate
+        and concurrency of calls per endpoint family
+    :breakers:: :class:`equity_jenga.api.breaker.CircuitBreakers` failing
+        calls fast while their upstream service keeps failing
+    :timeout:: ``(connect, read)`` timeouts in seconds of each HTTP request
+    :call_timeout:: deadline in seconds of each call including token
+        refresh, signing and retries, see :mod:`equity_jenga.api.deadline`
+    :serializer:: callable encoding a JSON request body to bytes, defaults
+        to :func:`equity_jenga.api.serialization.dumps`
+    :signing_pool:: an :class:`equity_jenga.api.signer.SigningPool` signing
+        large batches in worker processes, see :meth:`sign_batch`
+    :crypto_backend:: name of the :mod:`equity_jenga.api.crypto` backend
+        signing requests, defaults to the first one installed
 
     **Example**
 
@@ -51,6 +136,20 @@ class JengaAPI:
         private_key=os.path.expanduser("~") + "/.JengaApi/keys/privatekey.pem",
         sandbox_url="https://sandbox.jengahq.io",
         live_url="https://api.jengahq.io",
+        transport=None,
+        refresh_margin=60,
+        background_refresh=False,
+        token_store=None,
+        balance_ttl=None,
+        balance_stale_ttl=0,
+        retry=None,
+        limits=None,
+        breakers=None,
+        timeout=(3.05, 30),
+        call_timeout=None,
+        serializer=None,
+        signing_pool=None,
+        crypto_backend=None,
     ):
         """
 
@@ -65,6 +164,35 @@ class JengaAPI:
         self.env = env
         self._last_auth = None
         self._prev_token = None
+        self._expires_in = helpers.TOKEN_LIFETIME
+        self._token_lock = threading.Lock()
+        self._refresh_timer = None
+        self.refresh_margin = refresh_margin
+        self.background_refresh = background_refresh
+        self.token_store = (
+            token_store if token_store is not None else MemoryTokenStore()
+        )
+        self._token_key = "{}:{}:{}".format(
+            env,
+            merchant_code,
+            hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16],
+        )
+        self.transport = transport if transport is not None else Transport()
+        self.signer = Signer(private_key, backend=crypto_backend)
+        self.hooks = []
+        if balance_ttl:
+            self.balance_cache = CoalescingCache(balance_ttl, balance_stale_ttl)
+        else:
+            self.balance_cache = None
+        self.retry = retry if retry is not None else RetryPolicy()
+        self.limits = limits
+        self.breakers = breakers
+        self.timeout = timeout
+        self.call_timeout = call_timeout
+        self.serializer = serializer if serializer is not None else dumps
+        self.signing_pool = signing_pool
+        self._routes = None
+        self._routes_key = None
 
     @property
     def authorization_token(self) -> str:
@@ -77,24 +205,140 @@ class JengaAPI:
             "Bearer ceTo5RCpluTfGn9B3OZXnnQkDVKM"
 
         """
-        if (
+        if self._token_valid():
+            return self._prev_token
+        limit = current_deadline()
+        wait = -1 if limit is None else max(limit.remaining(), 0)
+        if not self._token_lock.acquire(timeout=wait):
+            raise DeadlineExceeded("token", limit.seconds)
+        try:
+            # another thread may have refreshed it while we waited
+            if self._token_valid():
+                return self._prev_token
+            return self._refresh_token()
+        finally:
+            self._token_lock.release()
+
+    def _token_valid(self):
+        """Return True while the cached token is outside its refresh margin."""
+        return (
             self._last_auth is not None
             and self._prev_token is not None
-            and not helpers.token_expired(self._last_auth)
-        ):
+            and not helpers.token_expired(
+                self._last_auth, self._expires_in, self.refresh_margin
+            )
+        )
+
+    def _refresh_token(self):
+        """
+        Adopt a valid token from the token store or, as the client holding
+        the store's refresh lock, fetch one. The caller must hold the token
+        lock.
+        """
+        if self._adopt_stored_token():
             return self._prev_token
-        if self.env == "sandbox":
-            url = self.sandbox_url + "/identity-test/v2/token"
-        else:
-            url = self.live_url + "/identity/v2/token"
-        headers = {"Authorization": self.api_key}
-        body = dict(username=self._username, password=self._password)
-        response = requests.post(url, headers=headers, data=body)
-        response = handle_response(response)
+        with contextlib.ExitStack() as stack:
+            try:
+                stack.enter_context(self._store_lock())
+            except TimeoutError:
+                raise DeadlineExceeded("token", current_deadline().seconds) from None
+            # another client may have refreshed it while we waited
+            if self._adopt_stored_token():
+                return self._prev_token
+            return self._fetch_token()
+
+    def _store_lock(self):
+        """
+        Return the token store's refresh lock, raising :class:`TimeoutError`
+        when entered if it is not taken before the deadline in effect.
+        """
+        limit = current_deadline()
+        if limit is None:
+            return self.token_store.lock(self._token_key)
+        return self.token_store.lock(self._token_key, timeout=max(limit.remaining(), 0))
+
+    def _adopt_stored_token(self):
+        """Use the token store's entry if it is valid, return True if so."""
+        return self._adopt_entry(self.token_store.get(self._token_key))
+
+    def _adopt_entry(self, entry):
+        """Use a token store entry if it is valid, return True if so."""
+        if not entry:
+            return False
+        last_auth = datetime.fromtimestamp(entry["issued_at"])
+        if helpers.token_expired(last_auth, entry["expires_in"], self.refresh_margin):
+            return False
+        self._prev_token = entry["token"]
+        self._expires_in = entry["expires_in"]
+        self._last_auth = last_auth
+        if self.background_refresh:
+            self._schedule_refresh()
+        return True
+
+    def _fetch_token(self):
+        """
+        Fetch and cache a new token, within the limits and breaker of the
+        identity service. The caller must hold the token lock.
+        """
+        url = self._token_url()
+        response = self._attempt(
+            self._breaker(url), self.limits, url, self._post_token, url
+        )
+        return self._store_token(response)
+
+    def _post_token(self, url):
+        """Send the token request and return the decoded response."""
+        return handle_response(self.transport.post(url, **self._token_request()))
+
+    def _store_token(self, response):
+        """Cache the token from a token response and return it."""
+        entry = self._token_entry(response)
+        self.token_store.set(self._token_key, entry)
+        if self.background_refresh:
+            self._schedule_refresh()
+        return entry["token"]
+
+    def _token_entry(self, response):
+        """Use the token from a token response, returning its store entry."""
         token = "Bearer " + response.get("access_token")
+        issued_at = time.time()
         self._prev_token = token
-        self._last_auth = helpers.timenow()
-        return token
+        self._expires_in = helpers.token_lifetime(response)
+        self._last_auth = datetime.fromtimestamp(issued_at)
+        return dict(token=token, issued_at=issued_at, expires_in=self._expires_in)
+
+    def _schedule_refresh(self):
+        """Start a timer refreshing the token before it expires."""
+        if self._refresh_timer is not None:
+            self._refresh_timer.cancel()
+        expires_at = self._last_auth.timestamp() + self._expires_in
+        margin = helpers.refresh_margin(self._expires_in, self.refresh_margin)
+        delay = max(expires_at - margin - time.time(), 1)
+        self._refresh_timer = threading.Timer(delay, self._background_refresh)
+        self._refresh_timer.daemon = True
+        self._refresh_timer.start()
+
+    def _background_refresh(self):
+        with self._token_lock:
+            try:
+                self._refresh_token()
+            except Exception:
+                # leave the next call to refresh and surface the error
+                self._last_auth = None
+
+    def _token_url(self):
+        """Return the identity endpoint used to fetch bearer tokens."""
+        if self.env == "sandbox":
+            return self.sandbox_url + "/identity-test/v2/token"
+        return self.live_url + "/identity/v2/token"
+
+    def _token_request(self):
+        """Return the headers and body used to fetch a bearer token."""
+        return dict(
+            headers={"Authorization": self.api_key},
+            data=dict(username=self._username, password=self._password),
+            timeout=request_timeout(self.timeout),
+        )
 
     def signature(self, request_hash_fields: tuple):
         """
@@ -105,80 +349,359 @@ class JengaAPI:
         Takes a tuple of request fields in the order that they should be
         concatenated, hashes them with SHA-256,signs the resulting hash and
         returns a Base64 encoded string of the resulting signature
+
+        The private key is parsed once by :attr:`signer` and only re-read
+        when the key file changes.
+        """
+        return self.signer.sign(request_hash_fields)
+
+    def sign_batch(self, sigkeys):
+        """
+        Sign a sequence of request field tuples, returning the signatures in
+        the same order. Batches of at least :attr:`signing_pool`'s
+        ``min_batch`` are signed by its worker processes.
+        """
+        pool = self.signing_pool
+        if pool is not None and len(sigkeys) >= pool.min_batch:
+            return pool.sign_many(sigkeys)
+        return [self.signer.sign(fields) for fields in sigkeys]
+
+    def add_hook(self, hook):
+        """
+        Register a callable receiving a :class:`equity_jenga.api.hooks.CallEvent`
+        after every endpoint call.
         """
-        data = "".join(request_hash_fields).encode("utf-8")
-        with open(self.private_key, "r") as pk:
-            rsa_key = RSA.importKey(pk.read())
-        signer = PKCS1_v1_5.new(rsa_key)
-        digest = SHA256.new()
-        digest.update(data)
-        sign = signer.sign(digest)
-        return base64.b64encode(sign)
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook):
+        """Unregister a hook added with :meth:`add_hook`."""
+        self.hooks.remove(hook)
+
+    @property
+    def routes(self):
+        """
+        The :class:`equity_jenga.api.endpoints.Route` of each endpoint,
+        resolved once for the client's environment and base url.
+        """
+        key = (self.env, self.sandbox_url, self.live_url)
+        if self._routes_key != key:
+            sandbox = self.env == "sandbox"
+            base_url = self.sandbox_url if sandbox else self.live_url
+            self._routes = resolve_routes(base_url, sandbox)
+            self._routes_key = key
+        return self._routes
+
+    def encode(self, payload):
+        """Encode a JSON request body to bytes with :attr:`serializer`."""
+        return self.serializer(payload)
+
+    def _request(self, name, *params, sign=None, **kwargs):
+        """
+        Call a registered endpoint. The ``data`` of a JSON endpoint is
+        encoded once, every retry of the call sends the same bytes.
+
+        :params:: path parameters of the endpoint url
+        :sign:: ``dict`` of the values of the signed fields
+        """
+        route = self.routes[name]
+        if route.endpoint.json and kwargs.get("data") is not None:
+            kwargs["data"] = self.encode(kwargs["data"])
+        return self._call(
+            name,
+            route.method,
+            route.url(*params),
+            headers=route.headers,
+            signature=None if sign is None else route.signature(sign),
+            **kwargs,
+        )
+
+    def _call(
+        self,
+        endpoint,
+        method,
+        url,
+        headers=None,
+        signature=None,
+        product=None,
+        reference=None,
+        **kwargs,
+    ):
+        """
+        Authorize and optionally sign a request, send it over the transport
+        and return the decoded response, retrying failures as allowed by
+        :attr:`retry` within the limits of :attr:`limits`, and failing fast
+        while the circuit of its service is open in :attr:`breakers`.
+
+        The bearer token is resolved before each attempt is let through the
+        endpoint's breaker and governor, so that a failing token request
+        only counts against the identity service.
+
+        :endpoint:: name of the calling endpoint method, reported to hooks
+        :signature:: tuple of request fields to sign, see :meth:`signature`,
+            or the bytes of a signature made by :meth:`sign_batch`
+        :product:: error table used to type errors, by default the one of
+            the endpoint, see :func:`equity_jenga.api.exceptions.lookup`
+        :reference:: transaction reference of a money moving call, which is
+            only retried when it is given
+        """
+        if product is None:
+            product = ENDPOINT_PRODUCTS.get(endpoint)
+        with deadline(self.call_timeout) as limit:
+            policy = self.retry
+            governor = self.limits
+            breaker = self._breaker(url)
+            policy.started(endpoint)
+            began = time.monotonic()
+            attempt = 1
+            while True:
+                try:
+                    mark = time.perf_counter()
+                    token = self.authorization_token
+                    return self._attempt(
+                        breaker,
+                        governor,
+                        url,
+                        self._send,
+                        endpoint,
+                        method,
+                        url,
+                        headers,
+                        signature,
+                        product,
+                        token,
+                        time.perf_counter() - mark,
+                        **kwargs,
+                    )
+                except Exception as error:
+                    exc = error
+                    if (
+                        limit is not None
+                        and limit.expired
+                        and not isinstance(exc, DeadlineExceeded)
+                    ):
+                        # the timeout was cut short by the deadline
+                        exc = DeadlineExceeded(endpoint, limit.seconds)
+                        exc.__cause__ = error
+                    delay = policy.delay(
+                        endpoint, exc, attempt, time.monotonic() - began, reference
+                    )
+                    if delay is None or (
+                        limit is not None and delay >= limit.remaining()
+                    ):
+                        raise exc
+                time.sleep(delay)
+                attempt += 1
+
+    def _attempt(self, breaker, governor, url, send, *args, **kwargs):
+        """
+        Send one attempt of a call to url with send, through its breaker and
+        governor.
+        Whatever ends the attempt, including cancellation, its governor slot
+        and breaker probe are given back. The outcome of a completed request
+        is recorded, except for a timeout cut short by the deadline, which
+        says nothing about the upstream.
+        """
+        if breaker is not None:
+            breaker.allow()
+        family = sent = None
+        outcome = _PENDING
+        try:
+            if governor is not None:
+                family = governor.acquire(url)
+                sent = time.monotonic()
+            try:
+                result = send(*args, **kwargs)
+            except Exception as error:
+                if not _cut_short(error):
+                    outcome = error
+                raise
+            outcome = None
+            return result
+        finally:
+            _settle(breaker, governor, family, sent, outcome)
+
+    def _breaker(self, url):
+        """Return the circuit breaker guarding url, if any."""
+        return self.breakers.breaker(url) if self.breakers is not None else None
+
+    def _send(
+        self,
+        endpoint,
+        method,
+        url,
+        headers,
+        signature,
+        product,
+        token,
+        token_seconds,
+        **kwargs,
+    ):
+        """
+        Send a single attempt of :meth:`_call` authorized with token, which
+        took token_seconds to resolve.
+        """
+        if self.hooks:
+            return self._instrumented_call(
+                endpoint,
+                method,
+                url,
+                headers,
+                signature,
+                product,
+                token,
+                token_seconds,
+                **kwargs,
+            )
+        headers = dict(headers) if headers else {}
+        headers["Authorization"] = token
+        if signature is not None:
+            if not isinstance(signature, bytes):
+                signature = self.signature(signature)
+            headers["signature"] = signature
+        response = self.transport.request(
+            method,
+            url,
+            headers=headers,
+            timeout=request_timeout(self.timeout),
+            **kwargs,
+        )
+        return handle_response(response, product)
+
+    def _instrumented_call(
+        self,
+        endpoint,
+        method,
+        url,
+        headers,
+        signature,
+        product,
+        token,
+        token_seconds,
+        **kwargs,
+    ):
+        """:meth:`_send` timing each phase and reporting it to the hooks."""
+        event = CallEvent(endpoint, method, url, time.time() - token_seconds)
+        timings = event.timings
+        timings["token"] = token_seconds
+        began = mark = time.perf_counter()
+        try:
+            headers = dict(headers) if headers else {}
+            headers["Authorization"] = token
+            if signature is not None:
+                if not isinstance(signature, bytes):
+                    signature = self.signature(signature)
+                headers["signature"] = signature
+                now = time.perf_counter()
+                timings["sign"], mark = now - mark, now
+            response = self.transport.request(
+                method,
+                url,
+                headers=headers,
+                timeout=request_timeout(self.timeout),
+                **kwargs,
+            )
+            now = time.perf_counter()
+            event.status = getattr(response, "status_code", None)
+            elapsed = getattr(response, "elapsed", None)
+            sent = elapsed.total_seconds() if elapsed is not None else now - mark
+            timings["transport"] = min(sent, now - mark)
+            timings["read"] = now - mark - timings["transport"]
+            mark = now
+            result = handle_response(response, product)
+            timings["decode"] = time.perf_counter() - mark
+            return result
+        except Exception as exc:
+            event.error = exc
+            event.response_code = error_code(exc)
+            raise
+        finally:
+            timings["total"] = time.perf_counter() - began + token_seconds
+            emit(self.hooks, event)
 
     def get_pesalink_linked_accounts(self, mobile_number):
         """
         This webservice returns the recipients’ Linked Banks linked to the
         provided phone number on PesaLink
         """
-        headers = {
-            "Authorization": self.authorization_token,
-            "Content-Type": "application/json",
-        }
         data = {
             "mobileNumber": mobile_number,
         }
-        if self.env == "sandbox":
-            url = self.sandbox_url + "/transaction-test/v2/pesalink/inquire"
-        else:
-            url = self.live_url + "/transaction/v2/pesalink/inquire"
-        response = requests.post(url, headers=headers, data=data)
-        return handle_response(response)
+        return self._request("get_pesalink_linked_accounts", data=data)
 
     def get_transaction_status(self, requestId, transferDate):
         """
         Use this API to check the status of a B2C transaction
         """
-        headers = {
-            "Authorization": self.authorization_token,
-            "Content-Type": "application/json",
-        }
         data = {
             "requestId": requestId,
             "destination": {"type": "M-Pesa"},
             "transfer": {"date": transferDate},
         }
-        if self.env == "sandbox":
-            url = self.sandbox_url + "/transaction-test/v2/b2c/status/query"
-        else:
-            url = self.live_url + "/transaction/v2/b2c/status/query"
-        response = requests.post(url, headers=headers, data=data)
-        return handle_response(response)
+        return self._request("get_transaction_status", data=data)
+
+    def send_money(self, transfer, signature=None):
+        """
+        Send money using one of the :mod:`equity_jenga.api.send_money`
+        transfer objects, e.g. :class:`equity_jenga.api.send_money.IFT`,
+        :class:`equity_jenga.api.send_money.RTGS` or
+        :class:`equity_jenga.api.send_money.Pesalink`.
+
+        The request is signed with the transfer's ``sigkey`` fields, unless
+        the signature is given, e.g. from :meth:`sign_batch`. Any cached
+        balance of the source account is invalidated.
+        """
+        try:
+            return self._send_money(transfer, signature)
+        finally:
+            if self.balance_cache is not None:
+                source = transfer.source
+                self.balance_cache.invalidate(
+                    (source.countryCode, source.accountNumber)
+                )
+
+    def _send_money(self, transfer, signature):
+        route = self.routes["send_money"]
+        return self._call(
+            "send_money",
+            route.method,
+            route.url(),
+            headers=route.headers,
+            signature=signature if signature is not None else transfer.sigkey,
+            product=transfer.product,
+            reference=transfer.transfer.reference,
+            data=self.encode(transfer.body_payload),
+        )
 
     def get_all_eazzypay_merchants(self, numPages=1, per_page=10):
         """
         This webservice returns all EazzyPay merchants .
         """
-        headers = {"Authorization": self.authorization_token}
         params = {"page": numPages, "per_page": per_page}
-        if self.env == "sandbox":
-            url = self.sandbox_url + "/transaction-test/v2/merchants"
-        else:
-            url = self.live_url + "/transaction/v2/merchants"
-        response = requests.get(url, headers=headers, params=params)
-        return handle_response(response)
+        return self._request("get_all_eazzypay_merchants", params=params)
 
     def get_all_billers(self, numPages=1, per_page=10):
         """
         This web service returns a paginated list of all billers
         """
-        headers = {"Authorization": self.authorization_token}
         params = {"page": numPages, "per_page": per_page}
-        if self.env == "sandbox":
-            url = self.sandbox_url + "/transaction-test/v2/billers"
-        else:
-            url = self.live_url + "/transaction/v2/billers"
-        response = requests.get(url, headers=headers, params=params)
-        return handle_response(response)
+        return self._request("get_all_billers", params=params)
+
+    def iter_eazzypay_merchants(self, per_page=50, window=2):
+        """
+        Yield every EazzyPay merchant, walking all pages of
+        :meth:`get_all_eazzypay_merchants` and prefetching ``window`` pages
+        ahead.
+        """
+        return iter_pages(
+            self.get_all_eazzypay_merchants, "merchants", per_page, window
+        )
+
+    def iter_billers(self, per_page=50, window=2):
+        """
+        Yield every biller, walking all pages of :meth:`get_all_billers` and
+        prefetching ``window`` pages ahead.
+        """
+        return iter_pages(self.get_all_billers, "billers", per_page, window)
 
     def get_payment_status(self, transactionReference):
         """
@@ -186,38 +709,14 @@ class JengaAPI:
         that is linked to the Receive Payments - Eazzypay Push web service
         especially in failure states.
         """
-        headers = {"Authorization": self.authorization_token}
-        if self.env == "sandbox":
-            url = (
-                self.sandbox_url
-                + "/transaction-test/v2/payments/"
-                + transactionReference
-            )
-        else:
-            url = self.live_url + "/transaction/v2/payments/" + transactionReference
-        response = requests.get(url, headers=headers)
-        return handle_response(response)
+        return self._request("get_payment_status", transactionReference)
 
     def get_transaction_details(self, transactionReference):
         """
         This webservice enables an application or service to query a
         transactions details and status
         """
-        headers = {"Authorization": self.authorization_token}
-        if self.env == "sandbox":
-            url = (
-                self.sandbox_url
-                + "/transaction-test/v2/payments/details/"
-                + transactionReference
-            )
-        else:
-            url = (
-                self.live_url
-                + "/transaction/v2/payments/details/"
-                + transactionReference
-            )
-        response = requests.get(url, headers=headers)
-        return handle_response(response)
+        return self._request("get_transaction_details", transactionReference)
 
     def purchase_airtime(self, customer: dict, airtime: dict) -> dict:
         """
@@ -269,28 +768,25 @@ class JengaAPI:
         """
 
         airtime["reference"] = generate_reference()
+        return self._purchase_airtime(customer, airtime)
+
+    def _purchase_airtime(self, customer, airtime):
         payload = {
             "customer": customer,
             "airtime": airtime,
         }
-        merchantCode = (self.merchant_code,)
-        airtimeTelco = (airtime.get("telco"),)
-        airtimeAmount = (airtime.get("amount"),)
-        airtimeReference = (airtime.get("reference"),)
-        fields = (merchantCode, airtimeTelco, airtimeAmount, airtimeReference)
-        headers = {
-            "Authorization": self.authentication_token,
-            "Content-Type": "application/json",
-            "signature": self.signature(fields),
-        }
-        if self.env == "sandbox":
-            url = self.sandbox_url + "/transaction-test/v2/airtime"
-            response = requests.post(url=url, headers=headers, data=payload)
-            return handle_response(response)
-        else:
-            url = self.live_url + "/transaction/v2/airtime"
-            response = requests.post(url=url, headers=headers, data=payload)
-            return handle_response(response)
+        fields = dict(
+            merchantCode=self.merchant_code,
+            telco=airtime.get("telco"),
+            amount=airtime.get("amount"),
+            reference=airtime.get("reference"),
+        )
+        return self._request(
+            "purchase_airtime",
+            sign=fields,
+            reference=airtime["reference"],
+            data=payload,
+        )
 
     def kyc_search_verify(self, identity: dict):
         """
@@ -356,19 +852,16 @@ class JengaAPI:
         documentNumber = identity.get("documentNumber")
         countryCode = identity.get("countryCode")
         merchantCode = self.merchant_code
-        headers = {
-            "Authorization": self.authorization_token,
-            "Content-Type": "application/json",
-            "signature": self.signature((merchantCode, documentNumber, countryCode)),
-        }
         data = {"identity": identity}
-        if self.env == "sandbox":
-            url = self.sandbox_url + "/customer-test/v2/identity/verify"
-        else:
-            url = self.live_url + "/customer/v2/identity/verify"
-
-        response = requests.post(url, headers=headers, data=data)
-        return handle_response(response)
+        return self._request(
+            "kyc_search_verify",
+            sign=dict(
+                merchantCode=merchantCode,
+                documentNumber=documentNumber,
+                countryCode=countryCode,
+            ),
+            data=data,
+        )
 
     def loans_credit_score(self, customer: list, bureau: dict, loan: dict) -> dict:
         """
@@ -869,17 +1362,15 @@ class JengaAPI:
             payload.get("customer")[0].get(
                 "identityDocument").get("documentNumber")
         )
-        headers = {
-            "Authorization": self.authentication_token,
-            "Content-Type": "application/json",
-            "signature": self.signature((dateOfBirth, merchantCode, documentNumber)),
-        }
-        if self.env == "sandbox":
-            url = self.sandbox_url + "/customer-test/v2/creditinfo"
-        else:
-            url = self.live_url + "/customer/v2/creditinfo"
-        response = requests.post(url=url, headers=headers, data=payload)
-        return handle_response(response)
+        return self._request(
+            "loans_credit_score",
+            sign=dict(
+                dateOfBirth=dateOfBirth,
+                merchantCode=merchantCode,
+                documentNumber=documentNumber,
+            ),
+            data=payload,
+        )
 
     def get_forex_rates(self, countryCode: str, currencyCode: str) -> dict:
         """
@@ -915,26 +1406,19 @@ class JengaAPI:
 
 
         """
-        headers = {
-            "Authorization": self.authentication_token,
-            "Content-Type": "application/json",
-        }
         data = {
             "countryCode": countryCode,
             "currencyCode": currencyCode,
         }
-        if self.env == "sandbox":
-            url = self.sandbox_url + "/transaction-test/v2/foreignexchangerates"
-        else:
-            url = self.live_url + "/transaction/v2/foreignexchangerates"
-
-        response = requests.post(url=url, headers=headers, data=data)
-        return handle_response(response)
+        return self._request("get_forex_rates", data=data)
 
     def get_account_available_balance(self, countryCode, accountId) -> dict:
         """
         Retrieve the current and available balance of an account
 
+        With ``balance_ttl`` set the result is served from
+        :attr:`balance_cache`, treat it as read only.
+
         200 Success Response Schema
 
         .. code-block:: json
@@ -954,18 +1438,20 @@ class JengaAPI:
             }
 
         """
-        headers = {
-            "Authorization": self.authorization_token,
-            "signature": self.signature((countryCode, accountId)),
-        }
-        if self.env == "sandbox":
-            resource = f"/account-test/v2/accounts/balances/{countryCode}/{accountId}"
-            url = self.sandbox_url + resource
-        else:
-            resource = f"/account/v2/accounts/balances/{countryCode}/{accountId}"
-            url = self.live_url + resource
-        response = requests.get(url, headers=headers)
-        return handle_response(response)
+        if self.balance_cache is not None:
+            return self.balance_cache.get(
+                (countryCode, accountId),
+                lambda: self._account_available_balance(countryCode, accountId),
+            )
+        return self._account_available_balance(countryCode, accountId)
+
+    def _account_available_balance(self, countryCode, accountId):
+        return self._request(
+            "get_account_available_balance",
+            countryCode,
+            accountId,
+            sign=dict(countryCode=countryCode, accountId=accountId),
+        )
 
     def get_account_opening_and_closing_balance(self, accountId, countryCode, date):
         """
@@ -998,23 +1484,14 @@ class JengaAPI:
                 }
 
         """
-        headers = {
-            "Authorization": self.authorization_token,
-            "signature": self.signature((accountId, countryCode, date)),
-        }
         data = {
             "countryCode": countryCode,
             "accountId": accountId,
             "date": date,
         }
-        if self.env == "sandbox":
-            resource = "/account-test/v2/accounts/accountbalance/query"
-            url = self.sandbox_url + resource
-        else:
-            resource = "/account/v2/accounts/accountbalance/query"
-            url = self.live_url + resource
-        response = requests.post(url, headers=headers, data=data)
-        return handle_response(response)
+        return self._request(
+            "get_account_opening_and_closing_balance", sign=data, data=data
+        )
 
     def get_account_mini_statement(self, countryCode, accountNumber):
         """
@@ -1058,23 +1535,12 @@ class JengaAPI:
                 ]
             }
         """
-        headers = {
-            "Authorization": self.authorization_token,
-            "Content-Type": "application/json",
-            "signature": self.signature((countryCode, accountNumber)),
-        }
-        if self.env == "sandbox":
-            resource = (
-                f"/account-test/v2/accounts/ministatement/{countryCode}/{accountNumber}"
-            )
-            url = self.sandbox_url + resource
-        else:
-            resource = (
-                f"/account/v2/accounts/ministatement/{countryCode}/{accountNumber}"
-            )
-            url = self.live_url + resource
-        response = requests.get(url, headers=headers)
-        return handle_response(response)
+        return self._request(
+            "get_account_mini_statement",
+            countryCode,
+            accountNumber,
+            sign=dict(countryCode=countryCode, accountNumber=accountNumber),
+        )
 
     def get_account_full_statement(
         self, countryCode, accountNumber, fromDate, toDate, limit=10
@@ -1141,22 +1607,25 @@ class JengaAPI:
             "limit": limit,
         }
 
-        accountNumber = payload.get("accountNumber")
-        countryCode = payload.get("countryCode")
-        toDate = payload.get("toDate")
-        headers = {
-            "Authorization": self.authorization_token,
-            "Content-Type": "application/json",
-            "signature": self.signature((accountNumber, countryCode, toDate)),
-        }
-        if self.env == "sandbox":
-            resource = "/account-test/v2/accounts/fullstatement/"
-            url = self.sandbox_url + resource
-        else:
-            resource = "/account/v2/accounts/fullstatement/"
-            url = self.live_url + resource
-        response = requests.post(url, headers=headers, data=payload)
-        return handle_response(response)
+        return self._request("get_account_full_statement", sign=payload, data=payload)
+
+    def iter_account_full_statement(
+        self, countryCode, accountNumber, fromDate, toDate, window_days=7, limit=1000
+    ):
+        """
+        Yield every transaction between fromDate and toDate in date order,
+        fetching the range in concurrent windows of window_days days.
+        See :func:`equity_jenga.api.statement.iter_statement`.
+        """
+        return iter_statement(
+            self,
+            countryCode,
+            accountNumber,
+            fromDate,
+            toDate,
+            window_days=window_days,
+            limit=limit,
+        )
 
 
 def generate_key_pair():
@@ -0,0 +1,193 @@
+"""
+Bulk Send Money
+
+:func:`send_batch` dispatches :mod:`equity_jenga.api.send_money` transfer
+objects through :meth:`equity_jenga.api.auth.JengaAPI.send_money` from a pool
+of worker threads. Each worker signs its transfer and posts it over the
+client's pooled transport, and at most ``max_pending`` transfers are taken
+from the input at a time, so batches of any size are streamed through in
+bounded memory.
+
+**Example**
+
+.. code-block:: python
+
+    from equity_jenga.api.auth import JengaAPI
+    from equity_jenga.api.batch import send_batch
+    from equity_jenga.api.transport import Transport
+
+    jengaApi = JengaAPI(..., transport=Transport(pool_maxsize=16))
+    for result in send_batch(jengaApi, payroll_transfers(), max_workers=16):
+        if not result.ok:
+            print(result.index, result.error_code, result.error)
+
+Use a transport whose ``pool_maxsize`` is at least ``max_workers`` so every
+worker gets a keep-alive connection.
+
+When the client has a :class:`equity_jenga.api.signer.SigningPool`, transfers
+are taken from the input ``min_batch`` at a time and signed together by its
+worker processes, before the worker threads send them.
+"""
+
+import logging
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from .deadline import Deadline, bind
+from .exceptions import error_code
+
+logger = logging.getLogger(__name__)
+
+
+class BatchResult:
+    """
+    Outcome of one transfer in a batch.
+
+    :index:: position of the transfer in the input
+    :transfer:: the transfer object
+    :ok:: True if the transfer was accepted
+    :response:: the decoded response when ok
+    :error_code:: the Jenga error code when the API returned one
+    :error:: the exception raised when not ok
+    :latency:: seconds taken to sign and send the transfer
+    """
+
+    __slots__ = (
+        "index",
+        "transfer",
+        "ok",
+        "response",
+        "error_code",
+        "error",
+        "latency",
+    )
+
+    def __init__(
+        self,
+        index,
+        transfer,
+        ok,
+        response=None,
+        error_code=None,
+        error=None,
+        latency=0.0,
+    ):
+        """Create BatchResult object."""
+        self.index = index
+        self.transfer = transfer
+        self.ok = ok
+        self.response = response
+        self.error_code = error_code
+        self.error = error
+        self.latency = latency
+
+    def __repr__(self):
+        return (
+            "BatchResult(index={!r}, ok={!r}, error_code={!r}, latency={:.3f})".format(
+                self.index, self.ok, self.error_code, self.latency
+            )
+        )
+
+
+def _send(api, index, transfer, signature=None):
+    start = time.perf_counter()
+    try:
+        response = api.send_money(transfer, signature)
+    except Exception as exc:
+        return BatchResult(
+            index,
+            transfer,
+            False,
+            error_code=error_code(exc),
+            error=exc,
+            latency=time.perf_counter() - start,
+        )
+    return BatchResult(
+        index, transfer, True, response=response, latency=time.perf_counter() - start
+    )
+
+
+def _presign(api, pool, taken):
+    """
+    Sign transfers together in the signing pool, or leave them to be signed
+    by the worker sending them if they are too few or signing fails.
+    """
+    if pool is None or len(taken) < pool.min_batch:
+        return [None] * len(taken)
+    try:
+        return api.sign_batch([transfer.sigkey for _, transfer in taken])
+    except Exception:
+        logger.exception("signing pool failed, signing transfers one by one")
+        return [None] * len(taken)
+
+
+def send_batch(
+    api, transfers, max_workers=8, max_pending=None, ordered=False, deadline=None
+):
+    """
+    Send an iterable of transfers, yielding a :class:`BatchResult` per
+    transfer as it completes.
+
+    **Params**
+
+    :api:: the :class:`equity_jenga.api.auth.JengaAPI` client
+    :transfers:: iterable of send money transfer objects, consumed lazily
+    :max_workers:: number of transfers signed and sent concurrently
+    :max_pending:: maximum number of transfers taken from the input and not
+        yet yielded, defaults to twice ``max_workers``, or to twice the
+        ``min_batch`` of the client's ``signing_pool`` if that is larger
+    :ordered:: yield results in input order instead of completion order
+    :deadline:: seconds the whole batch may take, once spent no further
+        transfers are taken from the input and queued ones fail with
+        :class:`equity_jenga.api.exceptions.DeadlineExceeded` without being
+        sent
+    """
+    from .aio import AsyncJengaAPI
+
+    if isinstance(api, AsyncJengaAPI):
+        raise TypeError(
+            "send_batch needs a JengaAPI client, gather AsyncJengaAPI.send_money "
+            "calls instead"
+        )
+    pool = getattr(api, "signing_pool", None)
+    chunk = pool.min_batch if pool is not None else 1
+    if max_pending is None:
+        max_pending = max(2 * max_workers, 2 * chunk)
+    items = enumerate(transfers)
+    pending = set()
+    queue = deque()
+    exhausted = False
+    limit = Deadline(deadline) if deadline is not None else None
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while True:
+            free = max_pending - len(pending) - len(queue)
+            if not exhausted and (free >= chunk or not (pending or queue)):
+                taken = []
+                while len(taken) < free:
+                    if limit is not None and limit.expired:
+                        exhausted = True
+                        break
+                    try:
+                        taken.append(next(items))
+                    except StopIteration:
+                        exhausted = True
+                        break
+                signatures = _presign(api, pool, taken)
+                for (index, transfer), signature in zip(taken, signatures):
+                    future = executor.submit(
+                        bind(_send, limit), api, index, transfer, signature
+                    )
+                    if ordered:
+                        queue.append(future)
+                    else:
+                        pending.add(future)
+            if ordered:
+                if not queue:
+                    return
+                yield queue.popleft().result()
+                continue
+            if not pending:
+                return
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
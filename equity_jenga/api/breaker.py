@@ -0,0 +1,173 @@
+"""
+Circuit Breakers
+
+:class:`CircuitBreakers` keeps one :class:`CircuitBreaker` per upstream
+service of :class:`equity_jenga.api.auth.JengaAPI`, keyed by the url prefix
+of its endpoints, e.g. ``/transaction/v2`` or ``/account-test/v2``. Token
+requests go through the breaker of ``/identity/v2``.
+
+A breaker opens after ``failure_threshold`` consecutive calls fail with a
+retryable error (the service is unavailable, the connection failed or timed
+out). While it is open calls fail at once with
+:class:`equity_jenga.api.exceptions.CircuitOpenError` instead of tying up a
+worker. After ``recovery_timeout`` seconds it lets ``half_open_probes`` calls
+through: a success closes it again, a failure reopens it.
+
+**Example**
+
+.. code-block:: python
+
+    from equity_jenga.api.breaker import CircuitBreakers
+
+    jengaApi = api.auth.JengaAPI(
+        ...,
+        breakers=CircuitBreakers(
+            failure_threshold=5,
+            recovery_timeout=30,
+            thresholds={"/transaction/v2": 3},
+        ),
+    )
+"""
+
+import logging
+import threading
+import time
+from .exceptions import CircuitOpenError, is_retryable
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def url_prefix(url):
+    """Return the service prefix of a Jenga url, e.g. ``/transaction/v2``."""
+    path = url.split("://", 1)[-1].split("?", 1)[0]
+    parts = path.split("/", 3)
+    return "/" + "/".join(parts[1:3])
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for one upstream service.
+
+    **Params**
+
+    :name:: the url prefix of the service
+    :failure_threshold:: consecutive failures that open the circuit
+    :recovery_timeout:: seconds the circuit stays open before probing
+    :half_open_probes:: calls let through to probe a half open circuit
+    """
+
+    def __init__(
+        self, name, failure_threshold=5, recovery_timeout=30, half_open_probes=1
+    ):
+        """Create CircuitBreaker object."""
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_probes = half_open_probes
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._probes = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Raise :class:`CircuitOpenError` unless a call may be sent now."""
+        if self.state == CLOSED:
+            return
+        with self._lock:
+            if self.state == OPEN:
+                remaining = self.opened_at + self.recovery_timeout - time.monotonic()
+                if remaining > 0:
+                    raise CircuitOpenError(self.name, remaining)
+                self.state = HALF_OPEN
+                self._probes = 0
+                logger.info("circuit %s half open", self.name)
+            if self.state == HALF_OPEN:
+                if self._probes >= self.half_open_probes:
+                    raise CircuitOpenError(self.name, 0)
+                self._probes += 1
+
+    def cancel(self):
+        """Give back the probe of a call let through but never completed."""
+        if self.state != HALF_OPEN:
+            return
+        with self._lock:
+            if self.state == HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def record(self, error=None):
+        """Record the outcome of a call let through by :meth:`allow`."""
+        failed = error is not None and is_retryable(error)
+        if not failed and self.state == CLOSED and not self.failures:
+            return
+        with self._lock:
+            if not failed:
+                if self.state != CLOSED:
+                    logger.info("circuit %s closed", self.name)
+                self.state = CLOSED
+                self.failures = 0
+                return
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    logger.warning(
+                        "circuit %s open after %d failures: %s",
+                        self.name,
+                        self.failures,
+                        error,
+                    )
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+
+class CircuitBreakers:
+    """
+    Circuit breakers keyed by url prefix, created on first use.
+
+    **Params**
+
+    :failure_threshold:: consecutive failures that open a circuit
+    :recovery_timeout:: seconds a circuit stays open before probing
+    :half_open_probes:: calls let through to probe a half open circuit
+    :thresholds:: ``dict`` of url prefix to the failure_threshold of its
+        circuit
+    """
+
+    def __init__(
+        self,
+        failure_threshold=5,
+        recovery_timeout=30,
+        half_open_probes=1,
+        thresholds=None,
+    ):
+        """Create CircuitBreakers object."""
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_probes = half_open_probes
+        self.thresholds = dict(thresholds or {})
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, url):
+        """Return the :class:`CircuitBreaker` guarding url."""
+        prefix = url_prefix(url)
+        breaker = self._breakers.get(prefix)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.get(prefix)
+                if breaker is None:
+                    breaker = self._breakers[prefix] = CircuitBreaker(
+                        prefix,
+                        self.thresholds.get(prefix, self.failure_threshold),
+                        self.recovery_timeout,
+                        self.half_open_probes,
+                    )
+        return breaker
+
+    def states(self):
+        """Return a ``dict`` of url prefix to circuit state."""
+        return {prefix: breaker.state for prefix, breaker in self._breakers.items()}
@@ -0,0 +1,167 @@
+"""
+Read-Through Caching
+
+:class:`CoalescingCache` caches the results of a loader per key for ``ttl``
+seconds. Concurrent misses for the same key share a single upstream call, and
+for ``stale_ttl`` seconds after expiry the old value keeps being served while
+one background refresh runs (stale-while-revalidate).
+
+:class:`equity_jenga.api.auth.JengaAPI` uses it for
+:meth:`equity_jenga.api.auth.JengaAPI.get_account_available_balance` when
+created with ``balance_ttl``, and :class:`equity_jenga.api.aio.AsyncJengaAPI`
+uses :class:`AsyncCoalescingCache`, which loads with coroutines and tasks.
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+
+
+class CoalescingCache:
+    """
+    Thread safe read-through cache with request coalescing.
+
+    **Params**
+
+    :ttl:: seconds a loaded value is fresh
+    :stale_ttl:: further seconds an expired value is served while it is
+        refreshed in the background, ``0`` disables stale serving
+    """
+
+    def __init__(self, ttl=1.0, stale_ttl=0.0):
+        """Create CoalescingCache object."""
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._entries = {}  # key -> (value, loaded_at)
+        self._loading = {}  # key -> Future
+        self._lock = threading.Lock()
+
+    def get(self, key, loader):
+        """
+        Return the cached value for key, calling loader() to load it when it
+        is missing or expired.
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            age = time.monotonic() - entry[1]
+            if age < self.ttl:
+                return entry[0]
+            if age < self.ttl + self.stale_ttl:
+                self._load(key, loader, background=True)
+                return entry[0]
+        return self._load(key, loader).result()
+
+    def _load(self, key, loader, background=False):
+        """Start or join the single in-flight load of key."""
+        with self._lock:
+            future = self._loading.get(key)
+            if future is not None:
+                return future
+            future = Future()
+            self._loading[key] = future
+        if background:
+            worker = threading.Thread(target=self._run, args=(key, loader, future))
+            worker.daemon = True
+            worker.start()
+        else:
+            self._run(key, loader, future)
+        return future
+
+    def _run(self, key, loader, future):
+        try:
+            value = loader()
+        except BaseException as exc:
+            with self._lock:
+                self._loading.pop(key, None)
+            future.set_exception(exc)
+            return
+        with self._lock:
+            # an invalidation during the load discards its result
+            if self._loading.get(key) is future:
+                self._entries[key] = (value, time.monotonic())
+                del self._loading[key]
+        future.set_result(value)
+
+    def invalidate(self, key):
+        """Drop the cached value for key."""
+        with self._lock:
+            self._entries.pop(key, None)
+            self._loading.pop(key, None)
+
+    def clear(self):
+        """Drop every cached value."""
+        with self._lock:
+            self._entries.clear()
+            self._loading.clear()
+
+
+class AsyncCoalescingCache:
+    """
+    Asyncio read-through cache with request coalescing, the
+    :class:`CoalescingCache` of a single event loop. Loaders return
+    awaitables and run as tasks shared by every waiter.
+
+    **Params**
+
+    :ttl:: seconds a loaded value is fresh
+    :stale_ttl:: further seconds an expired value is served while it is
+        refreshed in the background, ``0`` disables stale serving
+    """
+
+    def __init__(self, ttl=1.0, stale_ttl=0.0):
+        """Create AsyncCoalescingCache object."""
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._entries = {}  # key -> (value, loaded_at)
+        self._loading = {}  # key -> Task
+
+    async def get(self, key, loader):
+        """
+        Return the cached value for key, awaiting loader() to load it when it
+        is missing or expired.
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            age = time.monotonic() - entry[1]
+            if age < self.ttl:
+                return entry[0]
+            if age < self.ttl + self.stale_ttl:
+                self._load(key, loader)
+                return entry[0]
+        # a cancelled waiter leaves the load to the others
+        return await asyncio.shield(self._load(key, loader))
+
+    def _load(self, key, loader):
+        """Start or join the single in-flight load of key."""
+        task = self._loading.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._run(key, loader))
+            # a background load's error is only raised to its waiters
+            task.add_done_callback(lambda done: done.cancelled() or done.exception())
+            self._loading[key] = task
+        return task
+
+    async def _run(self, key, loader):
+        task = asyncio.current_task()
+        try:
+            value = await loader()
+        except BaseException:
+            if self._loading.get(key) is task:
+                del self._loading[key]
+            raise
+        # an invalidation during the load discards its result
+        if self._loading.get(key) is task:
+            self._entries[key] = (value, time.monotonic())
+            del self._loading[key]
+        return value
+
+    def invalidate(self, key):
+        """Drop the cached value for key."""
+        self._entries.pop(key, None)
+        self._loading.pop(key, None)
+
+    def clear(self):
+        """Drop every cached value."""
+        self._entries.clear()
+        self._loading.clear()
@@ -0,0 +1,231 @@
+"""
+Columnar Statements
+
+:class:`ColumnarStatement` holds the transactions of
+:meth:`equity_jenga.api.auth.JengaAPI.get_account_mini_statement` or
+:meth:`equity_jenga.api.auth.JengaAPI.get_account_full_statement` (or the
+stream from :func:`equity_jenga.api.statement.iter_statement`) as NumPy
+arrays:
+
+- amounts and running balances as ``int64`` minor units (cents),
+- dates as ``datetime64[s]`` at midnight and posting times as
+  ``datetime64[ms]``, resolutions pandas wraps without converting,
+- transaction type and currency as categorical ``int8`` codes.
+
+Aggregations run vectorized over the arrays. Requires the ``analytics``
+extra:
+
+.. code-block:: console
+
+    $ pip install equity-jenga-api[analytics]
+
+**Example**
+
+.. code-block:: python
+
+    from equity_jenga.api.columnar import ColumnarStatement
+
+    statement = ColumnarStatement.from_transactions(
+        jengaApi.iter_account_full_statement(
+            "KE", "0011547896523", "2019-01-01", "2019-12-31"
+        ),
+        currency="KES",
+    )
+    days, totals = statement.sum_by_day()
+    statement.verify_running_balance()
+"""
+
+from decimal import Decimal, ROUND_HALF_UP
+import numpy as np
+
+CREDIT = "Credit"
+DEBIT = "Debit"
+
+
+def to_minor_units(amount, scale=100):
+    """Convert an amount given as a str, int or float to integer minor units."""
+    if amount is None or amount == "":
+        return 0
+    value = Decimal(str(amount)) * scale
+    return int(value.to_integral_value(rounding=ROUND_HALF_UP))
+
+
+def _categorical(values):
+    """Return (codes, categories) for a sequence of labels."""
+    categories = sorted({value for value in values if value is not None})
+    lookup = {category: code for code, category in enumerate(categories)}
+    codes = np.fromiter(
+        (lookup.get(value, -1) for value in values), dtype=np.int8, count=len(values)
+    )
+    return codes, categories
+
+
+class ColumnarStatement:
+    """
+    Statement transactions stored column-wise in NumPy arrays.
+
+    Build it with :meth:`from_transactions` or :meth:`from_statement`.
+    """
+
+    def __init__(
+        self,
+        amount,
+        date,
+        posted,
+        type_codes,
+        types,
+        currency_codes,
+        currencies,
+        running_balance,
+        has_running_balance,
+        reference,
+        description,
+        scale=100,
+    ):
+        """Create ColumnarStatement object."""
+        self.amount = amount
+        self.date = date
+        self.posted = posted
+        self.type_codes = type_codes
+        self.types = types
+        self.currency_codes = currency_codes
+        self.currencies = currencies
+        self.running_balance = running_balance
+        self.has_running_balance = has_running_balance
+        self.reference = reference
+        self.description = description
+        self.scale = scale
+
+    def __len__(self):
+        return len(self.amount)
+
+    @classmethod
+    def from_transactions(cls, transactions, currency=None, scale=100):
+        """
+        Build a statement from an iterable of transaction dicts.
+
+        :currency:: currency of transactions that carry none themselves
+        :scale:: minor units per major unit
+        """
+        amount, date, posted, types, currencies = [], [], [], [], []
+        balance, has_balance, reference, description = [], [], [], []
+        for transaction in transactions:
+            amount.append(to_minor_units(transaction.get("amount"), scale))
+            day = transaction.get("date") or transaction.get("postedDateTime")
+            date.append(day[:10] if day else "NaT")
+            posted.append(transaction.get("postedDateTime") or "NaT")
+            types.append(transaction.get("type"))
+            running = transaction.get("runningBalance")
+            if isinstance(running, dict):
+                currencies.append(running.get("currency") or currency)
+                balance.append(to_minor_units(running.get("amount"), scale))
+                has_balance.append(True)
+            else:
+                currencies.append(currency)
+                balance.append(0)
+                has_balance.append(False)
+            reference.append(str(transaction.get("reference") or ""))
+            description.append(transaction.get("description") or "")
+        type_codes, type_categories = _categorical(types)
+        currency_codes, currency_categories = _categorical(currencies)
+        return cls(
+            amount=np.array(amount, dtype=np.int64),
+            date=np.array(date, dtype="datetime64[s]"),
+            posted=np.array(posted, dtype="datetime64[ms]"),
+            type_codes=type_codes,
+            types=type_categories,
+            currency_codes=currency_codes,
+            currencies=currency_categories,
+            running_balance=np.array(balance, dtype=np.int64),
+            has_running_balance=np.array(has_balance, dtype=bool),
+            reference=np.array(reference, dtype=object),
+            description=np.array(description, dtype=object),
+            scale=scale,
+        )
+
+    @classmethod
+    def from_statement(cls, statement, scale=100):
+        """Build a statement from a mini or full statement response."""
+        return cls.from_transactions(
+            statement.get("transactions") or [],
+            currency=statement.get("currency"),
+            scale=scale,
+        )
+
+    def _type_mask(self, name):
+        if name not in self.types:
+            return np.zeros(len(self), dtype=bool)
+        return self.type_codes == self.types.index(name)
+
+    @property
+    def signed_amount(self):
+        """Amounts in minor units, credits positive and debits negative."""
+        return np.where(self._type_mask(DEBIT), -self.amount, self.amount)
+
+    def sum_by_day(self, signed=True):
+        """
+        Return ``(days, totals)``, the distinct days in order and the total
+        amount in minor units transacted on each.
+        """
+        values = self.signed_amount if signed else self.amount
+        days, inverse = np.unique(self.date, return_inverse=True)
+        totals = np.zeros(len(days), dtype=np.int64)
+        np.add.at(totals, inverse.ravel(), values)
+        return days, totals
+
+    def sum_by_type(self):
+        """Return a dict of transaction type to total amount in minor units."""
+        valid = self.type_codes >= 0
+        totals = np.zeros(len(self.types), dtype=np.int64)
+        np.add.at(totals, self.type_codes[valid], self.amount[valid])
+        return {name: int(total) for name, total in zip(self.types, totals)}
+
+    def verify_running_balance(self):
+        """
+        Return the indices of transactions whose running balance does not
+        equal the previous running balance plus the signed amount. Only
+        consecutive transactions that both carry a running balance are
+        checked.
+        """
+        if len(self) < 2:
+            return np.array([], dtype=np.int64)
+        expected = self.running_balance[:-1] + self.signed_amount[1:]
+        checked = self.has_running_balance[:-1] & self.has_running_balance[1:]
+        bad = checked & (expected != self.running_balance[1:])
+        return np.nonzero(bad)[0] + 1
+
+    def gaps(self, max_days=1):
+        """
+        Return ``(after, before)`` arrays of consecutive transaction days that
+        are more than max_days apart.
+        """
+        days = np.unique(self.date[~np.isnat(self.date)])
+        if len(days) < 2:
+            empty = np.array([], dtype="datetime64[s]")
+            return empty, empty
+        wide = np.diff(days) > np.timedelta64(max_days, "D")
+        return days[:-1][wide], days[1:][wide]
+
+    def to_pandas(self):
+        """
+        Return a :class:`pandas.DataFrame` of the statement. The numeric and
+        date columns wrap the existing arrays without copying them.
+        """
+        import pandas as pd
+
+        return pd.DataFrame(
+            {
+                "date": self.date,
+                "posted": self.posted,
+                "amount": self.amount,
+                "type": pd.Categorical.from_codes(self.type_codes, self.types),
+                "currency": pd.Categorical.from_codes(
+                    self.currency_codes, self.currencies
+                ),
+                "running_balance": self.running_balance,
+                "has_running_balance": self.has_running_balance,
+                "reference": self.reference,
+                "description": self.description,
+            },
+            copy=False,
+        )
@@ -0,0 +1,195 @@
+"""
+Signature Backends
+
+Jenga signatures are RSA PKCS#1 v1.5 signatures of the SHA-256 hash of the
+concatenated request fields. A :class:`Backend` parses the merchant private
+key and returns a function signing with it. Two are provided:
+
+- :class:`CryptographyBackend`, OpenSSL through :mod:`cryptography`
+- :class:`PyCryptodomeBackend`, :mod:`Crypto` from pycryptodome, or from the
+  legacy pycrypto whose ``PKCS1_v1_5`` API it keeps
+
+:func:`get_backend` picks the first one installed, in that order, unless one
+is named. PKCS#1 v1.5 signing is deterministic, so every backend produces the
+same signature bytes for the same key and fields.
+
+**Example**
+
+.. code-block:: python
+
+    jengaApi = api.auth.JengaAPI(..., crypto_backend="pycryptodome")
+
+Compare the installed backends with
+
+.. code-block:: console
+
+    $ python -m equity_jenga.api.crypto ~/.JengaApi/keys/privatekey.pem
+"""
+
+import abc
+import os
+import sys
+import time
+
+
+class Backend(abc.ABC):
+    """
+    RSA SHA-256 PKCS#1 v1.5 signing implementation.
+
+    Subclasses implement :meth:`available` and :meth:`load_signer`, and
+    import their library lazily in them.
+    """
+
+    name = None
+
+    @classmethod
+    @abc.abstractmethod
+    def available(cls):
+        """True if the library of the backend can be imported."""
+
+    @abc.abstractmethod
+    def load_signer(self, pem):
+        """
+        Parse a PEM private key and return a callable taking the bytes to
+        sign and returning the raw signature bytes.
+        """
+
+    def __repr__(self):
+        return "{}()".format(type(self).__name__)
+
+
+class CryptographyBackend(Backend):
+    """Sign with OpenSSL through :mod:`cryptography`."""
+
+    name = "cryptography"
+
+    @classmethod
+    def available(cls):
+        """True if :mod:`cryptography` can be imported."""
+        try:
+            import cryptography.hazmat.primitives.asymmetric.padding  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def load_signer(self, pem):
+        """
+        Parse a PEM private key and return a callable taking the bytes to
+        sign and returning the raw signature bytes.
+        """
+        from cryptography.hazmat.primitives import hashes, serialization
+        from cryptography.hazmat.primitives.asymmetric import padding
+
+        key = serialization.load_pem_private_key(pem, password=None)
+        pad = padding.PKCS1v15()
+        algorithm = hashes.SHA256()
+
+        def sign(data):
+            return key.sign(data, pad, algorithm)
+
+        return sign
+
+
+class PyCryptodomeBackend(Backend):
+    """Sign with :mod:`Crypto` from pycryptodome or pycrypto."""
+
+    name = "pycryptodome"
+
+    @classmethod
+    def available(cls):
+        """True if :mod:`Crypto` can be imported."""
+        try:
+            import Crypto.Signature.PKCS1_v1_5  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def load_signer(self, pem):
+        """
+        Parse a PEM private key and return a callable taking the bytes to
+        sign and returning the raw signature bytes.
+        """
+        from Crypto.Hash import SHA256
+        from Crypto.PublicKey import RSA
+        from Crypto.Signature import PKCS1_v1_5
+
+        signer = PKCS1_v1_5.new(RSA.importKey(pem))
+
+        def sign(data):
+            return signer.sign(SHA256.new(data))
+
+        return sign
+
+
+BACKENDS = {
+    backend.name: backend for backend in (CryptographyBackend, PyCryptodomeBackend)
+}
+
+
+def available():
+    """Return the names of the installed backends, in order of preference."""
+    return [name for name, backend in BACKENDS.items() if backend.available()]
+
+
+def get_backend(backend=None):
+    """
+    Return a :class:`Backend`.
+
+    :backend:: a :class:`Backend`, the name of one in :data:`BACKENDS`, or
+        None for the first one installed
+    """
+    if isinstance(backend, Backend):
+        return backend
+    if backend is not None:
+        try:
+            return BACKENDS[backend]()
+        except KeyError:
+            raise ValueError(
+                "unknown crypto backend {!r}, expected one of {}".format(
+                    backend, ", ".join(BACKENDS)
+                )
+            ) from None
+    for cls in BACKENDS.values():
+        if cls.available():
+            return cls()
+    raise ImportError(
+        "no crypto backend installed, install cryptography or pycryptodome"
+    )
+
+
+def benchmark(private_key, rounds=200):
+    """
+    Return a ``dict`` of installed backend name to the seconds taken to load
+    the key (``load``) and its signatures per second (``sign``).
+    """
+    with open(private_key, "rb") as pk:
+        pem = pk.read()
+    data = "".join(("KE", "0011547896523", "2018-08-13")).encode("utf-8")
+    results = {}
+    for name in available():
+        backend = get_backend(name)
+        start = time.perf_counter()
+        sign = backend.load_signer(pem)
+        load = time.perf_counter() - start
+        sign(data)
+        start = time.perf_counter()
+        for _ in range(rounds):
+            sign(data)
+        results[name] = {
+            "load": load,
+            "sign": rounds / (time.perf_counter() - start),
+        }
+    return results
+
+
+if __name__ == "__main__":
+    key = (
+        sys.argv[1]
+        if len(sys.argv) > 1
+        else os.path.expanduser("~/.JengaApi/keys/privatekey.pem")
+    )
+    for name, result in benchmark(key).items():
+        print(
+            f"{name:>14}: key load {result['load'] * 1000:8.2f} ms,"
+            f" {result['sign']:10.1f} signatures/s"
+        )
@@ -0,0 +1,132 @@
+"""
+Call Deadlines
+
+A :class:`Deadline` bounds the total time of everything done for a call:
+waiting for and refreshing the bearer token, signing, every HTTP attempt and
+the backoff between retries. The deadline in effect is held in a
+:mod:`contextvars` variable, so it follows a call into the token refresh and
+into asyncio tasks, and is handed to the worker threads of
+:func:`equity_jenga.api.batch.send_batch` and
+:func:`equity_jenga.api.statement.iter_statement`.
+
+Each HTTP request gets the client's ``(connect, read)`` timeouts, shortened
+to the time left. Once the deadline has passed calls raise
+:class:`equity_jenga.api.exceptions.DeadlineExceeded`.
+
+**Example**
+
+.. code-block:: python
+
+    from equity_jenga.api.deadline import deadline
+
+    with deadline(5):
+        jengaApi.get_account_available_balance("KE", "0011547896523")
+        jengaApi.get_account_mini_statement("KE", "0011547896523")
+"""
+
+import contextlib
+import contextvars
+import time
+from .exceptions import DeadlineExceeded
+
+_current = contextvars.ContextVar("equity_jenga_deadline", default=None)
+
+
+class Deadline:
+    """
+    A point in time by which a call must be done.
+
+    **Params**
+
+    :seconds:: seconds from now
+    """
+
+    __slots__ = ("expires_at", "seconds")
+
+    def __init__(self, seconds):
+        """Create Deadline object."""
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self):
+        """Seconds left, negative once the deadline has passed."""
+        return self.expires_at - time.monotonic()
+
+    @property
+    def expired(self):
+        """True once the deadline has passed."""
+        return self.remaining() <= 0
+
+    def check(self, stage="call"):
+        """Raise :class:`DeadlineExceeded` if the deadline has passed."""
+        if self.remaining() <= 0:
+            raise DeadlineExceeded(stage, self.seconds)
+
+    def timeout(self, timeout, stage="request"):
+        """
+        Return a requests ``timeout`` no longer than the time left, raising
+        :class:`DeadlineExceeded` if there is none.
+
+        :timeout:: seconds or a ``(connect, read)`` tuple, None for no limit
+        """
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded(stage, self.seconds)
+        if timeout is None:
+            return remaining
+        if isinstance(timeout, tuple):
+            return tuple(
+                remaining if part is None else min(part, remaining) for part in timeout
+            )
+        return min(timeout, remaining)
+
+    def __repr__(self):
+        return "Deadline(remaining={:.3f})".format(self.remaining())
+
+
+def current():
+    """Return the :class:`Deadline` in effect, or None."""
+    return _current.get()
+
+
+def request_timeout(timeout):
+    """Return timeout shortened to the deadline in effect, if any."""
+    deadline = _current.get()
+    return timeout if deadline is None else deadline.timeout(timeout)
+
+
+@contextlib.contextmanager
+def deadline(seconds):
+    """
+    Run the block under a deadline of seconds from now, or under the
+    deadline already in effect if that is earlier. None leaves the deadline
+    in effect unchanged. Yields the :class:`Deadline` in effect.
+    """
+    outer = _current.get()
+    if seconds is None or (outer is not None and outer.remaining() <= seconds):
+        yield outer
+        return
+    inner = Deadline(seconds)
+    token = _current.set(inner)
+    try:
+        yield inner
+    finally:
+        _current.reset(token)
+
+
+def bind(fn, limit=None):
+    """
+    Return fn bound to a copy of the current context, so that it runs under
+    the deadline in effect when submitted to another thread, or under the
+    :class:`Deadline` limit if that is earlier.
+    """
+    context = contextvars.copy_context()
+    if limit is not None:
+        outer = context.get(_current)
+        if outer is None or outer.expires_at > limit.expires_at:
+            context.run(_current.set, limit)
+
+    def bound(*args, **kwargs):
+        return context.run(fn, *args, **kwargs)
+
+    return bound
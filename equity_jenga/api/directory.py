@@ -0,0 +1,264 @@
+"""
+Biller and Merchant Directory
+
+A :class:`Directory` keeps a local copy of the billers or EazzyPay merchants
+listed by :meth:`equity_jenga.api.auth.JengaAPI.iter_billers` and
+:meth:`equity_jenga.api.auth.JengaAPI.iter_eazzypay_merchants`, indexed for
+constant time lookup by code and prefix or fuzzy search by name. It can be
+persisted to disk so that new workers start with a warm directory.
+
+Once its ``ttl`` has passed, lookups keep answering from the records they
+have while a single background thread crawls the API for fresh ones
+(stale-while-revalidate, as :class:`equity_jenga.api.cache.CoalescingCache`
+does). A failed crawl is logged and retried after ``retry_interval`` seconds,
+doubling up to the ``ttl`` while it keeps failing. Only a directory with no
+records at all waits for the crawl, and raises its error.
+
+**Example**
+
+.. code-block:: python
+
+    from equity_jenga.api.directory import billers_directory
+
+    billers = billers_directory(jengaApi, ttl=6 * 3600, path="billers.json")
+    billers.get("320320")
+    billers.search("kenya power")
+    billers.fuzzy("kenya powr")
+"""
+
+import bisect
+import difflib
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Directory:
+    """
+    Locally cached, indexed listing of billers or merchants.
+
+    **Params**
+
+    :fetch_all:: callable returning an iterable of every record
+    :code_field:: the record field used as its unique code
+    :name_field:: the record field searched by name
+    :ttl:: seconds after which the directory is refreshed on next use
+    :path:: JSON file the directory is saved to and loaded from
+    :retry_interval:: seconds before a failed refresh is retried, doubled
+        after each further failure up to ttl
+    """
+
+    def __init__(
+        self,
+        fetch_all,
+        code_field,
+        name_field="name",
+        ttl=3600,
+        path=None,
+        retry_interval=30,
+    ):
+        """Create Directory object."""
+        self.fetch_all = fetch_all
+        self.code_field = code_field
+        self.name_field = name_field
+        self.ttl = ttl
+        self.path = path
+        self.retry_interval = retry_interval
+        self.fetched_at = 0.0
+        self.failures = 0
+        self.retry_at = 0.0
+        self.error = None
+        self._by_code = {}
+        self._names = []  # sorted (lowercase name, code)
+        self._by_name = {}
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._guard = threading.Lock()
+        if path and os.path.exists(path):
+            self.load(path)
+
+    def __len__(self):
+        return len(self._by_code)
+
+    def __iter__(self):
+        return iter(list(self._by_code.values()))
+
+    def __contains__(self, code):
+        return self.get(code) is not None
+
+    @property
+    def stale(self):
+        """True once the directory is older than its ttl."""
+        return time.time() - self.fetched_at > self.ttl
+
+    def _index(self):
+        self._names = sorted(
+            (str(record.get(self.name_field) or "").lower(), code)
+            for code, record in self._by_code.items()
+        )
+        by_name = {}
+        for name, code in self._names:
+            by_name.setdefault(name, code)
+        self._by_name = by_name
+
+    def _merge(self, records):
+        """
+        Merge freshly fetched records, return True if anything was added,
+        changed or removed.
+        """
+        fresh = {}
+        for record in records:
+            code = record.get(self.code_field)
+            if code is not None:
+                fresh[str(code)] = record
+        changed = fresh.keys() != self._by_code.keys() or any(
+            self._by_code.get(code) != record for code, record in fresh.items()
+        )
+        if changed:
+            self._by_code = fresh
+            self._index()
+        return changed
+
+    def refresh(self, force=False):
+        """
+        Reload the directory from the API if it is stale or forced, raising
+        the error of a failed fetch.
+        """
+        if not force and not self.stale:
+            return
+        with self._lock:
+            if not force and not self.stale:
+                return
+            try:
+                records = list(self.fetch_all())
+            except Exception as exc:
+                self.failures += 1
+                self.error = exc
+                self.retry_at = time.time() + min(
+                    self.retry_interval * 2 ** (self.failures - 1), self.ttl
+                )
+                raise
+            self.failures = 0
+            self.error = None
+            self.retry_at = 0.0
+            changed = self._merge(records)
+            self.fetched_at = time.time()
+            if self.path and (changed or not os.path.exists(self.path)):
+                self.save(self.path)
+            elif self.path:
+                # unchanged, only mark the saved copy as fresh
+                os.utime(self.path)
+
+    def _revalidate(self):
+        """
+        Load an empty directory, or start a background refresh of a stale
+        one unless one is running or a failed one is backing off.
+        """
+        if not self.stale:
+            return
+        if not self._by_code:
+            if self.error is not None and time.time() < self.retry_at:
+                raise self.error
+            self.refresh()
+            return
+        if self._refreshing or time.time() < self.retry_at:
+            return
+        with self._guard:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        worker = threading.Thread(target=self._background_refresh)
+        worker.daemon = True
+        worker.start()
+
+    def _background_refresh(self):
+        try:
+            self.refresh()
+        except Exception:
+            logger.exception(
+                "directory refresh failed %d times, serving stale records",
+                self.failures,
+            )
+        finally:
+            self._refreshing = False
+
+    def get(self, code):
+        """Return the record with code or None."""
+        self._revalidate()
+        return self._by_code.get(str(code))
+
+    def search(self, prefix, limit=None):
+        """Return records whose name starts with prefix, ignoring case."""
+        self._revalidate()
+        prefix = prefix.lower()
+        names = self._names
+        start = bisect.bisect_left(names, (prefix,))
+        results = []
+        for name, code in names[start:]:
+            if not name.startswith(prefix) or (limit and len(results) >= limit):
+                break
+            results.append(self._by_code[code])
+        return results
+
+    def fuzzy(self, query, limit=5, cutoff=0.6):
+        """Return up to limit records whose names closely match query."""
+        self._revalidate()
+        by_name = self._by_name
+        matches = difflib.get_close_matches(query.lower(), by_name, limit, cutoff)
+        return [self._by_code[by_name[name]] for name in matches]
+
+    def save(self, path=None):
+        """Write the directory to a JSON file, atomically replacing it."""
+        path = path or self.path
+        tmp = path + ".tmp"
+        with open(tmp, "w") as fh:
+            json.dump(
+                {
+                    "fetched_at": self.fetched_at,
+                    "records": list(self._by_code.values()),
+                },
+                fh,
+            )
+        os.replace(tmp, path)
+
+    def load(self, path=None):
+        """Read the directory from a JSON file written by :meth:`save`."""
+        path = path or self.path
+        with open(path) as fh:
+            data = json.load(fh)
+        self._merge(data.get("records", []))
+        self.fetched_at = max(data.get("fetched_at", 0.0), os.path.getmtime(path))
+
+
+def _check_client(api):
+    """Refuse an asynchronous client, a Directory crawls synchronously."""
+    from .aio import AsyncJengaAPI
+
+    if isinstance(api, AsyncJengaAPI):
+        raise TypeError(
+            "a Directory needs a JengaAPI client, iterate over AsyncJengaAPI's "
+            "iter_billers and iter_eazzypay_merchants instead"
+        )
+
+
+def billers_directory(api, ttl=3600, path=None, per_page=50):
+    """Return a :class:`Directory` of billers indexed by biller code."""
+    _check_client(api)
+    return Directory(
+        lambda: api.iter_billers(per_page=per_page), "code", ttl=ttl, path=path
+    )
+
+
+def merchants_directory(api, ttl=3600, path=None, per_page=50):
+    """Return a :class:`Directory` of EazzyPay merchants indexed by till number."""
+    _check_client(api)
+    return Directory(
+        lambda: api.iter_eazzypay_merchants(per_page=per_page),
+        "tillNumber",
+        ttl=ttl,
+        path=path,
+    )
@@ -0,0 +1,189 @@
+"""
+Endpoint Registry
+
+:data:`ENDPOINTS` describes every JengaHQ operation used by
+:class:`equity_jenga.api.auth.JengaAPI`: its HTTP method, its live path, the
+order of the fields it signs, whether it sends JSON, the error table its
+codes are documented in and whether it is safe to retry.
+
+:func:`resolve` turns the registry into :class:`Route` objects for one client,
+with the base url and the sandbox path (``/transaction-test/v2/...`` for
+``/transaction/v2/...``) applied once, so a call only has to fill in the path
+parameters.
+"""
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+class Endpoint:
+    """
+    A JengaHQ operation.
+
+    :name:: name of the :class:`equity_jenga.api.auth.JengaAPI` method
+    :method:: HTTP method
+    :path:: live path, with ``{0}``, ``{1}``... for path parameters
+    :signature:: names of the signed fields, in signing order, or None
+    :json:: send a ``Content-Type: application/json`` header
+    :product:: error table of the endpoint, see
+        :func:`equity_jenga.api.exceptions.lookup`
+    :idempotent:: the call can be repeated without side effects
+    """
+
+    __slots__ = ("name", "method", "path", "signature", "json", "product", "idempotent")
+
+    def __init__(
+        self,
+        name,
+        method,
+        path,
+        signature=None,
+        json=False,
+        product=None,
+        idempotent=True,
+    ):
+        """Create Endpoint object."""
+        self.name = name
+        self.method = method
+        self.path = path
+        self.signature = signature
+        self.json = json
+        self.product = product
+        self.idempotent = idempotent
+
+    def sandbox_path(self):
+        """Return the path of the endpoint in the sandbox."""
+        family, rest = self.path[1:].split("/", 1)
+        return "/{}-test/{}".format(family, rest)
+
+
+class Route:
+    """
+    An :class:`Endpoint` resolved for one client.
+
+    :url_template:: full url, with ``{0}``, ``{1}``... for path parameters
+    :headers:: request headers shared by every call, never modified
+    """
+
+    __slots__ = ("endpoint", "name", "method", "url_template", "headers", "_static")
+
+    def __init__(self, endpoint, base_url, sandbox=False):
+        """Create Route object."""
+        self.endpoint = endpoint
+        self.name = endpoint.name
+        self.method = endpoint.method
+        path = endpoint.sandbox_path() if sandbox else endpoint.path
+        self.url_template = base_url + path
+        self.headers = JSON_HEADERS if endpoint.json else None
+        self._static = "{" not in path
+
+    def url(self, *params):
+        """Return the url with the path parameters filled in."""
+        if self._static:
+            return self.url_template
+        return self.url_template.format(*params)
+
+    def signature(self, values):
+        """Return the fields to sign, in order, from a ``dict`` of values."""
+        return tuple(values[name] for name in self.endpoint.signature)
+
+
+ENDPOINTS = {
+    endpoint.name: endpoint
+    for endpoint in (
+        Endpoint(
+            "get_pesalink_linked_accounts",
+            "POST",
+            "/transaction/v2/pesalink/inquire",
+            json=True,
+        ),
+        Endpoint(
+            "get_transaction_status",
+            "POST",
+            "/transaction/v2/b2c/status/query",
+            json=True,
+        ),
+        Endpoint(
+            "send_money",
+            "POST",
+            "/transaction/v2/remittance",
+            json=True,
+            product="send_money",
+            idempotent=False,
+        ),
+        Endpoint("get_all_eazzypay_merchants", "GET", "/transaction/v2/merchants"),
+        Endpoint("get_all_billers", "GET", "/transaction/v2/billers"),
+        Endpoint(
+            "get_payment_status",
+            "GET",
+            "/transaction/v2/payments/{0}",
+            product="payment_status",
+        ),
+        Endpoint(
+            "get_transaction_details", "GET", "/transaction/v2/payments/details/{0}"
+        ),
+        Endpoint(
+            "purchase_airtime",
+            "POST",
+            "/transaction/v2/airtime",
+            signature=("merchantCode", "telco", "amount", "reference"),
+            json=True,
+            product="airtime",
+            idempotent=False,
+        ),
+        Endpoint(
+            "kyc_search_verify",
+            "POST",
+            "/customer/v2/identity/verify",
+            signature=("merchantCode", "documentNumber", "countryCode"),
+            json=True,
+            product="identity",
+        ),
+        Endpoint(
+            "loans_credit_score",
+            "POST",
+            "/customer/v2/creditinfo",
+            signature=("dateOfBirth", "merchantCode", "documentNumber"),
+            json=True,
+        ),
+        Endpoint(
+            "get_forex_rates",
+            "POST",
+            "/transaction/v2/foreignexchangerates",
+            json=True,
+        ),
+        Endpoint(
+            "get_account_available_balance",
+            "GET",
+            "/account/v2/accounts/balances/{0}/{1}",
+            signature=("countryCode", "accountId"),
+            product="account_balance",
+        ),
+        Endpoint(
+            "get_account_opening_and_closing_balance",
+            "POST",
+            "/account/v2/accounts/accountbalance/query",
+            signature=("accountId", "countryCode", "date"),
+        ),
+        Endpoint(
+            "get_account_mini_statement",
+            "GET",
+            "/account/v2/accounts/ministatement/{0}/{1}",
+            signature=("countryCode", "accountNumber"),
+            json=True,
+        ),
+        Endpoint(
+            "get_account_full_statement",
+            "POST",
+            "/account/v2/accounts/fullstatement/",
+            signature=("accountNumber", "countryCode", "toDate"),
+            json=True,
+        ),
+    )
+}
+
+
+def resolve(base_url, sandbox=False, endpoints=ENDPOINTS):
+    """Return a ``dict`` of endpoint name to :class:`Route` for a client."""
+    return {
+        name: Route(endpoint, base_url, sandbox) for name, endpoint in endpoints.items()
+    }
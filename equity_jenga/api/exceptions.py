@@ -336,32 +336,476 @@ Target Error
 
 """
 
+import asyncio
+import json
+import logging
+import re
 import requests
+from .endpoints import ENDPOINTS
+from .references import ReferenceAllocator
 
+try:
+    import orjson
 
-def handle_response(response):
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+logger = logging.getLogger(__name__)
+
+
+class JengaError(requests.exceptions.RequestException):
+    """
+    An error returned by the JengaHQ API.
+
+    :code:: the Jenga error code, e.g. ``"400101"``
+    :message:: the Jenga error message
+    :status_code:: the HTTP status of the response
+    :payload:: the decoded error response
+    :info:: the :class:`ErrorInfo` registered for the code, if any
+    :retryable:: True if sending the same request again may succeed
+    """
+
+    retryable = False
+
+    def __init__(
+        self, code, message, status_code=None, payload=None, response=None, info=None
+    ):
+        self.code = None if code is None else str(code)
+        self.message = message
+        self.status_code = status_code
+        self.payload = payload
+        self.info = info
+        if info is not None:
+            self.retryable = info.retryable
+        text = message if self.code is None else "{} : {}".format(self.code, message)
+        super().__init__(text, response=response)
+
+    @property
+    def product(self):
+        """The product whose error table the code was found in."""
+        return self.info.product if self.info is not None else None
+
+
+class JengaResponseError(JengaError):
+    """
+    A JengaHQ API response that is not valid JSON, retryable when the HTTP
+    status is 429 or 5xx.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        status = self.status_code
+        self.retryable = status is not None and (status == 429 or status >= 500)
+
+
+class AuthorizationError(JengaError):
+    """The merchant is not authorized, or its credentials were rejected."""
+
+
+class ValidationError(JengaError):
+    """The request has missing or invalid parameters."""
+
+
+class NotFoundError(JengaError):
+    """The account, customer, bill or transaction does not exist."""
+
+
+class InsufficientFundsError(JengaError):
+    """The source account has insufficient funds."""
+
+
+class LimitExceededError(JengaError):
+    """The amount or number of transactions is outside the allowed limits."""
+
+
+class DuplicateTransactionError(JengaError):
+    """The transaction reference has already been used."""
+
+
+class DeclinedError(JengaError):
+    """The transaction was declined by the bank or card issuer."""
+
+
+class ServiceUnavailableError(JengaError):
+    """The service or a downstream system failed, the request may be retried."""
+
+    retryable = True
+
+
+class RateLimitedError(ServiceUnavailableError):
+    """Too many requests were sent."""
+
+
+class CircuitOpenError(JengaError):
+    """
+    A call failed fast because the circuit of its service is open, see
+    :mod:`equity_jenga.api.breaker`.
+
+    :prefix:: the url prefix of the service
+    :remaining:: seconds until the circuit lets a probe through
+    """
+
+    def __init__(self, prefix, remaining):
+        self.prefix = prefix
+        self.remaining = remaining
+        super().__init__(
+            None,
+            "circuit for {} is open, retry in {:.1f}s".format(prefix, remaining),
+        )
+
+
+class DeadlineExceeded(JengaError, requests.exceptions.Timeout):
+    """
+    A call ran out of time, see :mod:`equity_jenga.api.deadline`.
+
+    :stage:: what the call was doing when the deadline passed
+    :seconds:: the length of the deadline
+    """
+
+    def __init__(self, stage, seconds):
+        self.stage = stage
+        self.seconds = seconds
+        super().__init__(
+            None, "deadline of {}s exceeded during {}".format(seconds, stage)
+        )
+
+
+PRODUCTS = {
+    "Downstream Provider Error responses": "downstream",
+    "Merchant Authorization": "authorization",
+    "Merchant Account/ Profile Validation": "merchant_validation",
+    "RTGS": "rtgs",
+    "Send Money - Within Equity Bank and Equitel": "send_money",
+    "Pesalink": "pesalink",
+    "Purchase Airtime": "airtime",
+    "Send Money - To Mobile Wallet ( Airtel and M-PESA )": "mobile_wallet",
+    "Bill and Till Payments": "bill_payment",
+    "Eazzypay Push": "eazzypay_push",
+    "Lipa na M-Pesa Online": "mpesa_online",
+    "Get Payment Status": "payment_status",
+    "Refund Payment": "refund",
+    "Identity Verification": "identity",
+    "Account Balance": "account_balance",
+    "Create Bill": "create_bill",
+    "Credit & Debit Card": "card",
+    "Receive Payments - Mobile Wallets": "receive_mobile_wallet",
+    "Query Payment": "query_payment",
+    "Query Bill": "query_bill",
+    "Generic Error": "generic",
+}
+
+ENDPOINT_PRODUCTS = {
+    name: endpoint.product
+    for name, endpoint in ENDPOINTS.items()
+    if endpoint.product is not None
+}
+
+# (exception class, message fragments), the first class matching any message
+# of a code wins
+CLASSIFIERS = (
+    (DuplicateTransactionError, ("duplicate",)),
+    (InsufficientFundsError, ("insufficient",)),
+    (RateLimitedError, ("spike arrest",)),
+    (
+        LimitExceededError,
+        ("limit", "maximum", "minimum", "less or more than"),
+    ),
+    (
+        AuthorizationError,
+        ("unauthorized", "authentication failed", "privileges", "credentials"),
+    ),
+    (
+        ServiceUnavailableError,
+        (
+            "not available",
+            "unavailable",
+            "system failure",
+            "system malfunction",
+            "server error",
+            "timed out",
+            "no reply",
+            "communicating",
+            "technical problem",
+            "cut-over",
+            "try again",
+            "retry",
+        ),
+    ),
+    (
+        NotFoundError,
+        (
+            "not found",
+            "no transaction found",
+            "no record",
+            "exist",
+            "cannot be found",
+            "not registered",
+            "not on pesalink",
+        ),
+    ),
+    (DeclinedError, ("declined", "fraud", "expired")),
+    (
+        ValidationError,
+        (
+            "invalid",
+            "validation",
+            "format",
+            "missing",
+            "bad request",
+            "illegal",
+            "should be",
+            "required",
+            "at least one",
+            "mandatory",
+        ),
+    ),
+)
+
+_ROW = re.compile(r"^error\s+(\d+)\s+(.*\S)\s*$")
+
+
+class ErrorInfo:
+    """
+    A registered Jenga error code.
+
+    :product:: the product the code belongs to, see :data:`PRODUCTS`
+    :code:: the error code
+    :messages:: the documented messages of the code
+    :exception:: the :class:`JengaError` subclass raised for it
+    :retryable:: True if sending the same request again may succeed
+    """
+
+    __slots__ = ("product", "code", "messages", "exception", "retryable")
+
+    def __init__(self, product, code, messages):
+        """Create ErrorInfo object."""
+        self.product = product
+        self.code = code
+        self.messages = tuple(messages)
+        self.exception = classify(self.messages)
+        self.retryable = self.exception.retryable
+
+    def __repr__(self):
+        return "ErrorInfo(product={!r}, code={!r}, exception={})".format(
+            self.product, self.code, self.exception.__name__
+        )
+
+
+def classify(messages):
+    """Return the :class:`JengaError` subclass matching error messages."""
+    text = " ".join(messages).lower()
+    for exception, fragments in CLASSIFIERS:
+        if any(fragment in text for fragment in fragments):
+            return exception
+    return JengaError
+
+
+def parse_error_tables(text):
+    """
+    Return ``{product: {code: [messages]}}`` from the error tables of this
+    module's docstring.
+    """
+    tables = {}
+    title = None
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line[0] in "=-" or line.startswith("Status "):
+            continue
+        row = _ROW.match(line)
+        if row is None:
+            title = line.rstrip(":").strip()
+            continue
+        product = PRODUCTS.get(title) or re.sub(r"\W+", "_", title.lower()).strip("_")
+        tables.setdefault(product, {}).setdefault(row.group(1), []).append(row.group(2))
+    return tables
+
+
+def build_registry(tables):
+    """
+    Return ``(registry, by_code)``, the :class:`ErrorInfo` of each
+    ``(product, code)`` and of each code in the first table listing it.
+    """
+    registry = {}
+    by_code = {}
+    for product, codes in tables.items():
+        for code, messages in codes.items():
+            info = ErrorInfo(product, code, messages)
+            registry[product, code] = info
+            by_code.setdefault(code, info)
+    return registry, by_code
+
+
+_tables = parse_error_tables(__doc__ or "")
+_tables.setdefault("generic", {})["500101"] = [
+    "Generic error. Please contact our support."
+]
+REGISTRY, BY_CODE = build_registry(_tables)
+del _tables
+
+
+def lookup(code, product=None):
+    """
+    Return the :class:`ErrorInfo` of a code, as documented for product when
+    given and found, otherwise as first documented. Returns None for unknown
+    codes.
+    """
+    code = str(code)
+    if product is not None:
+        info = REGISTRY.get((product, code))
+        if info is not None:
+            return info
+    return BY_CODE.get(code)
+
+
+def error_for(code, message, status_code=None, product=None, **kwargs):
+    """
+    Return the typed :class:`JengaError` for an error code, using the HTTP
+    status when the code is not registered.
+    """
+    info = None if code is None else lookup(code, product)
+    if info is not None:
+        exception = info.exception
+    elif status_code == 429:
+        exception = RateLimitedError
+    elif status_code in (401, 403):
+        exception = AuthorizationError
+    elif status_code is not None and status_code >= 500:
+        exception = ServiceUnavailableError
+    else:
+        exception = JengaError
+    return exception(code, message, status_code=status_code, info=info, **kwargs)
+
+
+def is_retryable(exc):
+    """
+    Return True if a request that raised exc may succeed when sent again:
+    retryable Jenga errors, connection errors and timeouts.
+    """
+    if isinstance(exc, JengaError):
+        return exc.retryable
+    return isinstance(
+        exc,
+        (
+            requests.exceptions.ConnectionError,
+            requests.exceptions.Timeout,
+            ConnectionError,
+            TimeoutError,
+            asyncio.TimeoutError,
+        ),
+    )
+
+
+def decode_json(content):
+    """
+    Decode a JSON response body, with :mod:`orjson` when it is installed.
+    An empty body decodes to an empty ``dict``.
+    """
+    if not content:
+        return {}
+    return _loads(content)
+
+
+def error_envelope(resp):
+    """
+    Return ``(code, message)`` if a decoded response is a Jenga error
+    envelope, either ``{"error": ..., "code": ..., "message": ...}`` or
+    ``{"response_status": "error", "response_code": ..., "response_msg": ...}``,
+    and None otherwise.
+    """
+    if not isinstance(resp, dict):
+        return None
+    if resp.get("error"):
+        return resp.get("code"), resp.get("message") or str(resp.get("error"))
+    if resp.get("response_status") == "error" or resp.get("status") is False:
+        return (
+            resp.get("response_code") or resp.get("code"),
+            resp.get("response_msg") or resp.get("message"),
+        )
+    return None
+
+
+def handle_response(response, product=None):
     """
     Handles Responses From the JengaHQ API and Raises Exceptions appropriately
     as errors occur and returns a `dict` object from the `json` response
+
+    The body is decoded once. Jenga error envelopes raise the
+    :class:`JengaError` subclass registered for the error code of product,
+    see :func:`lookup`, other responses with a non 2xx HTTP status raise the
+    one for their status, see :func:`error_for`, and bodies that are not JSON
+    raise :class:`JengaResponseError`.
     """
-    # print(response.status)
-    resp = response.json()
-    print(resp)
-    if resp.get("error"):
-        raise requests.exceptions.RequestException(
-            resp["code"] + " : " + resp["message"]
+    status = getattr(response, "status_code", None)
+    try:
+        resp = decode_json(response.content)
+    except ValueError:
+        logger.debug("undecodable Jenga response %s: %r", status, response.content)
+        raise JengaResponseError(
+            None,
+            "invalid JSON response with HTTP status {}".format(status),
+            status_code=status,
+            response=response,
         )
-    else:
-        return response.json()
+    logger.debug("Jenga response %s: %s", status, resp)
+    envelope = error_envelope(resp)
+    if envelope is not None:
+        code, message = envelope
+        logger.info("Jenga error %s %s: %s", status, code, message)
+        raise error_for(
+            code,
+            message,
+            status_code=status,
+            product=product,
+            payload=resp,
+            response=response,
+        )
+    if isinstance(status, int) and not 200 <= status < 300:
+        message = None
+        if isinstance(resp, dict):
+            message = resp.get("message") or resp.get("error")
+        message = message or "HTTP status {}".format(status)
+        logger.info("Jenga HTTP error %s: %s", status, message)
+        raise error_for(
+            None,
+            str(message),
+            status_code=status,
+            product=product,
+            payload=resp,
+            response=response,
+        )
+    return resp
+
+
+def error_code(exc):
+    """Return the Jenga error code carried by an exception, if any."""
+    code = getattr(exc, "code", None)
+    if code is not None:
+        return str(code)
+    head = str(exc).split(" : ", 1)[0].strip()
+    return head if head.isdigit() else None
 
 
 def generate_reference() -> str:
     """
     Generate a transaction reference
     Should always be a 12 digit String
+
+    References come from a
+    :class:`equity_jenga.api.references.ReferenceAllocator` whose counter file
+    is shared by the processes of the host, and are unique across processes
+    and restarts however many are generated per minute.
+
+    Across hosts they are only unique if each host sets its own
+    ``JENGA_NODE_ID`` (0-99) or all of them share one counter file. Without
+    it the node id is hashed from the host name into 100 buckets, two hosts
+    may land in the same one, and a warning is logged; set
+    ``JENGA_STRICT_NODE_ID=1`` to raise :class:`RuntimeError` instead.
     """
-    import datetime
+    global _reference_allocator
+    if _reference_allocator is None:
+        _reference_allocator = ReferenceAllocator()
+    return _reference_allocator.allocate()
+
 
-    a = datetime.datetime.now()
-    ref = "".join(str(a).replace(" ", "").replace("-", "").split(":")[0:2])
-    return ref
+_reference_allocator = None
@@ -0,0 +1,162 @@
+"""
+Foreign Exchange Rate Table
+
+A :class:`RateTable` caches the rates returned by
+:meth:`equity_jenga.api.auth.JengaAPI.get_forex_rates` for a country and a
+set of currencies and converts amounts locally with :class:`decimal.Decimal`
+arithmetic. Pairs that were not quoted directly are converted through the
+quoted ones, e.g. USD to EUR through KES, so no extra API call is needed.
+
+A quote ``{"fromCurrency": "KES", "toCurrency": "USD", "rate": 101.3}`` is
+read as 1 USD being worth 101.3 KES.
+
+**Example**
+
+.. code-block:: python
+
+    from equity_jenga.api.forex import RateTable
+
+    rates = RateTable(jengaApi, "KE", ("USD", "EUR", "GBP"), ttl=300)
+    rates.start()  # refresh in the background every ttl seconds
+    rates.convert("250.00", "USD", "EUR")
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from decimal import Decimal, ROUND_HALF_UP
+
+logger = logging.getLogger(__name__)
+
+
+def _quotes(response):
+    """Yield (fromCurrency, toCurrency, rate) for each quote of a response."""
+    if not response:
+        return
+    entries = list(response.get("currencyRates") or [])
+    entries.append(response)
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        source = entry.get("fromCurrency")
+        target = entry.get("toCurrency")
+        rate = entry.get("rate")
+        if source and target and rate not in (None, "", 0):
+            yield source, target, Decimal(str(rate))
+
+
+class RateTable:
+    """
+    Cached forex rates with local conversion.
+
+    **Params**
+
+    :api:: the :class:`equity_jenga.api.auth.JengaAPI` client
+    :countryCode:: the country the rates are requested for, e.g. KE
+    :currencies:: the currency codes passed to ``get_forex_rates``
+    :ttl:: seconds the rates are used before being refreshed
+    """
+
+    def __init__(self, api, countryCode, currencies=("USD",), ttl=300):
+        """Create RateTable object."""
+        self.api = api
+        self.countryCode = countryCode
+        self.currencies = tuple(currencies)
+        self.ttl = ttl
+        self.fetched_at = None
+        self._graph = {}  # currency -> {currency: units of it per unit of key}
+        self._cross = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def stale(self):
+        """True before the first refresh and once the rates are older than ttl."""
+        return self.fetched_at is None or time.monotonic() - self.fetched_at > self.ttl
+
+    def load(self, responses):
+        """Replace the table with the quotes from get_forex_rates responses."""
+        graph = {}
+        for response in responses:
+            for source, target, rate in _quotes(response):
+                # 1 target is worth rate source
+                graph.setdefault(target, {})[source] = rate
+                graph.setdefault(source, {})[target] = 1 / rate
+        with self._lock:
+            self._graph = graph
+            self._cross = {}
+            self.fetched_at = time.monotonic()
+
+    def refresh(self):
+        """Fetch fresh rates for every configured currency."""
+        self.load(
+            [
+                self.api.get_forex_rates(self.countryCode, currency)
+                for currency in self.currencies
+            ]
+        )
+
+    def rate(self, from_currency, to_currency) -> Decimal:
+        """
+        Return how many units of to_currency one unit of from_currency is
+        worth, deriving cross rates from the quoted pairs.
+        """
+        if self.stale and (self._thread is None or self.fetched_at is None):
+            self.refresh()
+        if from_currency == to_currency:
+            return Decimal(1)
+        key = (from_currency, to_currency)
+        cross = self._cross
+        if key in cross:
+            return cross[key]
+        graph = self._graph
+        found = {from_currency: Decimal(1)}
+        queue = deque([from_currency])
+        while queue and to_currency not in found:
+            currency = queue.popleft()
+            for neighbour, rate in graph.get(currency, {}).items():
+                if neighbour not in found:
+                    found[neighbour] = found[currency] * rate
+                    queue.append(neighbour)
+        if to_currency not in found:
+            raise KeyError("no rate from %s to %s" % key)
+        cross[key] = found[to_currency]
+        return found[to_currency]
+
+    def convert(self, amount, from_currency, to_currency, places=2) -> Decimal:
+        """Convert amount, rounded half up to places decimal places."""
+        value = Decimal(str(amount)) * self.rate(from_currency, to_currency)
+        return value.quantize(Decimal(1).scaleb(-places), rounding=ROUND_HALF_UP)
+
+    def convert_minor(self, amount, from_currency, to_currency) -> int:
+        """Convert an integer amount in minor units to minor units."""
+        value = Decimal(amount) * self.rate(from_currency, to_currency)
+        return int(value.to_integral_value(rounding=ROUND_HALF_UP))
+
+    def _run(self, stop):
+        wait = 0 if self.fetched_at is None else self.ttl
+        while not stop.wait(wait):
+            wait = self.ttl
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception(
+                    "refreshing %s forex rates failed, serving the last ones",
+                    self.countryCode,
+                )
+
+    def start(self):
+        """Refresh the rates every ttl seconds from a background thread."""
+        if self._thread is None:
+            # each thread gets its own event, so a restart never revives it
+            self._stop = threading.Event()
+            self._thread = threading.Thread(target=self._run, args=(self._stop,))
+            self._thread.daemon = True
+            self._thread.start()
+
+    def stop(self):
+        """Stop the background refresh."""
+        self._stop.set()
+        self._thread = None
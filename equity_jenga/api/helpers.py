@@ -5,13 +5,33 @@ def todaystr():
     return datetime.today().date().strftime("%Y-%m-%d")
 
 
-def token_expired(last_auth):
-    if datetime.now() - last_auth > timedelta(seconds=3000):
+TOKEN_LIFETIME = 3000
+
+
+def refresh_margin(expires_in, margin):
+    """
+    Return margin clamped to half the token lifetime, so that a token living
+    no longer than the margin is still used for half its life.
+    """
+    return min(margin, expires_in / 2)
+
+
+def token_expired(last_auth, expires_in=TOKEN_LIFETIME, margin=0):
+    margin = refresh_margin(expires_in, margin)
+    if datetime.now() - last_auth > timedelta(seconds=expires_in - margin):
         return True
     else:
         return False
 
 
+def token_lifetime(response):
+    """Return the lifetime in seconds of a token response's access token."""
+    try:
+        return int(float(response.get("expires_in")))
+    except (TypeError, ValueError):
+        return TOKEN_LIFETIME
+
+
 def timenow():
     return datetime.now()
 
@@ -0,0 +1,176 @@
+"""
+Call Instrumentation
+
+Hooks registered with :meth:`equity_jenga.api.auth.JengaAPI.add_hook` are
+called with a :class:`CallEvent` after every endpoint call, successful or
+not. An event carries the time in seconds spent in each phase of the call:
+
+:token:: getting the bearer token, including any refresh
+:sign:: signing the request
+:transport:: from handing the request to the transport to receiving the
+    response headers, as measured by :attr:`requests.Response.elapsed`:
+    connection setup when no pooled connection is free (DNS, TCP, TLS),
+    sending the request and the server's response time
+:read:: reading the response body
+:decode:: decoding and checking the response
+:total:: the whole call
+
+:class:`equity_jenga.api.aio.AsyncJengaAPI` reads the body along with the
+headers, its ``transport`` phase includes the body and it has no ``read``
+phase.
+
+When no hooks are registered calls are not timed at all.
+
+**Example**
+
+.. code-block:: python
+
+    from prometheus_client import Histogram
+    from equity_jenga.api.hooks import PrometheusHook
+
+    latency = Histogram(
+        "jenga_call_seconds", "Jenga call latency", ["endpoint", "status"]
+    )
+    phases = Histogram(
+        "jenga_call_phase_seconds", "Jenga call phases", ["endpoint", "phase"]
+    )
+    jengaApi.add_hook(PrometheusHook(latency, phases))
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+PHASES = ("token", "sign", "transport", "read", "decode")
+
+
+class CallEvent:
+    """
+    Timing and outcome of one endpoint call.
+
+    :endpoint:: name of the :class:`equity_jenga.api.auth.JengaAPI` method
+    :method:: HTTP method
+    :url:: request url
+    :status:: HTTP status code, None if no response was received
+    :response_code:: Jenga error code of a failed call
+    :error:: the exception raised by the call, if any
+    :timings:: ``dict`` of phase name to seconds
+    :start:: :func:`time.time` at the start of the call
+    """
+
+    __slots__ = (
+        "endpoint",
+        "method",
+        "url",
+        "status",
+        "response_code",
+        "error",
+        "timings",
+        "start",
+    )
+
+    def __init__(self, endpoint, method, url, start):
+        """Create CallEvent object."""
+        self.endpoint = endpoint
+        self.method = method
+        self.url = url
+        self.status = None
+        self.response_code = None
+        self.error = None
+        self.timings = {}
+        self.start = start
+
+    @property
+    def ok(self):
+        """True if the call returned a response without raising."""
+        return self.error is None
+
+    @property
+    def duration(self):
+        """Total seconds taken by the call."""
+        return self.timings.get("total", 0.0)
+
+    def __repr__(self):
+        return "CallEvent(endpoint={!r}, status={!r}, response_code={!r}, duration={:.4f})".format(
+            self.endpoint, self.status, self.response_code, self.duration
+        )
+
+
+def emit(hooks, event):
+    """Call each hook with event, logging rather than raising hook errors."""
+    for hook in hooks:
+        try:
+            hook(event)
+        except Exception:
+            logger.exception("JengaAPI hook %r failed", hook)
+
+
+class PrometheusHook:
+    """
+    Record calls in Prometheus style histograms.
+
+    **Params**
+
+    :latency:: histogram labelled ``endpoint`` and ``status`` observing the
+        total call duration
+    :phases:: optional histogram labelled ``endpoint`` and ``phase``
+        observing each phase
+    """
+
+    def __init__(self, latency, phases=None):
+        """Create PrometheusHook object."""
+        self.latency = latency
+        self.phases = phases
+
+    def __call__(self, event):
+        status = event.response_code or event.status or "error"
+        self.latency.labels(endpoint=event.endpoint, status=str(status)).observe(
+            event.duration
+        )
+        if self.phases is not None:
+            for phase in PHASES:
+                if phase in event.timings:
+                    self.phases.labels(endpoint=event.endpoint, phase=phase).observe(
+                        event.timings[phase]
+                    )
+
+
+class OpenTelemetryHook:
+    """
+    Record calls as OpenTelemetry spans, one per call with an event per
+    phase.
+
+    **Params**
+
+    :tracer:: an OpenTelemetry tracer, e.g.
+        ``opentelemetry.trace.get_tracer("equity_jenga")``
+    """
+
+    def __init__(self, tracer):
+        """Create OpenTelemetryHook object."""
+        self.tracer = tracer
+
+    def __call__(self, event):
+        start = int(event.start * 1e9)
+        attributes = {
+            "http.method": event.method,
+            "http.url": event.url,
+            "jenga.endpoint": event.endpoint,
+        }
+        if event.status is not None:
+            attributes["http.status_code"] = event.status
+        if event.response_code is not None:
+            attributes["jenga.response_code"] = str(event.response_code)
+        span = self.tracer.start_span(
+            "jenga." + event.endpoint, start_time=start, attributes=attributes
+        )
+        offset = start
+        for phase in PHASES:
+            if phase in event.timings:
+                offset += int(event.timings[phase] * 1e9)
+                span.add_event(
+                    phase, {"duration_s": event.timings[phase]}, timestamp=offset
+                )
+        if event.error is not None:
+            span.record_exception(event.error)
+        span.end(end_time=start + int(event.duration * 1e9))
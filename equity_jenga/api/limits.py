@@ -0,0 +1,366 @@
+"""
+Client Side Rate and Concurrency Limits
+
+A :class:`Governor` shapes the calls of
+:class:`equity_jenga.api.auth.JengaAPI` per endpoint family, the first
+segment of the endpoint path: ``identity`` (token requests), ``transaction``,
+``account`` or ``customer``. Each family can have
+
+- a request rate, enforced by a :class:`TokenBucket`, or by a
+  :class:`FileTokenBucket` shared by the processes on one host when the
+  governor is given a ``path``,
+- a concurrency limit, an :class:`AdaptiveLimit` of the calls in flight in
+  this process, that shrinks when calls fail with limit, throttling or
+  availability errors or exceed a target latency, and grows back by one
+  slot per limit of successful calls.
+
+Calls wait for their turn rather than failing, for no longer than the
+deadline in effect, see :mod:`equity_jenga.api.deadline`.
+
+**Example**
+
+.. code-block:: python
+
+    from equity_jenga.api.limits import Governor
+
+    jengaApi = api.auth.JengaAPI(
+        ...,
+        limits=Governor(
+            rates={"transaction": 10, "account": (50, 100)},
+            concurrency={"transaction": 8},
+            target_latency=2.0,
+            path="/run/jenga-limits",
+        ),
+    )
+"""
+
+import asyncio
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import deque
+from .deadline import current as current_deadline
+from .exceptions import DeadlineExceeded, LimitExceededError, is_retryable
+
+_STATE = struct.Struct("dd")  # tokens, time.time() of the last update
+
+
+def endpoint_family(url):
+    """Return the endpoint family of a Jenga url, e.g. ``transaction``."""
+    parts = url.split("://", 1)[-1].split("/", 2)
+    segment = parts[1] if len(parts) > 1 else ""
+    return segment[:-5] if segment.endswith("-test") else segment
+
+
+class TokenBucket:
+    """
+    Thread safe token bucket.
+
+    **Params**
+
+    :rate:: tokens added per second
+    :burst:: most tokens held, defaults to one second's worth
+    """
+
+    def __init__(self, rate, burst=None):
+        """Create TokenBucket object."""
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(rate, 1))
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self):
+        """
+        Take a token, returning 0, or return the seconds until one is
+        available without taking it.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / self.rate
+
+
+class FileTokenBucket(TokenBucket):
+    """
+    Token bucket shared by processes on one host through a memory mapped
+    file, updated under an exclusive :func:`fcntl.flock`.
+
+    **Params**
+
+    :path:: path of the bucket file, created if missing
+    :rate:: tokens added per second
+    :burst:: most tokens held, defaults to one second's worth
+    """
+
+    def __init__(self, path, rate, burst=None):
+        """Create FileTokenBucket object."""
+        super().__init__(rate, burst)
+        self.path = path
+        self._fd = None
+        self._mmap = None
+
+    def _map(self):
+        if self._mmap is None:
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            if os.fstat(self._fd).st_size < _STATE.size:
+                os.ftruncate(self._fd, _STATE.size)
+            self._mmap = mmap.mmap(self._fd, _STATE.size)
+        return self._mmap
+
+    def take(self):
+        """
+        Take a token, returning 0, or return the seconds until one is
+        available without taking it.
+        """
+        import fcntl
+
+        with self._lock:
+            mm = self._map()
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                tokens, updated = _STATE.unpack_from(mm)
+                now = time.time()
+                if updated == 0:
+                    tokens = self.burst
+                else:
+                    tokens = min(self.burst, tokens + max(now - updated, 0) * self.rate)
+                wait = 0
+                if tokens >= 1:
+                    tokens -= 1
+                else:
+                    wait = (1 - tokens) / self.rate
+                _STATE.pack_into(mm, 0, tokens, now)
+                return wait
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def close(self):
+        """Unmap and close the bucket file."""
+        with self._lock:
+            if self._mmap is not None:
+                self._mmap.close()
+                os.close(self._fd)
+                self._mmap = self._fd = None
+
+
+class AdaptiveLimit:
+    """
+    Concurrency limit adjusted by additive increase, multiplicative decrease.
+
+    **Params**
+
+    :maximum:: highest limit
+    :minimum:: lowest limit
+    :initial:: starting limit, defaults to maximum
+    :backoff:: factor the limit is multiplied by after an overload
+    :target_latency:: seconds above which a successful call also counts as
+        an overload, None to ignore latency
+    """
+
+    def __init__(
+        self, maximum, minimum=1, initial=None, backoff=0.7, target_latency=None
+    ):
+        """Create AdaptiveLimit object."""
+        self.maximum = maximum
+        self.minimum = minimum
+        self.limit = float(initial if initial is not None else maximum)
+        self.backoff = backoff
+        self.target_latency = target_latency
+        self.in_flight = 0
+        self._cond = threading.Condition()
+        self._waiters = deque()  # (loop, future) of coroutines awaiting a slot
+
+    def try_acquire(self):
+        """Take a slot if one is free, returning True if it was taken."""
+        with self._cond:
+            if self.in_flight >= int(self.limit):
+                return False
+            self.in_flight += 1
+            return True
+
+    def acquire(self, timeout=None):
+        """
+        Wait for a free slot and take it, returning False if none was freed
+        within timeout seconds.
+        """
+        with self._cond:
+            if not self._cond.wait_for(
+                lambda: self.in_flight < int(self.limit), timeout
+            ):
+                return False
+            self.in_flight += 1
+            return True
+
+    async def aacquire(self, timeout=None):
+        """:meth:`acquire` without blocking the event loop."""
+        loop = asyncio.get_running_loop()
+        end = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._cond:
+                if self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return True
+                waiter = loop.create_future()
+                self._waiters.append((loop, waiter))
+            try:
+                remaining = None if end is None else max(end - time.monotonic(), 0)
+                await asyncio.wait_for(waiter, remaining)
+            except asyncio.TimeoutError:
+                return False
+            finally:
+                with self._cond:
+                    if (loop, waiter) in self._waiters:
+                        self._waiters.remove((loop, waiter))
+
+    def _notify(self):
+        """Wake every waiter to check for a free slot, under the lock."""
+        self._cond.notify_all()
+        while self._waiters:
+            loop, waiter = self._waiters.popleft()
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(_wake, waiter)
+
+    def cancel(self):
+        """Free a slot whose call was never sent, leaving the limit as is."""
+        with self._cond:
+            self.in_flight -= 1
+            self._notify()
+
+    def release(self, latency, overloaded=False):
+        """Free a slot, adjusting the limit by the outcome of its call."""
+        with self._cond:
+            self.in_flight -= 1
+            if overloaded or (
+                self.target_latency is not None and latency > self.target_latency
+            ):
+                self.limit = max(self.minimum, self.limit * self.backoff)
+            else:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._notify()
+
+
+def _wake(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+def overloaded(error):
+    """True if a call failed in a way that calls for sending less."""
+    return error is not None and (
+        is_retryable(error) or isinstance(error, LimitExceededError)
+    )
+
+
+class Governor:
+    """
+    Rate and concurrency limits per endpoint family.
+
+    **Params**
+
+    :rates:: ``dict`` of family to requests per second, or to
+        ``(rate, burst)``
+    :concurrency:: ``dict`` of family to the most calls in flight
+    :target_latency:: seconds above which a call counts as an overload
+    :path:: directory of the rate bucket files shared between processes,
+        None to keep the buckets in memory
+
+    Families missing from rates or concurrency are not limited by them.
+    Only the rate buckets are shared through path, the concurrency limits
+    always count the calls of one process.
+    """
+
+    def __init__(self, rates=None, concurrency=None, target_latency=None, path=None):
+        """Create Governor object."""
+        self.path = path
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+        self.buckets = {}
+        for family, rate in (rates or {}).items():
+            rate, burst = rate if isinstance(rate, tuple) else (rate, None)
+            if path is None:
+                self.buckets[family] = TokenBucket(rate, burst)
+            else:
+                self.buckets[family] = FileTokenBucket(
+                    os.path.join(path, family + ".bucket"), rate, burst
+                )
+        self.limits = {
+            family: AdaptiveLimit(maximum, target_latency=target_latency)
+            for family, maximum in (concurrency or {}).items()
+        }
+
+    def acquire(self, url):
+        """
+        Wait until a call to url may be sent and return its family, raising
+        :class:`DeadlineExceeded` if the wait would outlast the deadline.
+        """
+        family = endpoint_family(url)
+        deadline = current_deadline()
+        limit = self.limits.get(family)
+        if limit is not None:
+            timeout = None if deadline is None else max(deadline.remaining(), 0)
+            if not limit.acquire(timeout):
+                raise DeadlineExceeded("limits", deadline.seconds)
+        bucket = self.buckets.get(family)
+        if bucket is not None:
+            try:
+                wait = bucket.take()
+                while wait:
+                    self._check(deadline, wait)
+                    time.sleep(wait)
+                    wait = bucket.take()
+            except BaseException:
+                if limit is not None:
+                    limit.cancel()
+                raise
+        return family
+
+    async def aacquire(self, url):
+        """:meth:`acquire` without blocking the event loop."""
+        family = endpoint_family(url)
+        deadline = current_deadline()
+        limit = self.limits.get(family)
+        if limit is not None:
+            timeout = None if deadline is None else max(deadline.remaining(), 0)
+            if not await limit.aacquire(timeout):
+                raise DeadlineExceeded("limits", deadline.seconds)
+        bucket = self.buckets.get(family)
+        if bucket is not None:
+            try:
+                wait = bucket.take()
+                while wait:
+                    self._check(deadline, wait)
+                    await asyncio.sleep(wait)
+                    wait = bucket.take()
+            except BaseException:
+                # cancelled or out of time while holding a slot
+                if limit is not None:
+                    limit.cancel()
+                raise
+        return family
+
+    @staticmethod
+    def _check(deadline, wait):
+        """Raise :class:`DeadlineExceeded` if waiting would outlast deadline."""
+        if deadline is not None and wait >= deadline.remaining():
+            raise DeadlineExceeded("limits", deadline.seconds)
+
+    def cancel(self, family):
+        """Free the slot of a call that was never sent or never completed."""
+        limit = self.limits.get(family)
+        if limit is not None:
+            limit.cancel()
+
+    def release(self, family, latency, error=None):
+        """Record the outcome of a call acquired by :meth:`acquire`."""
+        limit = self.limits.get(family)
+        if limit is not None:
+            limit.release(latency, overloaded(error))
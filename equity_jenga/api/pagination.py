@@ -0,0 +1,79 @@
+"""
+Paginated Listings
+
+:func:`iter_pages` walks a paginated endpoint such as
+:meth:`equity_jenga.api.auth.JengaAPI.get_all_billers` lazily, fetching the
+next ``window`` pages in the background while the current page is consumed
+and stopping at the first short or empty page.
+"""
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+def page_items(response, key):
+    """
+    Return the list of records in a page response, found under key or as
+    the response itself when the endpoint returns a bare list.
+    """
+    if isinstance(response, list):
+        return response
+    if not response:
+        return []
+    return response.get(key) or []
+
+
+def iter_pages(fetch_page, key, per_page=50, window=2):
+    """
+    Yield every record of a paginated listing.
+
+    **Params**
+
+    :fetch_page:: callable taking ``(page, per_page)`` and returning the
+        decoded response of that page, pages are numbered from 1
+    :key:: the response field holding the page's records
+    :per_page:: number of records requested per page
+    :window:: number of pages fetched ahead of the one being consumed
+    """
+    window = max(window, 1)
+    pending = deque()
+    page = 1
+    with ThreadPoolExecutor(max_workers=window + 1) as executor:
+        try:
+            while True:
+                # the current page and window pages ahead of it
+                while len(pending) < window + 1:
+                    pending.append(executor.submit(fetch_page, page, per_page))
+                    page += 1
+                records = page_items(pending.popleft().result(), key)
+                yield from records
+                if len(records) < per_page:
+                    return
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+async def aiter_pages(fetch_page, key, per_page=50, window=2):
+    """
+    Asynchronous :func:`iter_pages`, ``fetch_page`` returns an awaitable and
+    the next ``window`` pages are fetched as concurrent tasks.
+    """
+    import asyncio
+
+    window = max(window, 1)
+    pending = deque()
+    page = 1
+    try:
+        while True:
+            while len(pending) < window + 1:
+                pending.append(asyncio.ensure_future(fetch_page(page, per_page)))
+                page += 1
+            records = page_items(await pending.popleft(), key)
+            for record in records:
+                yield record
+            if len(records) < per_page:
+                return
+    finally:
+        for task in pending:
+            task.cancel()
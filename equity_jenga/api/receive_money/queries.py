@@ -1,5 +1,9 @@
-def all_eazzypay_merchants():
-    pass
+from ..directory import billers_directory, merchants_directory
+
+
+def all_eazzypay_merchants(api, ttl=3600, path=None):
+    """Return a cached, indexed directory of all EazzyPay merchants."""
+    return merchants_directory(api, ttl=ttl, path=path)
 
 
 def payment_status():
@@ -10,5 +14,6 @@ def transaction_details():
     pass
 
 
-def all_billers():
-    pass
+def all_billers(api, ttl=3600, path=None):
+    """Return a cached, indexed directory of all billers."""
+    return billers_directory(api, ttl=ttl, path=path)
@@ -0,0 +1,274 @@
+"""
+Transaction References
+
+Jenga rejects a reused transaction reference with ``400101 Duplicate
+Transaction``, so references handed out by :class:`ReferenceAllocator` are
+built as::
+
+    NN SSSSSSSSS C
+
+a 2 digit node id, a 9 digit sequence and a Luhn check digit, 12 digits in
+all. Sequence numbers are reserved in blocks from a counter file shared, under
+:func:`fcntl.flock`, by every process of the host, so references stay unique
+across worker processes and restarts. The counter file is
+``~/.JengaApi/references.counter`` unless ``JENGA_REFERENCE_COUNTER`` or the
+allocator's ``path`` names another. A counter that reaches the end of the
+sequence space raises :class:`ReferencesExhausted` rather than wrapping
+around.
+
+The node id tells hosts apart. It defaults to ``JENGA_NODE_ID``, or to a hash
+of the host name into 100 buckets, which can collide, so that two hosts hand
+out the same references. A warning is logged whenever the hash is used, and
+with ``JENGA_STRICT_NODE_ID=1`` (or ``strict=True``) the allocator refuses to
+start instead: give each host allocating references its own
+``JENGA_NODE_ID``, or point all of them at one counter file.
+
+Check uniqueness and throughput with
+
+.. code-block:: console
+
+    $ python -m equity_jenga.api.references
+"""
+
+import logging
+import os
+import socket
+import struct
+import threading
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+SEQUENCE_SPACE = 10**9
+
+
+class ReferencesExhausted(RuntimeError):
+    """Every sequence number of the counter file has been handed out."""
+
+
+def _luhn_table(doubled_first):
+    """Luhn contributions of 3 digit chunks, the rightmost digit first."""
+    table = []
+    for chunk in range(1000):
+        total = 0
+        doubled = doubled_first
+        for _ in range(3):
+            digit = chunk % 10
+            chunk //= 10
+            if doubled:
+                digit *= 2
+                if digit > 9:
+                    digit -= 9
+            total += digit
+            doubled = not doubled
+        table.append(total)
+    return table
+
+
+_DOUBLED_FIRST = _luhn_table(True)
+_PLAIN_FIRST = _luhn_table(False)
+
+
+def luhn_check_digit(payload: str) -> str:
+    """Return the Luhn check digit for a string of digits."""
+    total = 0
+    for position, char in enumerate(reversed(payload)):
+        digit = int(char)
+        if position % 2 == 0:
+            digit *= 2
+            if digit > 9:
+                digit -= 9
+        total += digit
+    return str(-total % 10)
+
+
+def is_valid_reference(reference: str) -> bool:
+    """Return True if reference is 12 digits with a valid check digit."""
+    return (
+        len(reference) == 12
+        and reference.isdigit()
+        and luhn_check_digit(reference[:-1]) == reference[-1]
+    )
+
+
+def default_node_id(strict=None):
+    """
+    Return ``JENGA_NODE_ID``, or a 2 digit hash of the host name, logging a
+    warning as two hosts may hash alike.
+
+    :strict:: raise :class:`RuntimeError` instead of hashing the host name,
+        defaults to whether ``JENGA_STRICT_NODE_ID`` is set to 1
+    """
+    node_id = os.environ.get("JENGA_NODE_ID")
+    if node_id:
+        return int(node_id)
+    if strict is None:
+        strict = os.environ.get("JENGA_STRICT_NODE_ID") == "1"
+    if strict:
+        raise RuntimeError(
+            "JENGA_NODE_ID is not set, give each host allocating references "
+            "its own node id between 0 and 99"
+        )
+    host = socket.gethostname()
+    node_id = zlib.crc32(host.encode("utf-8")) % 100
+    logger.warning(
+        "JENGA_NODE_ID is not set, using node id %02d hashed from host name %s; "
+        "hosts hashing alike hand out the same references",
+        node_id,
+        host,
+    )
+    return node_id
+
+
+def default_counter_path():
+    """Return ``JENGA_REFERENCE_COUNTER``, or the per user counter file."""
+    return os.environ.get("JENGA_REFERENCE_COUNTER") or os.path.join(
+        os.path.expanduser("~"), ".JengaApi", "references.counter"
+    )
+
+
+class _FileCounter:
+    """Block counter shared by processes through a locked file."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def take(self, count):
+        import fcntl
+
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            raw = os.pread(fd, 8, 0)
+            start = struct.unpack(">Q", raw)[0] if len(raw) == 8 else 0
+            if start + count > SEQUENCE_SPACE:
+                raise ReferencesExhausted(
+                    "reference counter %s is exhausted" % self.path
+                )
+            os.pwrite(fd, struct.pack(">Q", start + count), 0)
+            os.fsync(fd)
+            return start
+        finally:
+            os.close(fd)
+
+
+class ReferenceAllocator:
+    """
+    Thread safe allocator of unique 12 digit transaction references.
+
+    **Params**
+
+    :node_id:: 0-99, distinguishes hosts allocating references, see
+        :func:`default_node_id`
+    :path:: counter file shared by all processes on the host, see
+        :func:`default_counter_path`
+    :block_size:: number of sequence numbers reserved at a time
+    :strict:: without a node_id, require ``JENGA_NODE_ID``, see
+        :func:`default_node_id`
+    """
+
+    def __init__(self, node_id=None, path=None, block_size=1024, strict=None):
+        """Create ReferenceAllocator object."""
+        if node_id is None:
+            node_id = default_node_id(strict)
+        if not 0 <= node_id <= 99:
+            raise ValueError("node_id must be between 0 and 99")
+        if path is None:
+            path = default_counter_path()
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.node_id = node_id
+        self.pid = os.getpid()
+        self.path = path
+        self.block_size = block_size
+        self._counter = _FileCounter(path)
+        self._lock = threading.Lock()
+        self._next = 0
+        self._end = 0
+        node = "%02d" % node_id
+        self._node = node
+        # Luhn weight of the node digits, positions 10 and 11 from the right
+        self._node_sum = _PLAIN_FIRST[int(node)] - _PLAIN_FIRST[0]
+
+    def _format(self, sequence):
+        total = (
+            self._node_sum
+            + _DOUBLED_FIRST[sequence % 1000]
+            + _PLAIN_FIRST[sequence // 1000 % 1000]
+            + _DOUBLED_FIRST[sequence // 1000000]
+        )
+        return "%s%09d%d" % (self._node, sequence, -total % 10)
+
+    def _take(self, count):
+        """Return the first of count sequence numbers, caller holds the lock."""
+        if self.pid != os.getpid():
+            # a forked child must not hand out its parent's block
+            self.pid = os.getpid()
+            self._next = self._end = 0
+        if self._end - self._next < count:
+            if count > self.block_size:
+                return self._counter.take(count)
+            self._next = self._counter.take(self.block_size)
+            self._end = self._next + self.block_size
+        start = self._next
+        self._next += count
+        return start
+
+    def allocate(self) -> str:
+        """Return the next unique reference."""
+        with self._lock:
+            sequence = self._take(1)
+        return self._format(sequence)
+
+    __call__ = allocate
+
+    def reserve(self, count) -> list:
+        """Return a list of count unique references."""
+        with self._lock:
+            start = self._take(count)
+        return [self._format(sequence) for sequence in range(start, start + count)]
+
+
+def _allocate_many(path, threads, per_thread):
+    """Allocate references from threads of one process and return them all."""
+    allocator = ReferenceAllocator(path=path)
+    results = [None] * threads
+
+    def work(slot):
+        refs = [allocator.allocate() for _ in range(per_thread // 2)]
+        refs.extend(allocator.reserve(per_thread - len(refs)))
+        results[slot] = refs
+
+    workers = [threading.Thread(target=work, args=(i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return [ref for refs in results for ref in refs]
+
+
+def stress(processes=4, threads=4, per_thread=25000, restarts=1, path=None):
+    """
+    Allocate references from several threads of several processes, then
+    again from new processes as after a restart, check every one is unique
+    and valid and return the number of references allocated per second.
+    """
+    seen = set()
+    start = time.perf_counter()
+    for _ in range(restarts + 1):
+        with ProcessPoolExecutor(processes) as pool:
+            batches = [
+                pool.submit(_allocate_many, path, threads, per_thread)
+                for _ in range(processes)
+            ]
+            for batch in batches:
+                for ref in batch.result():
+                    if ref in seen or not is_valid_reference(ref):
+                        raise AssertionError("duplicate or invalid reference " + ref)
+                    seen.add(ref)
+    return len(seen) / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    print("%.0f unique references/s" % stress())
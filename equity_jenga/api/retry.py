@@ -0,0 +1,184 @@
+"""
+Retrying Failed Calls
+
+A :class:`RetryPolicy` decides whether a failed endpoint call of
+:class:`equity_jenga.api.auth.JengaAPI` is sent again and after how long.
+Failures are retried when :func:`equity_jenga.api.exceptions.is_retryable`
+says so, e.g. 401102 "Service Not available", 103108 "System Failure please
+retry" or a connection error, with exponential backoff and full jitter.
+
+- Idempotent endpoints, see :data:`IDEMPOTENT` and
+  :data:`equity_jenga.api.endpoints.ENDPOINTS`, are retried automatically.
+- Money moving endpoints (``send_money``, ``purchase_airtime``) are retried
+  only with the reference of the first attempt, the request is resent
+  unchanged so Jenga rejects it as a duplicate if an earlier attempt went
+  through. A :class:`equity_jenga.api.exceptions.DuplicateTransactionError`
+  raised by a retry therefore means the payment was made, confirm it with
+  :meth:`equity_jenga.api.auth.JengaAPI.get_transaction_status`.
+- Each endpoint has a retry budget: every call adds ``budget_ratio`` of a
+  retry to it, up to ``budget_reserve``, and every retry spends one, so an
+  outage cannot multiply the load on the API.
+- No retry is scheduled that would end after ``max_elapsed`` seconds from the
+  start of the call.
+
+**Example**
+
+.. code-block:: python
+
+    from equity_jenga.api.retry import RetryPolicy
+
+    jengaApi = api.auth.JengaAPI(
+        ...,
+        retry=RetryPolicy(max_attempts=4, max_elapsed=10, attempts={"send_money": 2}),
+    )
+"""
+
+import logging
+import random
+import threading
+from .endpoints import ENDPOINTS
+from .exceptions import is_retryable
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENT = frozenset(
+    name for name, endpoint in ENDPOINTS.items() if endpoint.idempotent
+)
+
+
+class RetryBudget:
+    """
+    Token bucket limiting retries to a share of calls.
+
+    **Params**
+
+    :ratio:: retries earned per call
+    :reserve:: most retries that can be saved up, also the starting amount
+    """
+
+    def __init__(self, ratio=0.2, reserve=10):
+        """Create RetryBudget object."""
+        self.ratio = ratio
+        self.reserve = reserve
+        self.tokens = float(reserve)
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        """Record a call."""
+        with self._lock:
+            self.tokens = min(self.reserve, self.tokens + self.ratio)
+
+    def withdraw(self):
+        """Spend a retry, returning False if none is left."""
+        with self._lock:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class RetryPolicy:
+    """
+    When and how often failed calls are retried.
+
+    **Params**
+
+    :max_attempts:: most attempts per call, including the first
+    :base_delay:: seconds of the first backoff, doubled for each retry
+    :max_delay:: longest backoff in seconds
+    :max_elapsed:: seconds after the start of a call past which it is not
+        retried
+    :attempts:: ``dict`` of endpoint name to max_attempts overriding it
+    :budget_ratio:: retries earned per call of an endpoint
+    :budget_reserve:: retries an endpoint can save up
+    :retry_payments:: retry money moving calls that carry a reference
+    :retry_on:: further exception classes to retry
+    """
+
+    def __init__(
+        self,
+        max_attempts=3,
+        base_delay=0.25,
+        max_delay=4.0,
+        max_elapsed=30.0,
+        attempts=None,
+        budget_ratio=0.2,
+        budget_reserve=10,
+        retry_payments=True,
+        retry_on=(),
+    ):
+        """Create RetryPolicy object."""
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_elapsed = max_elapsed
+        self.attempts = dict(attempts or {})
+        self.budget_ratio = budget_ratio
+        self.budget_reserve = budget_reserve
+        self.retry_payments = retry_payments
+        self.retry_on = tuple(retry_on)
+        self._budgets = {}
+        self._lock = threading.Lock()
+
+    def budget(self, endpoint):
+        """Return the :class:`RetryBudget` of an endpoint."""
+        budget = self._budgets.get(endpoint)
+        if budget is None:
+            with self._lock:
+                budget = self._budgets.setdefault(
+                    endpoint, RetryBudget(self.budget_ratio, self.budget_reserve)
+                )
+        return budget
+
+    def backoff(self, attempt):
+        """Return a jittered delay in seconds before retry number attempt."""
+        ceiling = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return random.uniform(0, ceiling)
+
+    def started(self, endpoint):
+        """Record the start of a call, earning retry budget."""
+        self.budget(endpoint).deposit()
+
+    def delay(self, endpoint, exc, attempt, elapsed, reference=None):
+        """
+        Return the seconds to wait before retrying a call that raised exc,
+        or None if it must not be retried.
+
+        :attempt:: number of the attempt that failed, starting at 1
+        :elapsed:: seconds since the start of the call
+        :reference:: transaction reference sent by a money moving call
+        """
+        if attempt >= self.attempts.get(endpoint, self.max_attempts):
+            return None
+        if not (is_retryable(exc) or isinstance(exc, self.retry_on)):
+            return None
+        if endpoint not in IDEMPOTENT and not (
+            self.retry_payments and reference is not None
+        ):
+            return None
+        delay = max(self.backoff(attempt), retry_after(exc))
+        if elapsed + delay > self.max_elapsed:
+            return None
+        if not self.budget(endpoint).withdraw():
+            logger.info("retry budget of %s exhausted", endpoint)
+            return None
+        logger.info(
+            "retrying %s in %.2fs after attempt %d failed: %s",
+            endpoint,
+            delay,
+            attempt,
+            exc,
+        )
+        return delay
+
+
+def retry_after(exc):
+    """Return the seconds of a Retry-After header on exc's response, or 0."""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return 0
+    try:
+        return max(float(headers.get("Retry-After") or 0), 0)
+    except ValueError:
+        return 0
@@ -1,4 +1,14 @@
-"""Send Money Module."""
+"""
+Send Money Module.
+
+The transfer models are slotted and immutable once created, and each caches
+its wire payload and signature fields the first time they are used. A
+:class:`TransferBatch` holds a whole batch column-wise and builds rows on
+demand.
+"""
+
+import functools
+
 TransferTypes = {
     "InternalFundsTransfer": "InternalFundsTransfer",
     "MobileWallet": "MobileWallet",
@@ -13,15 +23,100 @@ DestinationTypes = {
 }
 
 
-class Source:
+_UNSET = object()
+
+
+def cached(method):
+    """Cache the result of a model method on first call."""
+    name = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(self):
+        try:
+            cache = self._cache
+        except AttributeError:
+            cache = {}
+            object.__setattr__(self, "_cache", cache)
+        try:
+            return cache[name]
+        except KeyError:
+            value = cache[name] = method(self)
+            return value
+
+    return wrapper
+
+
+class Model:
+    """
+    Base of the send money models: slotted, and immutable once the
+    outermost ``__init__`` returns. The cached payloads are shared, so they
+    must not be modified.
+    """
+
+    __slots__ = ("_frozen", "_cache")
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        init = cls.__dict__.get("__init__")
+        if init is None:
+            return
+
+        @functools.wraps(init)
+        def __init__(self, *args, **kwargs):
+            outer = not hasattr(self, "_frozen")
+            if outer:
+                object.__setattr__(self, "_frozen", False)
+            init(self, *args, **kwargs)
+            if outer:
+                object.__setattr__(self, "_frozen", True)
+
+        cls.__init__ = __init__
+
+    def __setattr__(self, name, value):
+        if getattr(self, "_frozen", False):
+            raise AttributeError("{} objects are immutable".format(type(self).__name__))
+        object.__setattr__(self, name, value)
+
+    def __delattr__(self, name):
+        raise AttributeError("{} objects are immutable".format(type(self).__name__))
+
+    @classmethod
+    def fields(cls):
+        """Return the names of the data fields of the model."""
+        names = []
+        for klass in reversed(cls.__mro__):
+            for name in klass.__dict__.get("__slots__", ()):
+                if not name.startswith("_") and name not in names:
+                    names.append(name)
+        return tuple(names)
+
+    @classmethod
+    def from_fields(cls, values):
+        """Create a model from a ``dict`` of field values, unset ones skipped."""
+        self = cls.__new__(cls)
+        for name, value in values.items():
+            if value is not _UNSET:
+                object.__setattr__(self, name, value)
+        object.__setattr__(self, "_frozen", True)
+        return self
+
+    def field_values(self):
+        """Return a ``dict`` of the field values of the model."""
+        return {name: getattr(self, name, _UNSET) for name in self.fields()}
+
+
+class Source(Model):
     """Internal Funds Transfer Source."""
 
+    __slots__ = ("accountNumber", "name", "countryCode")
+
     def __init__(self, account_number, name, country_code="KE"):
         """Create Source object."""
         self.accountNumber = account_number
         self.name = name
         self.countryCode = country_code
 
+    @cached
     def to_json(self):
         """Convert to json."""
         return {
@@ -33,9 +128,11 @@ class Source:
         }
 
 
-class Dest:
+class Dest(Model):
     """Destination for send money."""
 
+    __slots__ = ("accountNumber", "name", "countryCode", "type")
+
     def __init__(self, account_number, name, country_code="KE", type="bank"):
         """Create Dest object."""
         self.accountNumber = account_number
@@ -43,10 +140,11 @@ class Dest:
         self.countryCode = country_code
         self.type = type
 
+    @cached
     def to_json(self):
         """Convert to json."""
         return {
-            "source": {
+            "destination": {
                 "countryCode": self.countryCode,
                 "name": self.name,
                 "accountNumber": self.accountNumber,
@@ -55,9 +153,11 @@ class Dest:
         }
 
 
-class Transfer:
+class Transfer(Model):
     """Funds Transfer."""
 
+    __slots__ = ("currencyCode", "amount", "reference", "date", "description", "type")
+
     def __init__(
         self,
         amount,
@@ -75,10 +175,11 @@ class Transfer:
         self.description = description
         self.type = type
 
+    @cached
     def to_json(self):
         """Convert to json."""
         return {
-            "source": {
+            "transfer": {
                 "currencyCode": self.currencyCode,
                 "reference": self.reference,
                 "date": self.date,
@@ -92,6 +193,8 @@ class Transfer:
 class PesalinkMobileDest(Dest):
     """PesalinkMobile Destination."""
 
+    __slots__ = ("mobileNumber", "bankCode")
+
     def __init__(self, mobile_number, name, bankCode, country_code="KE"):
         """Create Dest object."""
         self.mobileNumber = mobile_number
@@ -100,10 +203,11 @@ class PesalinkMobileDest(Dest):
         self.type = "mobile"
         self.bankCode = bankCode
 
+    @cached
     def to_json(self):
         """Convert to json."""
         return {
-            "source": {
+            "destination": {
                 "countryCode": self.countryCode,
                 "name": self.name,
                 "mobileNumber": self.mobileNumber,
@@ -116,6 +220,8 @@ class PesalinkMobileDest(Dest):
 class MobileDest(Dest):
     """Mobile Destination."""
 
+    __slots__ = ("mobileNumber", "walletName")
+
     def __init__(
         self,
         mobile_number,
@@ -130,10 +236,11 @@ class MobileDest(Dest):
         self.type = "mobile"
         self.walletName = walletName
 
+    @cached
     def to_json(self):
         """Convert to json."""
         return {
-            "source": {
+            "destination": {
                 "countryCode": self.countryCode,
                 "name": self.name,
                 "mobileNumber": self.mobileNumber,
@@ -146,6 +253,8 @@ class MobileDest(Dest):
 class PesalinkTransfer(Transfer):
     """Mobile Transfer."""
 
+    __slots__ = ()
+
     def __init__(
         self,
         amount,
@@ -167,6 +276,8 @@ class PesalinkTransfer(Transfer):
 class MobileTransfer(Transfer):
     """Mobile Transfer."""
 
+    __slots__ = ()
+
     def __init__(
         self,
         amount,
@@ -188,6 +299,8 @@ class MobileTransfer(Transfer):
 class EFTTransfer(Transfer):
     """EFT Transfer."""
 
+    __slots__ = ()
+
     def __init__(
         self,
         amount,
@@ -209,6 +322,8 @@ class EFTTransfer(Transfer):
 class SWIFTransfer(Transfer):
     """SWIFT Transfer."""
 
+    __slots__ = ("chargeOption",)
+
     def __init__(
         self,
         amount,
@@ -230,10 +345,11 @@ class SWIFTransfer(Transfer):
         )
         self.chargeOption = chargeOption
 
+    @cached
     def to_json(self):
         """Convert to json."""
         return {
-            "source": {
+            "transfer": {
                 "currencyCode": self.currencyCode,
                 "reference": self.reference,
                 "date": self.date,
@@ -248,6 +364,8 @@ class SWIFTransfer(Transfer):
 class RTGSDest(Dest):
     """RTGS Destination."""
 
+    __slots__ = ("bankCode",)
+
     def __init__(self, account_number, name, bankCode, country_code="KE"):
         """Create Dest object."""
         self.accountNumber = account_number
@@ -256,10 +374,11 @@ class RTGSDest(Dest):
         self.type = "bank"
         self.bankCode = bankCode
 
+    @cached
     def to_json(self):
         """Convert to json."""
         return {
-            "source": {
+            "destination": {
                 "countryCode": self.countryCode,
                 "name": self.name,
                 "accountNumber": self.accountNumber,
@@ -272,6 +391,8 @@ class RTGSDest(Dest):
 class EFTDest(Dest):
     """EFT Destination."""
 
+    __slots__ = ("bankCode", "branchCode")
+
     def __init__(
         self,
         account_number,
@@ -288,10 +409,11 @@ class EFTDest(Dest):
         self.bankCode = bankCode
         self.branchCode = branchCode
 
+    @cached
     def to_json(self):
         """Convert to json."""
         return {
-            "source": {
+            "destination": {
                 "countryCode": self.countryCode,
                 "name": self.name,
                 "accountNumber": self.accountNumber,
@@ -305,6 +427,8 @@ class EFTDest(Dest):
 class PesalinkDest(Dest):
     """Pesa Link Bank Account Destination."""
 
+    __slots__ = ("bankCode", "mobileNumber")
+
     def __init__(
         self,
         account_number,
@@ -321,10 +445,11 @@ class PesalinkDest(Dest):
         self.bankCode = bankCode
         self.mobileNumber = mobile_number
 
+    @cached
     def to_json(self):
         """Convert to json."""
         return {
-            "source": {
+            "destination": {
                 "countryCode": self.countryCode,
                 "name": self.name,
                 "accountNumber": self.accountNumber,
@@ -338,6 +463,8 @@ class PesalinkDest(Dest):
 class SWIFTDest(Dest):
     """SWIFT Destination."""
 
+    __slots__ = ("bankBic", "addressline1")
+
     def __init__(
         self,
         account_number,
@@ -354,10 +481,11 @@ class SWIFTDest(Dest):
         self.bankBic = bankBic
         self.addressline1 = addressline1
 
+    @cached
     def to_json(self):
         """Convert to json."""
         return {
-            "source": {
+            "destination": {
                 "countryCode": self.countryCode,
                 "name": self.name,
                 "accountNumber": self.accountNumber,
@@ -377,9 +505,13 @@ def transfer_payload(src: Source, dst: Dest, transfer: Transfer) -> dict:
     return payload
 
 
-class IFT:
+class IFT(Model):
     """Within Equity bank Funds Tranfer."""
 
+    __slots__ = ("source", "dest", "transfer")
+
+    product = "send_money"
+
     def __init__(self, source: Source, dest: Dest, transfer: Transfer):
         """Create IFT."""
         self.source = source
@@ -387,6 +519,7 @@ class IFT:
         self.transfer = transfer
 
     @property
+    @cached
     def body_payload(self):
         """Return Body Payload."""
         payload = {}
@@ -396,6 +529,7 @@ class IFT:
         return payload
 
     @property
+    @cached
     def sigkey(self):
         """Return text to generate signature."""
         return (
@@ -409,6 +543,10 @@ class IFT:
 class IFTMobile(IFT):
     """Within Equity to mobile funds transfer."""
 
+    __slots__ = ()
+
+    product = "mobile_wallet"
+
     def __init__(self, source: Source, dest: MobileDest, transfer: Transfer):
         """Create IFT."""
         self.source = source
@@ -416,6 +554,7 @@ class IFTMobile(IFT):
         self.transfer = transfer
 
     @property
+    @cached
     def sigkey(self):
         """Return text to generate signature."""
         if self.dest.walletName != "Equitel":
@@ -436,7 +575,12 @@ class IFTMobile(IFT):
 class RTGS(IFT):
     """RTGS Funds Transfer."""
 
+    __slots__ = ()
+
+    product = "rtgs"
+
     @property
+    @cached
     def sigkey(self):
         """Return text to generate signature."""
         return (
@@ -451,12 +595,14 @@ class RTGS(IFT):
 class SWIFT(RTGS):
     """SWIFT Funds Transfer."""
 
-    pass
+    __slots__ = ()
 
 
 class EFT(IFT):
     """EFT Funds Transfer."""
 
+    __slots__ = ()
+
     def __init__(self, source: Source, dest: EFTDest, transfer: Transfer):
         """Create IFT."""
         self.source = source
@@ -464,6 +610,7 @@ class EFT(IFT):
         self.transfer = transfer
 
     @property
+    @cached
     def sigkey(self):
         """Return text to generate signature."""
         return (
@@ -478,7 +625,12 @@ class EFT(IFT):
 class Pesalink(IFT):
     """Pesalink Funds Transfer."""
 
+    __slots__ = ()
+
+    product = "pesalink"
+
     @property
+    @cached
     def sigkey(self):
         """Return text to generate signature."""
         return (
@@ -488,3 +640,113 @@ class Pesalink(IFT):
             self.dest.name,
             self.source.accountNumber,
         )
+
+
+class TransferBatch:
+    """
+    A batch of transfers stored column-wise.
+
+    Each field of the source, destination and transfer models is kept in its
+    own list, with low cardinality strings such as currency codes, dates and
+    bank codes shared between rows. Rows are rebuilt as transfer objects on
+    demand, so their payloads only exist while they are being sent.
+
+    **Example**
+
+    .. code-block:: python
+
+        from equity_jenga.api.batch import send_batch
+        from equity_jenga.api.send_money import TransferBatch
+
+        batch = TransferBatch(payroll_transfers)
+        for result in send_batch(jengaApi, batch):
+            ...
+    """
+
+    PARTS = ("source", "dest", "transfer")
+    SHARED = frozenset(
+        (
+            "countryCode",
+            "type",
+            "currencyCode",
+            "date",
+            "bankCode",
+            "branchCode",
+            "bankBic",
+            "walletName",
+            "chargeOption",
+        )
+    )
+
+    def __init__(self, transfers=()):
+        """Create TransferBatch object."""
+        self._classes = {part: [] for part in ("kind",) + self.PARTS}
+        self._codes = {part: bytearray() for part in ("kind",) + self.PARTS}
+        self._columns = {part: {} for part in self.PARTS}
+        self._shared = {}
+        self._length = 0
+        for transfer in transfers:
+            self.append(transfer)
+
+    def _code(self, part, cls):
+        classes = self._classes[part]
+        if cls not in classes:
+            if len(classes) == 255:
+                raise ValueError("too many {} classes in a batch".format(part))
+            classes.append(cls)
+        self._codes[part].append(classes.index(cls))
+
+    def append(self, transfer):
+        """Add a transfer object, e.g. an :class:`IFT`, to the batch."""
+        self._code("kind", type(transfer))
+        for part in self.PARTS:
+            model = getattr(transfer, part)
+            self._code(part, type(model))
+            columns = self._columns[part]
+            values = model.field_values()
+            for name in values:
+                if name not in columns:
+                    columns[name] = [_UNSET] * self._length
+            for name, column in columns.items():
+                value = values.get(name, _UNSET)
+                if isinstance(value, str) and (part == "source" or name in self.SHARED):
+                    # keyed by type too, so equal values of another type stay apart
+                    value = self._shared.setdefault((type(value), value), value)
+                column.append(value)
+        self._length += 1
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        """Rebuild the transfer object of a row."""
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("transfer batch index out of range")
+        parts = {}
+        for part in self.PARTS:
+            cls = self._classes[part][self._codes[part][index]]
+            parts[part] = cls.from_fields(
+                {name: column[index] for name, column in self._columns[part].items()}
+            )
+        kind = self._classes["kind"][self._codes["kind"][index]]
+        return kind.from_fields(parts)
+
+    def __iter__(self):
+        for index in range(self._length):
+            yield self[index]
+
+    def payload(self, index):
+        """Return the request body of a row."""
+        return self[index].body_payload
+
+    def sigkey(self, index):
+        """Return the signature fields of a row."""
+        return self[index].sigkey
+
+    def column(self, part, name):
+        """Return the values of a field, e.g. ``column("transfer", "amount")``."""
+        return [
+            None if value is _UNSET else value for value in self._columns[part][name]
+        ]
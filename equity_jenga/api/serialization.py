@@ -0,0 +1,69 @@
+"""
+Request Body Serialization
+
+Endpoints that send ``Content-Type: application/json`` get their body encoded
+to JSON bytes once per call by :meth:`equity_jenga.api.auth.JengaAPI.encode`.
+The same bytes are sent again by every retry of the call, nested objects such
+as the ``customer`` of :meth:`equity_jenga.api.auth.JengaAPI.purchase_airtime`
+are kept intact, rather than form encoded by :mod:`requests`.
+
+:func:`dumps` uses :mod:`orjson` when it is installed (``pip install
+equity-jenga-api[fast]``), then :mod:`ujson`, then the standard library. Any
+callable taking a payload and returning bytes can be given to the client as
+its ``serializer``.
+
+**Example**
+
+.. code-block:: python
+
+    import json
+
+    jengaApi = api.auth.JengaAPI(
+        ...,
+        serializer=lambda payload: json.dumps(payload, sort_keys=True).encode(),
+    )
+"""
+
+import datetime
+import decimal
+import json
+
+
+def _default(value):
+    """Encode the values JSON has no type for the way Jenga expects them."""
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    raise TypeError(
+        "Object of type {} is not JSON serializable".format(type(value).__name__)
+    )
+
+
+def json_dumps(payload):
+    """Encode payload to compact UTF-8 JSON with the standard library."""
+    return json.dumps(
+        payload, default=_default, ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+try:
+    import orjson
+
+    def dumps(payload):
+        """Encode payload to UTF-8 JSON bytes with :mod:`orjson`."""
+        return orjson.dumps(payload, default=_default)
+
+except ImportError:
+    try:
+        import ujson
+
+        def dumps(payload):
+            """Encode payload to UTF-8 JSON bytes with :mod:`ujson`."""
+            try:
+                return ujson.dumps(payload, ensure_ascii=False).encode("utf-8")
+            except TypeError:
+                return json_dumps(payload)
+
+    except ImportError:
+        dumps = json_dumps
@@ -0,0 +1,231 @@
+"""
+Request Signing
+
+:class:`Signer` parses the merchant private key once and keeps the parsed key
+in memory, reloading it only when the PEM file's modification time changes.
+The key is parsed by a :mod:`equity_jenga.api.crypto` backend, and the
+signing function it returns is swapped in as a single tuple so concurrent
+callers always see a consistent key.
+
+:class:`SigningPool` fans batches of signatures out to worker processes, each
+parsing the key once when it starts, so signing is not limited to the one core
+the GIL allows a process. :meth:`equity_jenga.api.auth.JengaAPI.sign_batch`
+and :func:`equity_jenga.api.batch.send_batch` use the client's
+``signing_pool`` for batches of at least its ``min_batch`` signatures.
+
+.. code-block:: python
+
+    from equity_jenga.api.signer import SigningPool
+
+    jengaApi = api.auth.JengaAPI(..., signing_pool=SigningPool(private_key))
+    signatures = jengaApi.sign_batch([t.sigkey for t in transfers])
+
+Compare throughput against parsing the key on every call with
+
+.. code-block:: console
+
+    $ python -m equity_jenga.api.signer ~/.JengaApi/keys/privatekey.pem
+"""
+
+import base64
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from .crypto import get_backend
+
+
+class Signer:
+    """
+    Thread safe RSA SHA-256 signer for a PEM private key file.
+
+    **Params**
+
+    :private_key:: path to the merchant private key PEM file
+    :check_interval:: minimum number of seconds between checks of the key
+        file's modification time, ``0`` checks on every signature
+    :backend:: the :mod:`equity_jenga.api.crypto` backend or its name,
+        defaults to the first one installed
+    """
+
+    def __init__(self, private_key, check_interval=1.0, backend=None):
+        """Create Signer object."""
+        self.private_key = private_key
+        self.check_interval = check_interval
+        self.backend = get_backend(backend)
+        self._lock = threading.Lock()
+        self._state = None  # (mtime, signer)
+        self._checked = 0.0
+
+    def _load(self):
+        """Parse the key file and return a (mtime, signer) tuple."""
+        mtime = os.stat(self.private_key).st_mtime_ns
+        with open(self.private_key, "rb") as pk:
+            return mtime, self.backend.load_signer(pk.read())
+
+    def _signer(self):
+        """Return the current signer, reloading the key if it changed."""
+        state = self._state
+        now = time.monotonic()
+        if state is not None and now - self._checked < self.check_interval:
+            return state[1]
+        with self._lock:
+            state = self._state
+            if state is None or os.stat(self.private_key).st_mtime_ns != state[0]:
+                state = self._load()
+                self._state = state
+            self._checked = now
+        return state[1]
+
+    def reload(self):
+        """Force the key to be re-read from disk."""
+        with self._lock:
+            self._state = self._load()
+            self._checked = time.monotonic()
+
+    def sign(self, request_hash_fields: tuple) -> bytes:
+        """
+        Concatenate the request fields, hash them with SHA-256, sign the hash
+        and return the Base64 encoded signature.
+        """
+        data = "".join(map(str, request_hash_fields)).encode("utf-8")
+        return base64.b64encode(self._signer()(data))
+
+
+_worker_signer = None
+
+
+def _init_worker(private_key, backend):
+    """Parse the key once in a :class:`SigningPool` worker process."""
+    global _worker_signer
+    _worker_signer = Signer(private_key, backend=backend)
+    _worker_signer._signer()
+
+
+def _sign_chunk(sigkeys):
+    """Sign a chunk of sigkeys in a :class:`SigningPool` worker process."""
+    return [_worker_signer.sign(fields) for fields in sigkeys]
+
+
+class SigningPool:
+    """
+    Sign batches of request fields in a pool of processes.
+
+    **Params**
+
+    :private_key:: path to the merchant private key PEM file
+    :processes:: number of worker processes, defaults to the CPU count
+    :min_batch:: smallest batch the client hands to the pool, smaller ones
+        are signed in the calling thread
+    :chunksize:: most signatures sent to a worker at a time
+    :mp_context:: :mod:`multiprocessing` context of the workers
+    :backend:: name of the :mod:`equity_jenga.api.crypto` backend of the
+        workers, defaults to the first one installed
+
+    The workers are started on first use and stopped by :meth:`close`.
+    """
+
+    def __init__(
+        self,
+        private_key,
+        processes=None,
+        min_batch=64,
+        chunksize=256,
+        mp_context=None,
+        backend=None,
+    ):
+        """Create SigningPool object."""
+        self.private_key = private_key
+        self.backend = getattr(backend, "name", backend)
+        self.processes = processes or os.cpu_count() or 1
+        self.min_batch = min_batch
+        self.chunksize = chunksize
+        self.mp_context = mp_context
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.processes,
+                        mp_context=self.mp_context,
+                        initializer=_init_worker,
+                        initargs=(self.private_key, self.backend),
+                    )
+        return self._executor
+
+    def sign_many(self, sigkeys):
+        """
+        Sign a sequence of request field tuples, returning the Base64 encoded
+        signatures in the same order.
+        """
+        sigkeys = list(sigkeys)
+        if not sigkeys:
+            return []
+        size = min(self.chunksize, -(-len(sigkeys) // self.processes))
+        chunks = [sigkeys[i : i + size] for i in range(0, len(sigkeys), size)]
+        signatures = []
+        for signed in self._pool().map(_sign_chunk, chunks):
+            signatures.extend(signed)
+        return signatures
+
+    def close(self):
+        """Stop the worker processes."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _uncached_sign(private_key, request_hash_fields):
+    """Sign the way JengaAPI did before Signer, re-reading the key."""
+    data = "".join(request_hash_fields).encode("utf-8")
+    with open(private_key, "rb") as pk:
+        sign = get_backend().load_signer(pk.read())
+    return base64.b64encode(sign(data))
+
+
+def benchmark(private_key, rounds=200, processes=None):
+    """
+    Return signatures per second when parsing the key on every call
+    (``uncached``), with a :class:`Signer` (``cached``) and with a
+    :class:`SigningPool` of processes (``pool``).
+    """
+    fields = ("KE", "0011547896523", "2018-08-13")
+    results = {}
+    start = time.perf_counter()
+    for _ in range(rounds):
+        _uncached_sign(private_key, fields)
+    results["uncached"] = rounds / (time.perf_counter() - start)
+    signer = Signer(private_key)
+    signer.sign(fields)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        signer.sign(fields)
+    results["cached"] = rounds / (time.perf_counter() - start)
+    with SigningPool(private_key, processes) as pool:
+        pool.sign_many([fields] * pool.processes)
+        batch = [fields] * (rounds * pool.processes)
+        start = time.perf_counter()
+        pool.sign_many(batch)
+        results["pool"] = len(batch) / (time.perf_counter() - start)
+    return results
+
+
+if __name__ == "__main__":
+    key = (
+        sys.argv[1]
+        if len(sys.argv) > 1
+        else os.path.expanduser("~/.JengaApi/keys/privatekey.pem")
+    )
+    for name, rate in benchmark(key).items():
+        print(f"{name:>10}: {rate:10.1f} signatures/s")
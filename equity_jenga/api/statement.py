@@ -0,0 +1,277 @@
+"""
+Streaming Account Statements
+
+:func:`iter_statement` reads a long date range of
+:meth:`equity_jenga.api.auth.JengaAPI.get_account_full_statement` as a series
+of shorter windows fetched concurrently, and yields the transactions in date
+order without keeping the whole statement in memory. Transactions repeated
+across window boundaries are dropped using their ``reference``, ``serial``
+and ``postedDateTime``. A window that comes back with ``limit`` rows may be
+truncated, so it is split in two and fetched again. :func:`aiter_statement`
+does the same for an :class:`equity_jenga.api.aio.AsyncJengaAPI` client with
+concurrent tasks.
+
+**Example**
+
+.. code-block:: python
+
+    from equity_jenga.api.statement import iter_statement, write_csv
+
+    with open("2019.csv", "w", newline="") as fh:
+        write_csv(
+            iter_statement(jengaApi, "KE", "0011547896523", "2019-01-01", "2019-12-31"),
+            fh,
+        )
+"""
+
+import csv
+import json
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from .deadline import Deadline, bind, deadline as bounded
+
+logger = logging.getLogger(__name__)
+
+DATE_FORMAT = "%Y-%m-%d"
+
+CSV_FIELDS = (
+    "reference",
+    "date",
+    "description",
+    "amount",
+    "serial",
+    "postedDateTime",
+    "type",
+    "runningBalance.currency",
+    "runningBalance.amount",
+)
+
+
+def _parse(day):
+    if isinstance(day, date):
+        return day
+    return date(*map(int, day[:10].split("-")))
+
+
+def date_windows(fromDate, toDate, days=7):
+    """Split an inclusive date range into inclusive windows of days days."""
+    start, end = _parse(fromDate), _parse(toDate)
+    step = timedelta(days=max(days, 1))
+    windows = []
+    while start <= end:
+        stop = min(start + step - timedelta(days=1), end)
+        windows.append((start, stop))
+        start = stop + timedelta(days=1)
+    return windows
+
+
+def transaction_key(transaction):
+    """Return the fields identifying a transaction across windows."""
+    return (
+        str(transaction.get("reference")),
+        str(transaction.get("serial")),
+        transaction.get("postedDateTime"),
+    )
+
+
+def _sort_key(transaction):
+    return (
+        transaction.get("postedDateTime") or transaction.get("date") or "",
+        str(transaction.get("serial")),
+    )
+
+
+def _fetch_window(api, countryCode, accountNumber, start, stop, limit):
+    """Return the transactions of a window, splitting it if truncated."""
+    response = api.get_account_full_statement(
+        countryCode,
+        accountNumber,
+        start.strftime(DATE_FORMAT),
+        stop.strftime(DATE_FORMAT),
+        limit=limit,
+    )
+    transactions = (response or {}).get("transactions") or []
+    if len(transactions) < limit:
+        return transactions
+    if start == stop:
+        logger.warning(
+            "statement for %s may be truncated at %d transactions", start, limit
+        )
+        return transactions
+    middle = start + (stop - start) // 2
+    return _fetch_window(
+        api, countryCode, accountNumber, start, middle, limit
+    ) + _fetch_window(
+        api, countryCode, accountNumber, middle + timedelta(days=1), stop, limit
+    )
+
+
+async def _afetch_window(api, countryCode, accountNumber, start, stop, limit, budget):
+    """Asynchronous :func:`_fetch_window`, run under the budget if given."""
+    with bounded(None if budget is None else budget.remaining()):
+        response = await api.get_account_full_statement(
+            countryCode,
+            accountNumber,
+            start.strftime(DATE_FORMAT),
+            stop.strftime(DATE_FORMAT),
+            limit=limit,
+        )
+    transactions = (response or {}).get("transactions") or []
+    if len(transactions) < limit:
+        return transactions
+    if start == stop:
+        logger.warning(
+            "statement for %s may be truncated at %d transactions", start, limit
+        )
+        return transactions
+    middle = start + (stop - start) // 2
+    return await _afetch_window(
+        api, countryCode, accountNumber, start, middle, limit, budget
+    ) + await _afetch_window(
+        api, countryCode, accountNumber, middle + timedelta(days=1), stop, limit, budget
+    )
+
+
+def iter_statement(
+    api,
+    countryCode,
+    accountNumber,
+    fromDate,
+    toDate,
+    window_days=7,
+    limit=1000,
+    max_workers=4,
+    deadline=None,
+):
+    """
+    Yield every transaction of an account between two dates, in date order.
+
+    **Params**
+
+    :api:: the :class:`equity_jenga.api.auth.JengaAPI` client
+    :fromDate:: first day of the statement, ``YYYY-MM-DD``
+    :toDate:: last day of the statement, ``YYYY-MM-DD``
+    :window_days:: number of days fetched per request
+    :limit:: number of transactions requested per window
+    :max_workers:: number of windows fetched concurrently
+    :deadline:: seconds the whole statement may take, once spent the
+        iteration stops with
+        :class:`equity_jenga.api.exceptions.DeadlineExceeded`
+    """
+    windows = deque(date_windows(fromDate, toDate, window_days))
+    pending = deque()
+    previous = set()
+    budget = Deadline(deadline) if deadline is not None else None
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        try:
+            while windows or pending:
+                while windows and len(pending) < max_workers:
+                    if budget is not None:
+                        budget.check("statement")
+                    start, stop = windows.popleft()
+                    pending.append(
+                        executor.submit(
+                            bind(_fetch_window, budget),
+                            api,
+                            countryCode,
+                            accountNumber,
+                            start,
+                            stop,
+                            limit,
+                        )
+                    )
+                current = set()
+                for transaction in sorted(pending.popleft().result(), key=_sort_key):
+                    key = transaction_key(transaction)
+                    if key in previous or key in current:
+                        continue
+                    current.add(key)
+                    yield transaction
+                # only the neighbouring window can repeat a transaction
+                previous = current
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+async def aiter_statement(
+    api,
+    countryCode,
+    accountNumber,
+    fromDate,
+    toDate,
+    window_days=7,
+    limit=1000,
+    max_workers=4,
+    deadline=None,
+):
+    """
+    Asynchronous :func:`iter_statement` for an
+    :class:`equity_jenga.api.aio.AsyncJengaAPI` client, fetching up to
+    max_workers windows as concurrent tasks.
+    """
+    import asyncio
+
+    windows = deque(date_windows(fromDate, toDate, window_days))
+    pending = deque()
+    previous = set()
+    budget = Deadline(deadline) if deadline is not None else None
+    try:
+        while windows or pending:
+            while windows and len(pending) < max_workers:
+                if budget is not None:
+                    budget.check("statement")
+                start, stop = windows.popleft()
+                pending.append(
+                    asyncio.ensure_future(
+                        _afetch_window(
+                            api, countryCode, accountNumber, start, stop, limit, budget
+                        )
+                    )
+                )
+            current = set()
+            for transaction in sorted(await pending.popleft(), key=_sort_key):
+                key = transaction_key(transaction)
+                if key in previous or key in current:
+                    continue
+                current.add(key)
+                yield transaction
+            previous = current
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def flatten(transaction):
+    """Flatten nested fields such as ``runningBalance`` into dotted keys."""
+    flat = {}
+    for key, value in transaction.items():
+        if isinstance(value, dict):
+            for inner, item in value.items():
+                flat[key + "." + inner] = item
+        else:
+            flat[key] = value
+    return flat
+
+
+def write_csv(transactions, fh, fields=CSV_FIELDS):
+    """Write transactions to a CSV file object as they are produced."""
+    writer = csv.DictWriter(fh, fieldnames=list(fields), extrasaction="ignore")
+    writer.writeheader()
+    count = 0
+    for transaction in transactions:
+        writer.writerow(flatten(transaction))
+        count += 1
+    return count
+
+
+def write_ndjson(transactions, fh):
+    """Write transactions to a file object as newline delimited JSON."""
+    count = 0
+    for transaction in transactions:
+        fh.write(json.dumps(transaction))
+        fh.write("\n")
+        count += 1
+    return count
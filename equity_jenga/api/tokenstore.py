@@ -0,0 +1,245 @@
+"""
+Bearer Token Stores
+
+A token store lets several :class:`equity_jenga.api.auth.JengaAPI` clients,
+in one process or across worker processes, share one bearer token. Entries
+are ``dict`` objects with the ``token``, the ``issued_at`` epoch time and the
+``expires_in`` lifetime in seconds.
+
+Each store also provides :meth:`lock`, held by the single client elected to
+refresh the token while the others wait and then pick up the refreshed entry.
+Given a ``timeout`` in seconds, :meth:`lock` raises :class:`TimeoutError` if
+the lock is not taken in time.
+
+**Example**
+
+.. code-block:: python
+
+    from equity_jenga.api.auth import JengaAPI
+    from equity_jenga.api.tokenstore import FileTokenStore
+
+    jengaApi = JengaAPI(
+        api_key="Basic TofFGUeU9y448idLCKVAe35LmAtLU9y448idLCKVAe35LmAtL",
+        password="TofFGUeU9y448idLCKVAe35LmAtL",
+        merchant_code="4144142283",
+        token_store=FileTokenStore("/tmp/jenga-token"),
+    )
+"""
+
+import contextlib
+import json
+import mmap
+import os
+import threading
+import time
+import uuid
+
+# deletes a Redis lock only while it still holds the caller's owner token
+RELEASE_LOCK = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class MemoryTokenStore:
+    """Token store shared by clients within one process."""
+
+    def __init__(self):
+        """Create MemoryTokenStore object."""
+        self._entries = {}
+        self._locks = {}
+        self._guard = threading.Lock()
+
+    def get(self, key):
+        """Return the entry stored under key or None."""
+        return self._entries.get(key)
+
+    def set(self, key, entry):
+        """Store an entry under key."""
+        self._entries[key] = entry
+
+    @contextlib.contextmanager
+    def lock(self, key, timeout=None):
+        """Hold the refresh lock for key."""
+        with self._guard:
+            lock = self._locks.setdefault(key, threading.Lock())
+        if not lock.acquire(timeout=-1 if timeout is None else timeout):
+            raise TimeoutError("token refresh lock of {} not taken".format(key))
+        try:
+            yield
+        finally:
+            lock.release()
+
+
+class FileTokenStore:
+    """
+    Token store shared by processes on one host through a memory mapped file.
+
+    Reads take a shared :func:`fcntl.flock` on the file and writes an
+    exclusive one. The refresh lock is an exclusive lock on ``path + ".lock"``.
+
+    **Params**
+
+    :path:: path of the token file, created if missing
+    :size:: initial size in bytes of the mapped file, grown as needed
+    """
+
+    def __init__(self, path, size=4096):
+        """Create FileTokenStore object."""
+        self.path = path
+        self.size = size
+        self._fd = None
+        self._mmap = None
+        self._guard = threading.RLock()
+
+    def _map(self):
+        """Map the token file, remapping when another process resized it."""
+        if self._fd is None:
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        length = os.fstat(self._fd).st_size
+        if length == 0:
+            os.ftruncate(self._fd, self.size)
+            length = self.size
+        if self._mmap is None or len(self._mmap) != length:
+            if self._mmap is not None:
+                self._mmap.close()
+            self._mmap = mmap.mmap(self._fd, length)
+        return self._mmap
+
+    @contextlib.contextmanager
+    def _flock(self, operation):
+        import fcntl
+
+        with self._guard:
+            self._map()
+            fcntl.flock(self._fd, operation)
+            try:
+                yield self._map()
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _read(mm):
+        raw = mm[:].rstrip(b"\0")
+        return json.loads(raw) if raw else {}
+
+    def get(self, key):
+        """Return the entry stored under key or None."""
+        import fcntl
+
+        with self._flock(fcntl.LOCK_SH) as mm:
+            return self._read(mm).get(key)
+
+    def set(self, key, entry):
+        """Store an entry under key."""
+        import fcntl
+
+        with self._flock(fcntl.LOCK_EX) as mm:
+            entries = self._read(mm)
+            entries[key] = entry
+            raw = json.dumps(entries).encode("utf-8")
+            if len(raw) > len(mm):
+                os.ftruncate(self._fd, max(len(raw), 2 * len(mm)))
+                mm = self._map()
+            mm[:] = raw + b"\0" * (len(mm) - len(raw))
+            mm.flush()
+
+    @contextlib.contextmanager
+    def lock(self, key, timeout=None, poll_interval=0.01):
+        """Hold the refresh lock, an exclusive lock on ``path + ".lock"``."""
+        import fcntl
+
+        fd = os.open(self.path + ".lock", os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if timeout is None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            else:
+                give_up = time.monotonic() + timeout
+                while True:
+                    try:
+                        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        break
+                    except BlockingIOError:
+                        if time.monotonic() >= give_up:
+                            raise TimeoutError(
+                                "token refresh lock {}.lock not taken".format(self.path)
+                            ) from None
+                        time.sleep(poll_interval)
+            try:
+                yield
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+    def close(self):
+        """Unmap and close the token file."""
+        with self._guard:
+            if self._mmap is not None:
+                self._mmap.close()
+                self._mmap = None
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+
+class RedisTokenStore:
+    """
+    Token store shared through Redis.
+
+    Only ``get``, ``set(name, value, nx=, px=)`` and ``eval`` of
+    :data:`RELEASE_LOCK` are used on the client, so a :class:`redis.Redis`
+    instance or a local fake with the same methods will do.
+
+    **Params**
+
+    :client:: the Redis client
+    :prefix:: prefix of the keys used in Redis
+    :lock_timeout:: seconds after which a refresh lock held by a crashed
+        process expires
+    :poll_interval:: seconds between attempts to take the refresh lock
+    """
+
+    def __init__(
+        self, client, prefix="equity_jenga:token:", lock_timeout=30, poll_interval=0.05
+    ):
+        """Create RedisTokenStore object."""
+        self.client = client
+        self.prefix = prefix
+        self.lock_timeout = lock_timeout
+        self.poll_interval = poll_interval
+
+    def get(self, key):
+        """Return the entry stored under key or None."""
+        raw = self.client.get(self.prefix + key)
+        return json.loads(raw) if raw else None
+
+    def set(self, key, entry):
+        """Store an entry under key, expiring with the token."""
+        self.client.set(
+            self.prefix + key,
+            json.dumps(entry),
+            px=int(entry["expires_in"] * 1000),
+        )
+
+    @contextlib.contextmanager
+    def lock(self, key, timeout=None):
+        """
+        Hold the refresh lock, a ``SET NX PX`` key owned by this caller and
+        deleted on release only if it still is.
+        """
+        name = self.prefix + key + ":lock"
+        owner = uuid.uuid4().hex
+        give_up = None if timeout is None else time.monotonic() + timeout
+        while not self.client.set(
+            name, owner, nx=True, px=int(self.lock_timeout * 1000)
+        ):
+            if give_up is not None and time.monotonic() >= give_up:
+                raise TimeoutError("token refresh lock {} not taken".format(name))
+            time.sleep(self.poll_interval)
+        try:
+            yield
+        finally:
+            self.client.eval(RELEASE_LOCK, 1, name, owner)
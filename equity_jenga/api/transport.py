@@ -0,0 +1,99 @@
+"""
+HTTP Transport used by :class:`equity_jenga.api.auth.JengaAPI`
+
+A transport owns a :class:`requests.Session` whose connection pool keeps
+TCP/TLS connections to the Jenga hosts alive between calls, so that only the
+first request to a host pays for the handshake.
+
+**Example**
+
+.. code-block:: python
+
+    from equity_jenga.api.auth import JengaAPI
+    from equity_jenga.api.transport import Transport
+
+    transport = Transport(pool_maxsize=32, max_in_flight=16)
+    jengaApi = JengaAPI(
+        api_key="Basic TofFGUeU9y448idLCKVAe35LmAtLU9y448idLCKVAe35LmAtL",
+        password="TofFGUeU9y448idLCKVAe35LmAtL",
+        merchant_code="4144142283",
+        transport=transport,
+    )
+
+Any object exposing ``request(method, url, **kwargs)`` returning a
+``requests.Response`` like object can be used in place of :class:`Transport`,
+e.g. to point the client at a local stub server in tests.
+"""
+
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class Transport:
+    """
+    Keep-alive, pooled HTTP transport.
+
+    **Params**
+
+    :pool_connections:: number of per host connection pools to cache
+    :pool_maxsize:: maximum number of keep-alive connections kept per host
+    :pool_block:: block when the pool for a host is exhausted instead of
+        opening throw-away connections
+    :max_in_flight:: maximum number of requests outstanding on this transport
+        at once; HTTP/1.1 allows one request per connection at a time so this
+        bounds the requests queued onto the pooled connections. ``None``
+        leaves it unbounded.
+    :session:: an existing :class:`requests.Session` to use
+    """
+
+    def __init__(
+        self,
+        pool_connections=4,
+        pool_maxsize=10,
+        pool_block=False,
+        max_in_flight=None,
+        session=None,
+    ):
+        """Create Transport object."""
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.max_in_flight = max_in_flight
+        self.session = session if session is not None else requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        if max_in_flight:
+            self._in_flight = threading.BoundedSemaphore(max_in_flight)
+        else:
+            self._in_flight = None
+
+    def request(self, method, url, **kwargs):
+        """Send a request over the pooled session."""
+        if self._in_flight is None:
+            return self.session.request(method, url, **kwargs)
+        with self._in_flight:
+            return self.session.request(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        """Send a GET request."""
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        """Send a POST request."""
+        return self.request("POST", url, **kwargs)
+
+    def close(self):
+        """Close all pooled connections."""
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
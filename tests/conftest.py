@@ -0,0 +1,60 @@
+import pytest
+from equity_jenga.api.auth import JengaAPI
+from equity_jenga.api.retry import RetryPolicy
+from .stub import StubServer
+
+
+@pytest.fixture(autouse=True)
+def reference_counter(tmp_path, monkeypatch):
+    """Keep the reference counter of every test in its own directory."""
+    path = str(tmp_path / "references.counter")
+    monkeypatch.setenv("JENGA_REFERENCE_COUNTER", path)
+    monkeypatch.setattr("equity_jenga.api.exceptions._reference_allocator", None)
+    return path
+
+
+@pytest.fixture(scope="session")
+def private_key(tmp_path_factory):
+    """Path of a throwaway 2048 bit RSA private key."""
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    path = tmp_path_factory.mktemp("keys") / "privatekey.pem"
+    path.write_bytes(
+        key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.TraditionalOpenSSL,
+            serialization.NoEncryption(),
+        )
+    )
+    return str(path)
+
+
+@pytest.fixture
+def stub():
+    server = StubServer()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def make_api(stub, private_key):
+    """Return a factory of clients talking to the stub server."""
+    clients = []
+
+    def make(cls=JengaAPI, **kwargs):
+        kwargs.setdefault("retry", RetryPolicy(max_attempts=1))
+        api = cls(
+            "Basic key",
+            "password",
+            "4144142283",
+            env="production",
+            live_url=stub.url,
+            private_key=private_key,
+            **kwargs,
+        )
+        clients.append(api)
+        return api
+
+    return make
@@ -0,0 +1,55 @@
+"""In-memory stand-in for the Redis client used by RedisTokenStore."""
+
+import threading
+import time
+from equity_jenga.api.tokenstore import RELEASE_LOCK
+
+
+class FakeRedis:
+    """
+    The subset of :class:`redis.Redis` the token store uses: ``get``,
+    ``set`` with ``nx`` and ``px``, ``delete`` and ``eval`` of
+    :data:`equity_jenga.api.tokenstore.RELEASE_LOCK`. Values are returned as
+    ``bytes`` and expire after ``px`` milliseconds, as in Redis.
+    """
+
+    def __init__(self):
+        self._values = {}  # name -> (bytes, expires_at or None)
+        self._lock = threading.Lock()
+
+    def _live(self, name):
+        item = self._values.get(name)
+        if item is not None and item[1] is not None and time.monotonic() >= item[1]:
+            del self._values[name]
+            return None
+        return item
+
+    def get(self, name):
+        with self._lock:
+            item = self._live(name)
+            return item[0] if item is not None else None
+
+    def set(self, name, value, nx=False, px=None):
+        if isinstance(value, str):
+            value = value.encode()
+        with self._lock:
+            if nx and self._live(name) is not None:
+                return None
+            expires_at = time.monotonic() + px / 1000 if px is not None else None
+            self._values[name] = (value, expires_at)
+            return True
+
+    def delete(self, *names):
+        with self._lock:
+            return sum(self._values.pop(name, None) is not None for name in names)
+
+    def eval(self, script, numkeys, *args):
+        if script != RELEASE_LOCK or numkeys != 1:
+            raise NotImplementedError(script)
+        name, owner = args
+        with self._lock:
+            item = self._live(name)
+            if item is not None and item[0] == owner.encode():
+                del self._values[name]
+                return 1
+            return 0
@@ -0,0 +1,111 @@
+"""Local stub of the JengaHQ API for the tests."""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class Call:
+    """A request received by the stub."""
+
+    def __init__(self, method, path, headers, body):
+        self.method = method
+        self.path = path
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body)
+
+
+class StubServer:
+    """
+    Threaded HTTP server answering JengaHQ calls.
+
+    Token requests get a bearer token, other requests ``{"status":
+    "SUCCESS"}`` unless a handler is registered for their path with
+    :meth:`route`. A handler takes the :class:`Call` and returns a body, or a
+    ``(status, body)`` tuple; ``bytes`` bodies are sent as they are.
+    """
+
+    def __init__(self, expires_in=3599):
+        self.calls = []
+        self.routes = {}
+        self.expires_in = expires_in
+        self.released = threading.Event()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self.url = "http://127.0.0.1:%d" % self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def route(self, path, handler):
+        """Answer requests whose path starts with path with handler."""
+        self.routes[path] = handler
+
+    def hang(self, path, seconds=5):
+        """Never answer requests to path, until :meth:`close`."""
+
+        def handler(call):
+            self.released.wait(seconds)
+            return 504, {"message": "Gateway Timeout"}
+
+        self.route(path, handler)
+
+    def paths(self, prefix=""):
+        """Return the paths of the calls received, starting with prefix."""
+        with self._lock:
+            return [call.path for call in self.calls if call.path.startswith(prefix)]
+
+    def token_calls(self):
+        return len(self.paths("/identity"))
+
+    def _answer(self, call):
+        with self._lock:
+            self.calls.append(call)
+        for path, handler in self.routes.items():
+            if call.path.startswith(path):
+                return handler(call)
+        if call.path.endswith("/token"):
+            time.sleep(0.02)
+            return {"access_token": "tok", "expires_in": str(self.expires_in)}
+        return {"status": "SUCCESS"}
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _serve(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                call = Call(self.command, self.path, dict(self.headers), body)
+                try:
+                    answer = stub._answer(call)
+                except Exception as exc:
+                    answer = 500, {"message": str(exc)}
+                status, body = answer if isinstance(answer, tuple) else (200, answer)
+                raw = body if isinstance(body, bytes) else json.dumps(body).encode()
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(raw)))
+                    self.end_headers()
+                    self.wfile.write(raw)
+                except OSError:
+                    pass
+
+            do_GET = do_POST = _serve
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def close(self):
+        self.released.set()
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,166 @@
+import asyncio
+import threading
+from datetime import date, timedelta
+import pytest
+from equity_jenga.api.aio import AsyncJengaAPI
+from equity_jenga.api.batch import send_batch
+from equity_jenga.api.directory import billers_directory
+from equity_jenga.api.send_money import IFT, Dest, Source, Transfer
+from equity_jenga.api.tokenstore import MemoryTokenStore
+
+STATEMENT = "/account/v2/accounts/fullstatement"
+
+
+def statement(call):
+    """Answer a statement request with one transaction a day."""
+    payload = call.json()
+    day = date.fromisoformat(payload["fromDate"])
+    last = date.fromisoformat(payload["toDate"])
+    transactions = []
+    while day <= last:
+        transactions.append(
+            {
+                "reference": day.isoformat(),
+                "serial": 1,
+                "date": day.isoformat() + "T00:00:00.000",
+                "postedDateTime": day.isoformat() + "T09:00:00.000",
+                "amount": 1,
+                "type": "Credit",
+            }
+        )
+        day += timedelta(days=1)
+    return {"transactions": transactions}
+
+
+def run(make_api, main, **kwargs):
+    async def wrapper():
+        api = make_api(cls=AsyncJengaAPI, **kwargs)
+        try:
+            return await main(api)
+        finally:
+            await api.close()
+
+    return asyncio.run(wrapper())
+
+
+def test_full_statement_is_iterated_asynchronously(stub, make_api):
+    stub.route(STATEMENT, statement)
+
+    async def main(api):
+        iterator = api.iter_account_full_statement(
+            "KE", "1", "2019-01-01", "2019-01-31", window_days=7
+        )
+        return [transaction["reference"] async for transaction in iterator]
+
+    references = run(make_api, main)
+    assert references == [
+        (date(2019, 1, 1) + timedelta(days=n)).isoformat() for n in range(31)
+    ]
+    assert len(stub.paths(STATEMENT)) == 5
+
+
+def test_sign_batch_returns_a_coroutine_of_signatures(stub, make_api):
+    sigkeys = [("1", "KE"), ("2", "KE"), ("3", "UG")]
+
+    async def main(api):
+        return await api.sign_batch(sigkeys), [api.signature(s) for s in sigkeys]
+
+    batch, single = run(make_api, main)
+    assert batch == single
+
+
+def test_balance_ttl_coalesces_async_calls(stub, make_api):
+    async def main(api):
+        first = await asyncio.gather(
+            *(api.get_account_available_balance("KE", "1") for _ in range(5))
+        )
+        second = await api.get_account_available_balance("KE", "1")
+        return first, second
+
+    first, second = run(make_api, main, balance_ttl=60)
+    assert first == [{"status": "SUCCESS"}] * 5 and second == first[0]
+    assert len(stub.paths("/account")) == 1
+
+
+def test_background_refresh_runs_as_a_task(stub, make_api):
+    stub.expires_in = 2
+
+    async def main(api):
+        await api.get_account_available_balance("KE", "1")
+        assert isinstance(api._refresh_timer, asyncio.TimerHandle)
+        await asyncio.sleep(1.5)
+
+    run(make_api, main, background_refresh=True)
+    assert stub.token_calls() == 2
+
+
+def test_synchronous_helpers_refuse_an_async_client(stub, make_api):
+    async def main(api):
+        with pytest.raises(TypeError):
+            billers_directory(api)
+        with pytest.raises(TypeError):
+            list(send_batch(api, []))
+
+    run(make_api, main)
+
+
+def test_send_money_invalidates_the_balance_once_sent(stub, make_api):
+    sent = []
+
+    async def main(api):
+        await api.get_account_available_balance("KE", "0011547896523")
+        invalidate = api.balance_cache.invalidate
+
+        def recording(key):
+            sent.append(len(stub.paths("/transaction/v2/remittance")))
+            invalidate(key)
+
+        api.balance_cache.invalidate = recording
+        await api.send_money(
+            IFT(
+                Source("0011547896523", "John Doe"),
+                Dest("0060161911111", "Jane Doe"),
+                Transfer("10", "692194625798", "KES", "2019-01-01", "Rent"),
+            )
+        )
+
+    run(make_api, main, balance_ttl=60)
+    assert sent == [1]
+
+
+class ThreadRecordingStore(MemoryTokenStore):
+    """Memory store recording the threads reading and writing it."""
+
+    def __init__(self):
+        super().__init__()
+        self.threads = []
+
+    def get(self, key):
+        self.threads.append(threading.current_thread())
+        return super().get(key)
+
+    def set(self, key, entry):
+        self.threads.append(threading.current_thread())
+        super().set(key, entry)
+
+
+def test_blocking_store_and_reference_work_leaves_the_loop(stub, make_api, monkeypatch):
+    store = ThreadRecordingStore()
+    threads = []
+
+    def reference():
+        threads.append(threading.current_thread())
+        return "000000000001"
+
+    monkeypatch.setattr("equity_jenga.api.aio.generate_reference", reference)
+
+    async def main(api):
+        await api.purchase_airtime(
+            {"countryCode": "KE", "mobileNumber": "0765555131"},
+            {"amount": "100", "telco": "Equitel"},
+        )
+
+    run(make_api, main, token_store=store)
+    assert len(store.threads) >= 2 and threads
+    assert threading.main_thread() not in store.threads + threads
+    assert stub.paths("/transaction")
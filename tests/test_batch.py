@@ -0,0 +1,60 @@
+import random
+import time
+from equity_jenga.api.batch import send_batch
+from equity_jenga.api.send_money import IFT, Dest, Source, Transfer
+from equity_jenga.api.signer import SigningPool
+
+REMITTANCE = "/transaction/v2/remittance"
+
+
+def transfers(count):
+    for index in range(count):
+        yield IFT(
+            Source("0011547896523", "John Doe"),
+            Dest("0060161911111", "Jane Doe"),
+            Transfer(str(index + 1), "REF%06d" % index, "KES", "2019-01-01", "Pay"),
+        )
+
+
+def jittered(call):
+    """Answer after a random delay, rejecting transfers of 13 KES."""
+    time.sleep(random.uniform(0, 0.02))
+    if call.json()["transfer"]["amount"] == "13":
+        return 400, {"error": "x", "code": 401301, "message": "Invalid"}
+    return {"status": "SUCCESS", "reference": call.json()["transfer"]["reference"]}
+
+
+def test_ordered_batch_yields_results_in_input_order(stub, make_api):
+    stub.route(REMITTANCE, jittered)
+    results = list(send_batch(make_api(), transfers(40), max_workers=8, ordered=True))
+    assert [result.index for result in results] == list(range(40))
+    for result in results:
+        assert result.transfer.transfer.reference == "REF%06d" % result.index
+        if result.index == 12:
+            assert not result.ok and result.error_code == "401301"
+        else:
+            assert result.ok
+            assert result.response["reference"] == "REF%06d" % result.index
+
+
+def test_unordered_batch_yields_every_transfer_once(stub, make_api):
+    stub.route(REMITTANCE, jittered)
+    results = list(send_batch(make_api(), transfers(40), max_workers=8))
+    assert sorted(result.index for result in results) == list(range(40))
+    assert len(stub.paths(REMITTANCE)) == 40
+
+
+def test_signing_pool_signatures_follow_their_transfers(stub, make_api, private_key):
+    stub.route(REMITTANCE, jittered)
+    with SigningPool(private_key, processes=2, min_batch=8) as pool:
+        api = make_api(signing_pool=pool)
+        results = list(send_batch(api, transfers(24), max_workers=4, ordered=True))
+    assert [result.index for result in results] == list(range(24))
+    signatures = {
+        call.json()["transfer"]["reference"]: call.headers["signature"]
+        for call in stub.calls
+        if call.path == REMITTANCE
+    }
+    for transfer in transfers(24):
+        expected = api.signer.sign(transfer.sigkey).decode()
+        assert signatures[transfer.transfer.reference] == expected
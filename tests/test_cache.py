@@ -0,0 +1,118 @@
+import threading
+import time
+import pytest
+from equity_jenga.api.cache import CoalescingCache
+
+
+class Loader:
+    """An upstream that can be made slow or failing."""
+
+    def __init__(self, value="first"):
+        self.value = value
+        self.calls = 0
+        self.error = None
+        self.gate = threading.Event()
+        self.gate.set()
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            self.calls += 1
+        self.gate.wait(5)
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+def wait_for(condition, timeout=2):
+    end = time.monotonic() + timeout
+    while not condition() and time.monotonic() < end:
+        time.sleep(0.01)
+    assert condition()
+
+
+def test_concurrent_misses_share_one_load():
+    cache = CoalescingCache(ttl=60)
+    loader = Loader()
+    loader.gate.clear()
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get("KE", loader)))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    wait_for(lambda: loader.calls == 1)
+    time.sleep(0.05)
+    loader.gate.set()
+    for thread in threads:
+        thread.join(5)
+    assert results == ["first"] * 8
+    assert loader.calls == 1
+    assert cache.get("KE", loader) == "first" and loader.calls == 1
+
+
+def test_stale_value_is_served_while_revalidating():
+    cache = CoalescingCache(ttl=0.05, stale_ttl=60)
+    loader = Loader()
+    assert cache.get("KE", loader) == "first"
+    time.sleep(0.1)
+    loader.value = "second"
+    loader.gate.clear()
+    start = time.monotonic()
+    for _ in range(20):
+        assert cache.get("KE", loader) == "first"
+    assert time.monotonic() - start < 0.5
+    assert loader.calls == 2
+    loader.gate.set()
+    wait_for(lambda: cache.get("KE", loader) == "second")
+    assert loader.calls == 2
+
+
+def test_failed_revalidation_keeps_the_stale_value():
+    cache = CoalescingCache(ttl=0.05, stale_ttl=60)
+    loader = Loader()
+    cache.get("KE", loader)
+    time.sleep(0.1)
+    loader.error = ConnectionError("down")
+    assert cache.get("KE", loader) == "first"
+    wait_for(lambda: not cache._loading)
+    assert cache.get("KE", loader) == "first"
+
+
+def test_errors_are_raised_once_the_value_is_too_stale():
+    cache = CoalescingCache(ttl=0.05, stale_ttl=0.05)
+    loader = Loader()
+    cache.get("KE", loader)
+    time.sleep(0.15)
+    loader.error = ConnectionError("down")
+    with pytest.raises(ConnectionError):
+        cache.get("KE", loader)
+    assert loader.calls == 2
+    loader.error = None
+    loader.value = "second"
+    assert cache.get("KE", loader) == "second"
+
+
+def test_invalidate_forces_a_reload_and_discards_a_load_in_flight():
+    cache = CoalescingCache(ttl=60)
+    loader = Loader()
+    cache.get("KE", loader)
+    cache.invalidate("KE")
+    loader.value = "second"
+    assert cache.get("KE", loader) == "second"
+    assert loader.calls == 2
+
+    loader.gate.clear()
+    cache.invalidate("KE")
+    results = []
+    thread = threading.Thread(target=lambda: results.append(cache.get("KE", loader)))
+    thread.start()
+    wait_for(lambda: loader.calls == 3)
+    cache.invalidate("KE")
+    loader.gate.set()
+    thread.join(5)
+    assert results == ["second"]
+    loader.value = "third"
+    assert cache.get("KE", loader) == "third"
+    assert loader.calls == 4
@@ -0,0 +1,44 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+from equity_jenga.api.columnar import ColumnarStatement  # noqa: E402
+
+TRANSACTIONS = [
+    {
+        "date": "2019-01-01T00:00:00",
+        "postedDateTime": "2019-01-01T10:21:05.000",
+        "amount": "100.50",
+        "type": "Credit",
+        "runningBalance": {"amount": "100.50", "currency": "KES"},
+    },
+    {
+        "date": "2019-01-04T00:00:00",
+        "postedDateTime": "2019-01-04T08:00:00.000",
+        "amount": "20",
+        "type": "Debit",
+        "runningBalance": {"amount": "80.50", "currency": "KES"},
+    },
+]
+
+
+def test_to_pandas_wraps_the_arrays_without_copying():
+    statement = ColumnarStatement.from_transactions(TRANSACTIONS)
+    frame = statement.to_pandas()
+    for column in ("date", "posted", "amount", "running_balance"):
+        array = getattr(statement, column)
+        assert frame[column].dtype == array.dtype
+        assert np.shares_memory(frame[column].to_numpy(), array)
+
+
+def test_day_arithmetic_on_second_resolution_dates():
+    statement = ColumnarStatement.from_transactions(TRANSACTIONS)
+    days, totals = statement.sum_by_day()
+    assert list(days.astype("datetime64[D]").astype(str)) == [
+        "2019-01-01",
+        "2019-01-04",
+    ]
+    assert list(totals) == [10050, -2000]
+    after, before = statement.gaps(max_days=1)
+    assert list(after.astype("datetime64[D]").astype(str)) == ["2019-01-01"]
+    assert len(statement.verify_running_balance()) == 0
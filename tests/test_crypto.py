@@ -0,0 +1,24 @@
+import pytest
+from equity_jenga.api import crypto
+from equity_jenga.api.signer import Signer
+
+
+def test_incomplete_backend_fails_at_instantiation():
+    class Partial(crypto.Backend):
+        name = "partial"
+
+        @classmethod
+        def available(cls):
+            return True
+
+    with pytest.raises(TypeError):
+        Partial()
+    with pytest.raises(TypeError):
+        crypto.Backend()
+
+
+@pytest.mark.parametrize("name", crypto.available())
+def test_installed_backends_sign_alike(name, private_key):
+    fields = ("0011547896523", "KE", "1000")
+    expected = Signer(private_key, backend=crypto.available()[0]).sign(fields)
+    assert Signer(private_key, backend=name).sign(fields) == expected
@@ -0,0 +1,101 @@
+import threading
+import time
+import pytest
+import requests
+from equity_jenga.api.breaker import CircuitBreakers
+from equity_jenga.api.exceptions import CircuitOpenError, DeadlineExceeded
+from equity_jenga.api.limits import Governor
+from equity_jenga.api.tokenstore import FileTokenStore
+
+
+def balance(api):
+    return api.get_account_available_balance("KE", "0011547896523")
+
+
+def test_call_timeout_bounds_a_hung_request(stub, make_api):
+    stub.hang("/account")
+    api = make_api(call_timeout=0.3)
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        balance(api)
+    assert time.monotonic() - start < 2
+
+
+def test_timeouts_cut_short_by_the_deadline_spare_the_upstream(stub, make_api):
+    stub.hang("/account")
+    governor = Governor(concurrency={"account": 4})
+    api = make_api(
+        limits=governor,
+        call_timeout=0.2,
+        breakers=CircuitBreakers(failure_threshold=2, recovery_timeout=60),
+    )
+    for _ in range(3):
+        with pytest.raises(DeadlineExceeded):
+            balance(api)
+    assert api.breakers.states()["/account/v2"] == "closed"
+    assert governor.limits["account"].limit == 4
+    assert governor.limits["account"].in_flight == 0
+
+
+def test_full_read_timeouts_open_the_breaker(stub, make_api):
+    stub.hang("/account")
+    api = make_api(
+        timeout=(1, 0.2),
+        call_timeout=5,
+        breakers=CircuitBreakers(failure_threshold=2, recovery_timeout=60),
+    )
+    for _ in range(2):
+        with pytest.raises(requests.exceptions.Timeout):
+            balance(api)
+    assert api.breakers.states()["/account/v2"] == "open"
+    with pytest.raises(CircuitOpenError):
+        balance(api)
+
+
+def test_concurrency_wait_is_bounded_by_the_deadline(stub, make_api):
+    governor = Governor(concurrency={"account": 1})
+    api = make_api(limits=governor, call_timeout=0.3)
+    limit = governor.limits["account"]
+    assert limit.acquire()
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded) as raised:
+        balance(api)
+    assert raised.value.stage == "limits"
+    assert time.monotonic() - start < 1
+    assert limit.in_flight == 1
+    assert stub.paths("/account") == []
+
+
+def test_rate_wait_is_bounded_by_the_deadline(stub, make_api):
+    governor = Governor(rates={"account": (0.1, 1)}, concurrency={"account": 4})
+    api = make_api(limits=governor, call_timeout=1)
+    balance(api)
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        balance(api)
+    assert time.monotonic() - start < 0.5
+    assert governor.limits["account"].in_flight == 0
+
+
+def test_token_store_lock_is_bounded_by_the_deadline(stub, make_api, tmp_path):
+    store = FileTokenStore(str(tmp_path / "token"))
+    api = make_api(token_store=store, call_timeout=0.3)
+    held = threading.Event()
+    release = threading.Event()
+
+    def refresher():
+        with FileTokenStore(store.path).lock(api._token_key):
+            held.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=refresher)
+    thread.start()
+    held.wait(5)
+    try:
+        with pytest.raises(DeadlineExceeded) as raised:
+            balance(api)
+        assert raised.value.stage == "token"
+    finally:
+        release.set()
+        thread.join()
+    assert stub.token_calls() == 0
@@ -0,0 +1,69 @@
+import threading
+import time
+import pytest
+from equity_jenga.api.directory import Directory
+
+
+class Upstream:
+    """A catalogue that can be made slow or failing."""
+
+    def __init__(self, records):
+        self.records = records
+        self.crawls = 0
+        self.error = None
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def __call__(self):
+        self.crawls += 1
+        self.gate.wait(5)
+        if self.error is not None:
+            raise self.error
+        return list(self.records)
+
+
+def wait_for(condition, timeout=2):
+    end = time.monotonic() + timeout
+    while not condition() and time.monotonic() < end:
+        time.sleep(0.01)
+    assert condition()
+
+
+def test_stale_lookups_do_not_wait_for_the_refresh():
+    upstream = Upstream([{"code": "1", "name": "KPLC"}])
+    directory = Directory(upstream, "code", ttl=0.05)
+    assert directory.get("1")["name"] == "KPLC"
+    time.sleep(0.1)
+    upstream.records = [{"code": "1", "name": "Kenya Power"}]
+    upstream.gate.clear()
+    start = time.monotonic()
+    for _ in range(20):
+        assert directory.get("1")["name"] == "KPLC"
+    assert time.monotonic() - start < 0.5
+    assert upstream.crawls == 2
+    upstream.gate.set()
+    wait_for(lambda: directory.get("1")["name"] == "Kenya Power")
+
+
+def test_failed_refresh_serves_stale_records_and_backs_off():
+    upstream = Upstream([{"code": "1", "name": "KPLC"}])
+    directory = Directory(upstream, "code", ttl=0.05, retry_interval=60)
+    directory.get("1")
+    time.sleep(0.1)
+    upstream.error = ConnectionError("down")
+    assert directory.get("1")["name"] == "KPLC"
+    wait_for(lambda: directory.failures == 1)
+    for _ in range(20):
+        assert directory.get("1")["name"] == "KPLC"
+        assert directory.search("kp")
+    assert upstream.crawls == 2
+
+
+def test_empty_directory_raises_and_backs_off():
+    upstream = Upstream([])
+    upstream.error = ConnectionError("down")
+    directory = Directory(upstream, "code", retry_interval=60)
+    for _ in range(3):
+        with pytest.raises(ConnectionError):
+            directory.get("1")
+    assert upstream.crawls == 1
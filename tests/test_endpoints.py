@@ -0,0 +1,205 @@
+import pytest
+from equity_jenga.api.endpoints import ENDPOINTS, resolve
+from equity_jenga.api.send_money import IFT, Dest, Source, Transfer
+
+MERCHANT = "4144142283"
+
+# Method, live url and sandbox url of each endpoint as built by the JengaAPI
+# methods before the registry, for the path parameters "KE" and "1".
+BASELINE = {
+    "get_pesalink_linked_accounts": (
+        "POST",
+        "/transaction/v2/pesalink/inquire",
+        "/transaction-test/v2/pesalink/inquire",
+    ),
+    "get_transaction_status": (
+        "POST",
+        "/transaction/v2/b2c/status/query",
+        "/transaction-test/v2/b2c/status/query",
+    ),
+    "send_money": (
+        "POST",
+        "/transaction/v2/remittance",
+        "/transaction-test/v2/remittance",
+    ),
+    "get_all_eazzypay_merchants": (
+        "GET",
+        "/transaction/v2/merchants",
+        "/transaction-test/v2/merchants",
+    ),
+    "get_all_billers": (
+        "GET",
+        "/transaction/v2/billers",
+        "/transaction-test/v2/billers",
+    ),
+    "get_payment_status": (
+        "GET",
+        "/transaction/v2/payments/KE",
+        "/transaction-test/v2/payments/KE",
+    ),
+    "get_transaction_details": (
+        "GET",
+        "/transaction/v2/payments/details/KE",
+        "/transaction-test/v2/payments/details/KE",
+    ),
+    "purchase_airtime": (
+        "POST",
+        "/transaction/v2/airtime",
+        "/transaction-test/v2/airtime",
+    ),
+    "kyc_search_verify": (
+        "POST",
+        "/customer/v2/identity/verify",
+        "/customer-test/v2/identity/verify",
+    ),
+    "loans_credit_score": (
+        "POST",
+        "/customer/v2/creditinfo",
+        "/customer-test/v2/creditinfo",
+    ),
+    "get_forex_rates": (
+        "POST",
+        "/transaction/v2/foreignexchangerates",
+        "/transaction-test/v2/foreignexchangerates",
+    ),
+    "get_account_available_balance": (
+        "GET",
+        "/account/v2/accounts/balances/KE/1",
+        "/account-test/v2/accounts/balances/KE/1",
+    ),
+    "get_account_opening_and_closing_balance": (
+        "POST",
+        "/account/v2/accounts/accountbalance/query",
+        "/account-test/v2/accounts/accountbalance/query",
+    ),
+    "get_account_mini_statement": (
+        "GET",
+        "/account/v2/accounts/ministatement/KE/1",
+        "/account-test/v2/accounts/ministatement/KE/1",
+    ),
+    "get_account_full_statement": (
+        "POST",
+        "/account/v2/accounts/fullstatement/",
+        "/account-test/v2/accounts/fullstatement/",
+    ),
+}
+
+TRANSFER = IFT(
+    Source("0011547896523", "John Doe"),
+    Dest("0060161911111", "Jane Doe"),
+    Transfer("10", "692194625798", "KES", "2019-01-01", "Rent"),
+)
+
+# The call made to each endpoint, the fields the baseline method signed, in
+# order, and whether it sent a JSON Content-Type.
+CALLS = {
+    "get_pesalink_linked_accounts": (
+        lambda api: api.get_pesalink_linked_accounts("0765555131"),
+        None,
+        True,
+    ),
+    "get_transaction_status": (
+        lambda api: api.get_transaction_status("1", "2019-01-01"),
+        None,
+        True,
+    ),
+    "send_money": (lambda api: api.send_money(TRANSFER), TRANSFER.sigkey, True),
+    "get_all_eazzypay_merchants": (
+        lambda api: api.get_all_eazzypay_merchants(),
+        None,
+        False,
+    ),
+    "get_all_billers": (lambda api: api.get_all_billers(), None, False),
+    "get_payment_status": (lambda api: api.get_payment_status("KE"), None, False),
+    "get_transaction_details": (
+        lambda api: api.get_transaction_details("KE"),
+        None,
+        False,
+    ),
+    "purchase_airtime": (
+        lambda api: api.purchase_airtime(
+            {"countryCode": "KE", "mobileNumber": "0765555131"},
+            {"amount": "100", "telco": "Equitel"},
+        ),
+        (MERCHANT, "Equitel", "100", "000000000001"),
+        True,
+    ),
+    "kyc_search_verify": (
+        lambda api: api.kyc_search_verify(
+            {"documentNumber": "12365478", "countryCode": "KE"}
+        ),
+        (MERCHANT, "12365478", "KE"),
+        True,
+    ),
+    "loans_credit_score": (
+        lambda api: api.loans_credit_score(
+            [
+                {
+                    "dateOfBirth": "1999-01-31",
+                    "identityDocument": {"documentNumber": "12365478"},
+                }
+            ],
+            {"reportType": "Mobile", "countryCode": "KE"},
+            {"amount": "5000"},
+        ),
+        ("1999-01-31", MERCHANT, "12365478"),
+        True,
+    ),
+    "get_forex_rates": (lambda api: api.get_forex_rates("KE", "USD"), None, True),
+    "get_account_available_balance": (
+        lambda api: api.get_account_available_balance("KE", "1"),
+        ("KE", "1"),
+        False,
+    ),
+    "get_account_opening_and_closing_balance": (
+        lambda api: api.get_account_opening_and_closing_balance(
+            "1", "KE", "2019-01-01"
+        ),
+        ("1", "KE", "2019-01-01"),
+        False,
+    ),
+    "get_account_mini_statement": (
+        lambda api: api.get_account_mini_statement("KE", "1"),
+        ("KE", "1"),
+        True,
+    ),
+    "get_account_full_statement": (
+        lambda api: api.get_account_full_statement(
+            "KE", "1", "2019-01-01", "2019-01-31"
+        ),
+        ("1", "KE", "2019-01-31"),
+        True,
+    ),
+}
+
+
+def test_every_endpoint_has_a_baseline():
+    assert set(ENDPOINTS) == set(BASELINE) == set(CALLS)
+
+
+@pytest.mark.parametrize("name", sorted(BASELINE))
+def test_routes_match_the_baseline_urls(name):
+    method, live, sandbox = BASELINE[name]
+    live_route = resolve("https://api.jengahq.io")[name]
+    sandbox_route = resolve("https://sandbox.jengahq.io", sandbox=True)[name]
+    assert live_route.method == sandbox_route.method == method
+    assert live_route.url("KE", "1") == "https://api.jengahq.io" + live
+    assert sandbox_route.url("KE", "1") == "https://sandbox.jengahq.io" + sandbox
+
+
+@pytest.mark.parametrize("name", sorted(CALLS))
+def test_calls_sign_the_baseline_fields_in_order(name, stub, make_api, monkeypatch):
+    monkeypatch.setattr(
+        "equity_jenga.api.auth.generate_reference", lambda: "000000000001"
+    )
+    call, fields, json = CALLS[name]
+    api = make_api()
+    signed = []
+    api.signature = lambda values: signed.append(values) or "signature"
+    call(api)
+    assert signed == ([] if fields is None else [tuple(fields)])
+    method, live, sandbox = BASELINE[name]
+    request = stub.calls[-1]
+    assert (request.method, request.path.split("?")[0]) == (method, live)
+    content_type = request.headers.get("Content-Type")
+    assert (content_type == "application/json") == json
@@ -0,0 +1,41 @@
+import pytest
+from equity_jenga.api import exceptions
+from equity_jenga.api.exceptions import handle_response
+
+
+class Response:
+    def __init__(self, status_code, content):
+        self.status_code = status_code
+        self.content = content
+        self.headers = {}
+
+
+def test_success_body_is_returned():
+    assert handle_response(Response(200, b'{"balances": []}')) == {"balances": []}
+
+
+@pytest.mark.parametrize(
+    "status, body, exception",
+    [
+        (500, b'{"message": "Internal server error"}', "ServiceUnavailableError"),
+        (401, b'{"message": "Unauthorized"}', "AuthorizationError"),
+        (429, b'{"fault": {"faultstring": "Rate limit"}}', "RateLimitedError"),
+        (404, b"{}", "JengaError"),
+    ],
+)
+def test_non_2xx_json_body_raises_for_its_status(status, body, exception):
+    with pytest.raises(getattr(exceptions, exception)) as raised:
+        handle_response(Response(status, body))
+    assert raised.value.status_code == status
+    assert exceptions.is_retryable(raised.value) == (status in (429, 500))
+
+
+def test_error_envelope_wins_over_status():
+    body = b'{"response_status": "error", "response_code": 400101, "response_msg": "Duplicate Transaction"}'
+    with pytest.raises(exceptions.DuplicateTransactionError):
+        handle_response(Response(400, body), product="send_money")
+
+
+def test_undecodable_body_raises_response_error():
+    with pytest.raises(exceptions.JengaResponseError):
+        handle_response(Response(502, b"<html>Bad Gateway</html>"))
@@ -0,0 +1,79 @@
+import logging
+import time
+from decimal import Decimal
+from equity_jenga.api.forex import RateTable
+
+
+class Rates:
+    """Stand-in for JengaAPI.get_forex_rates, counting the calls."""
+
+    def __init__(self):
+        self.calls = 0
+        self.rate = 100
+        self.error = None
+
+    def get_forex_rates(self, countryCode, currencyCode):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return {"fromCurrency": "KES", "toCurrency": currencyCode, "rate": self.rate}
+
+
+def wait_for(condition, timeout=2):
+    end = time.monotonic() + timeout
+    while not condition() and time.monotonic() < end:
+        time.sleep(0.01)
+    assert condition()
+
+
+def test_first_rate_refreshes_the_table():
+    api = Rates()
+    table = RateTable(api, "KE", ("USD", "EUR"))
+    assert table.stale and api.calls == 0
+    assert table.rate("USD", "KES") == Decimal(100)
+    assert api.calls == 2 and not table.stale
+    table.rate("EUR", "USD")
+    assert api.calls == 2
+
+
+def test_rates_are_refreshed_once_stale():
+    api = Rates()
+    table = RateTable(api, "KE", ("USD",), ttl=0.05)
+    assert table.convert("2", "USD", "KES") == Decimal("200.00")
+    api.rate = 110
+    assert table.convert("2", "USD", "KES") == Decimal("200.00")
+    time.sleep(0.1)
+    assert table.stale
+    assert table.convert("2", "USD", "KES") == Decimal("220.00")
+    assert api.calls == 2
+
+
+def test_start_refreshes_in_the_background_until_stopped():
+    api = Rates()
+    table = RateTable(api, "KE", ("USD",), ttl=0.05)
+    table.start()
+    try:
+        wait_for(lambda: api.calls >= 3)
+    finally:
+        table.stop()
+    time.sleep(0.1)
+    calls = api.calls
+    time.sleep(0.15)
+    assert api.calls == calls
+    assert table.rate("USD", "KES") == Decimal(100)
+
+
+def test_failed_background_refresh_is_logged_and_keeps_the_rates(caplog):
+    api = Rates()
+    table = RateTable(api, "KE", ("USD",), ttl=0.05)
+    table.refresh()
+    api.error = ConnectionError("down")
+    with caplog.at_level(logging.ERROR, logger="equity_jenga.api.forex"):
+        table.start()
+        try:
+            wait_for(lambda: api.calls >= 3)
+            # the running refresh thread keeps the last rates in use
+            assert table.rate("USD", "KES") == Decimal(100)
+        finally:
+            table.stop()
+    assert "refreshing KE forex rates failed" in caplog.text
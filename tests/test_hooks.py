@@ -0,0 +1,30 @@
+import pytest
+from equity_jenga.api.exceptions import JengaError
+from equity_jenga.api.hooks import PHASES
+
+
+def test_hooks_get_the_phases_of_each_call(stub, make_api):
+    api = make_api()
+    events = []
+    api.add_hook(events.append)
+    api.get_account_available_balance("KE", "1")
+    (event,) = events
+    assert event.ok and event.status == 200
+    assert set(PHASES) <= set(event.timings)
+    assert all(event.timings[phase] >= 0 for phase in PHASES)
+    assert event.timings["transport"] > 0
+    assert event.duration >= sum(event.timings[phase] for phase in PHASES) * 0.99
+
+
+def test_hooks_get_the_error_code_of_failed_calls(stub, make_api):
+    stub.route(
+        "/account",
+        lambda call: (400, {"error": "x", "code": 401301, "message": "Invalid"}),
+    )
+    api = make_api()
+    events = []
+    api.add_hook(events.append)
+    with pytest.raises(JengaError):
+        api.get_account_available_balance("KE", "1")
+    assert events[0].response_code == "401301"
+    assert not events[0].ok
@@ -0,0 +1,135 @@
+import asyncio
+import threading
+import time
+import pytest
+from equity_jenga.api.aio import AsyncJengaAPI
+from equity_jenga.api.breaker import CircuitBreakers
+from equity_jenga.api.deadline import deadline
+from equity_jenga.api.exceptions import (
+    CircuitOpenError,
+    DeadlineExceeded,
+    ServiceUnavailableError,
+)
+from equity_jenga.api.limits import Governor
+
+BALANCE = "/account/v2/accounts/balances"
+
+
+def half_open_breakers(stub, api, call):
+    """Open the account circuit and let its recovery timeout pass."""
+    stub.route(BALANCE, lambda c: (503, {"message": "Service Unavailable"}))
+    with pytest.raises(ServiceUnavailableError):
+        call()
+    assert api.breakers.states()["/account/v2"] == "open"
+    time.sleep(0.1)
+    del stub.routes[BALANCE]
+
+
+def test_rate_limit_spaces_calls(stub, make_api):
+    api = make_api(limits=Governor(rates={"account": (20, 1)}))
+    start = time.monotonic()
+    for _ in range(6):
+        api.get_account_available_balance("KE", "1")
+    assert time.monotonic() - start >= 0.2
+
+
+def test_interrupted_call_gives_back_slot_and_probe(stub, make_api, monkeypatch):
+    governor = Governor(concurrency={"account": 1})
+    api = make_api(
+        limits=governor,
+        breakers=CircuitBreakers(failure_threshold=1, recovery_timeout=0.05),
+    )
+    half_open_breakers(stub, api, lambda: api.get_account_available_balance("KE", "1"))
+
+    def interrupted(*args, **kwargs):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(api, "_send", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        api.get_account_available_balance("KE", "1")
+    assert governor.limits["account"].in_flight == 0
+    monkeypatch.undo()
+    assert api.get_account_available_balance("KE", "1") == {"status": "SUCCESS"}
+    assert api.breakers.states()["/account/v2"] == "closed"
+
+
+def test_cancelled_async_call_gives_back_slot_and_probe(stub, make_api):
+    governor = Governor(concurrency={"account": 1})
+
+    async def main():
+        api = make_api(
+            cls=AsyncJengaAPI,
+            limits=governor,
+            breakers=CircuitBreakers(failure_threshold=1, recovery_timeout=0.05),
+        )
+        try:
+            stub.route(BALANCE, lambda c: (503, {"message": "Service Unavailable"}))
+            with pytest.raises(ServiceUnavailableError):
+                await api.get_account_available_balance("KE", "1")
+            await asyncio.sleep(0.1)
+            stub.hang(BALANCE)
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(
+                    api.get_account_available_balance("KE", "1"), 0.2
+                )
+            assert governor.limits["account"].in_flight == 0
+            del stub.routes[BALANCE]
+            result = await asyncio.wait_for(
+                api.get_account_available_balance("KE", "1"), 2
+            )
+            assert result == {"status": "SUCCESS"}
+            assert api.breakers.states()["/account/v2"] == "closed"
+        finally:
+            await api.close()
+
+    asyncio.run(main())
+
+
+def test_token_requests_use_the_identity_limits(stub, make_api):
+    governor = Governor(rates={"identity": (10, 1)})
+    start = time.monotonic()
+    for _ in range(3):
+        make_api(limits=governor).get_account_available_balance("KE", "1")
+    assert stub.token_calls() == 3
+    assert time.monotonic() - start >= 0.2
+
+
+def test_failing_token_requests_open_the_identity_breaker(stub, make_api):
+    stub.route("/identity", lambda c: (503, {"message": "Service Unavailable"}))
+    governor = Governor(concurrency={"account": 4})
+    api = make_api(
+        limits=governor,
+        breakers=CircuitBreakers(failure_threshold=2, recovery_timeout=60),
+    )
+    for _ in range(2):
+        with pytest.raises(ServiceUnavailableError):
+            api.get_account_available_balance("KE", "1")
+    assert api.breakers.states()["/identity/v2"] == "open"
+    assert api.breakers.states().get("/account/v2", "closed") == "closed"
+    assert governor.limits["account"].limit == 4
+    assert governor.limits["account"].in_flight == 0
+    with pytest.raises(CircuitOpenError):
+        api.get_account_available_balance("KE", "1")
+    assert stub.token_calls() == 2
+
+
+def test_async_waiters_sleep_until_a_slot_is_freed():
+    governor = Governor(concurrency={"account": 1})
+    limit = governor.limits["account"]
+    url = "https://api.jengahq.io/account/v2/accounts/balances/KE/1"
+
+    async def main():
+        governor.acquire(url)
+        waiter = asyncio.ensure_future(governor.aacquire(url))
+        await asyncio.sleep(0.05)
+        assert not waiter.done() and len(limit._waiters) == 1
+        freed = time.monotonic()
+        threading.Timer(0.05, governor.release, ("account", 0.01)).start()
+        assert await asyncio.wait_for(waiter, 2) == "account"
+        assert time.monotonic() - freed < 0.5
+        with deadline(0.05):
+            with pytest.raises(DeadlineExceeded):
+                await governor.aacquire(url)
+        assert not limit._waiters and limit.in_flight == 1
+
+    asyncio.run(main())
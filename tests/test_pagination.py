@@ -0,0 +1,97 @@
+import asyncio
+import threading
+import time
+from equity_jenga.api.pagination import aiter_pages, iter_pages
+
+
+class Listing:
+    """Paginated listing of total records, recording the pages fetched."""
+
+    def __init__(self, total, per_page=3):
+        self.total = total
+        self.per_page = per_page
+        self.fetched = []
+        self.done = []
+        self.released = threading.Event()
+        self.released.set()
+        self._lock = threading.Lock()
+
+    def page(self, page, per_page):
+        with self._lock:
+            self.fetched.append(page)
+        if page > 1:
+            self.released.wait(5)
+        first = (page - 1) * per_page
+        return {"billers": list(range(first, min(first + per_page, self.total)))}
+
+    async def apage(self, page, per_page):
+        self.fetched.append(page)
+        await asyncio.sleep(0.01 if page <= 2 else 1)
+        first = (page - 1) * per_page
+        self.done.append(page)
+        return {"billers": list(range(first, min(first + per_page, self.total)))}
+
+
+def wait_for(condition, timeout=2):
+    end = time.monotonic() + timeout
+    while not condition() and time.monotonic() < end:
+        time.sleep(0.01)
+    assert condition()
+
+
+def test_records_come_in_order_and_stop_at_the_short_page():
+    listing = Listing(10)
+    assert list(iter_pages(listing.page, "billers", per_page=3)) == list(range(10))
+    # page 4 is short, pages 5 and 6 were already in flight
+    assert sorted(listing.fetched) == [1, 2, 3, 4, 5, 6]
+
+
+def test_empty_page_ends_a_full_listing():
+    listing = Listing(6)
+    assert list(iter_pages(listing.page, "billers", per_page=3)) == list(range(6))
+
+
+def test_window_pages_are_fetched_ahead_of_the_current_one():
+    listing = Listing(30)
+    listing.released.clear()
+    records = iter_pages(listing.page, "billers", per_page=3, window=2)
+    assert next(records) == 0
+    wait_for(lambda: len(listing.fetched) == 3)
+    time.sleep(0.05)
+    assert sorted(listing.fetched) == [1, 2, 3]
+    listing.released.set()
+    records.close()
+
+
+def test_early_break_cancels_the_pages_ahead():
+    listing = Listing(300)
+    for record in iter_pages(listing.page, "billers", per_page=3, window=4):
+        if record == 4:
+            break
+    fetched = len(listing.fetched)
+    time.sleep(0.05)
+    assert fetched == len(listing.fetched) <= 6
+
+
+def test_async_pages_keep_window_pages_ahead_and_cancel_on_break():
+    listing = Listing(30)
+
+    async def main():
+        seen = []
+        pages = aiter_pages(listing.apage, "billers", per_page=3, window=2)
+        async for record in pages:
+            seen.append(record)
+            if record == 0:
+                assert sorted(listing.fetched) == [1, 2, 3]
+            if record == 4:
+                break
+        await pages.aclose()
+        await asyncio.sleep(0)
+        assert asyncio.all_tasks() == {asyncio.current_task()}
+        return seen
+
+    start = time.monotonic()
+    assert asyncio.run(main()) == [0, 1, 2, 3, 4]
+    assert time.monotonic() - start < 0.5
+    assert set(listing.fetched) <= {1, 2, 3, 4}
+    assert sorted(listing.done) == [1, 2]
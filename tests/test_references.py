@@ -0,0 +1,100 @@
+import logging
+import os
+import struct
+import pytest
+from concurrent.futures import ProcessPoolExecutor
+from equity_jenga.api import exceptions, references
+from equity_jenga.api.references import (
+    ReferenceAllocator,
+    ReferencesExhausted,
+    is_valid_reference,
+)
+
+
+def allocate(path, count):
+    allocator = ReferenceAllocator(node_id=7, path=path, block_size=64)
+    refs = [allocator.allocate() for _ in range(count // 2)]
+    return refs + allocator.reserve(count - len(refs))
+
+
+def assert_unique(batches):
+    seen = set()
+    for refs in batches:
+        for ref in refs:
+            assert is_valid_reference(ref), ref
+            assert ref not in seen, ref
+            seen.add(ref)
+    return seen
+
+
+def test_references_are_valid_and_unique_within_a_process(reference_counter):
+    allocator = ReferenceAllocator(path=reference_counter, block_size=16)
+    refs = [allocator.allocate() for _ in range(100)] + allocator.reserve(100)
+    assert len(assert_unique([refs])) == 200
+
+
+def test_processes_sharing_a_node_id_never_collide(reference_counter):
+    with ProcessPoolExecutor(4) as pool:
+        batches = list(pool.map(allocate, [reference_counter] * 8, [2000] * 8))
+    assert len(assert_unique(batches)) == 16000
+
+
+def test_restarted_process_does_not_reuse_references(reference_counter):
+    before = allocate(reference_counter, 5000)
+    with ProcessPoolExecutor(2) as pool:
+        after = list(pool.map(allocate, [reference_counter] * 2, [1000] * 2))
+    assert len(assert_unique([before] + after)) == 7000
+
+
+def test_forked_child_does_not_reuse_the_parent_block(reference_counter):
+    allocator = ReferenceAllocator(path=reference_counter, block_size=1024)
+    parent = [allocator.allocate()]
+    read, write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.write(write, ",".join(allocator.reserve(10)).encode())
+        os._exit(0)
+    os.waitpid(pid, 0)
+    child = os.read(read, 4096).decode().split(",")
+    parent += allocator.reserve(10)
+    assert_unique([parent, child])
+
+
+def test_counter_refuses_to_wrap_around(reference_counter):
+    with open(reference_counter, "wb") as fh:
+        fh.write(struct.pack(">Q", references.SEQUENCE_SPACE - 10))
+    allocator = ReferenceAllocator(path=reference_counter, block_size=8)
+    allocator.reserve(8)
+    with pytest.raises(ReferencesExhausted):
+        allocator.reserve(8)
+
+
+def test_generate_reference_uses_the_shared_counter(reference_counter):
+    refs = [exceptions.generate_reference() for _ in range(10)]
+    assert_unique([refs])
+    assert os.path.getsize(reference_counter) == 8
+
+
+def test_node_id_from_environment(monkeypatch):
+    monkeypatch.setenv("JENGA_NODE_ID", "42")
+    assert ReferenceAllocator().allocate().startswith("42")
+
+
+def test_hashed_node_id_is_warned_about(monkeypatch, caplog):
+    monkeypatch.delenv("JENGA_NODE_ID", raising=False)
+    monkeypatch.delenv("JENGA_STRICT_NODE_ID", raising=False)
+    with caplog.at_level(logging.WARNING, logger="equity_jenga.api.references"):
+        node_id = references.default_node_id()
+    assert 0 <= node_id <= 99
+    assert "JENGA_NODE_ID is not set" in caplog.text
+
+
+def test_strict_node_id_refuses_to_hash(monkeypatch):
+    monkeypatch.delenv("JENGA_NODE_ID", raising=False)
+    with pytest.raises(RuntimeError):
+        ReferenceAllocator(strict=True)
+    monkeypatch.setenv("JENGA_STRICT_NODE_ID", "1")
+    with pytest.raises(RuntimeError):
+        exceptions.generate_reference()
+    monkeypatch.setenv("JENGA_NODE_ID", "7")
+    assert exceptions.generate_reference().startswith("07")
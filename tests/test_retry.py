@@ -0,0 +1,69 @@
+import pytest
+from equity_jenga.api.exceptions import ServiceUnavailableError
+from equity_jenga.api.retry import RetryPolicy
+from equity_jenga.api.send_money import IFT, Dest, Source, Transfer
+
+REMITTANCE = "/transaction/v2/remittance"
+
+
+def flaky(failures):
+    """Handler failing with 503 the first failures times."""
+    calls = []
+
+    def handler(call):
+        calls.append(call)
+        if len(calls) <= failures:
+            return 503, {"message": "Service Unavailable"}
+        return {"status": "SUCCESS"}
+
+    return handler
+
+
+def transfer(reference):
+    return IFT(
+        Source("0011547896523", "John Doe"),
+        Dest("0060161911111", "Jane Doe"),
+        Transfer("10", reference, "KES", "2019-01-01", "Rent"),
+    )
+
+
+def retrying(**kwargs):
+    return RetryPolicy(max_attempts=3, base_delay=0.01, **kwargs)
+
+
+def test_idempotent_call_recovers_from_transient_failures(stub, make_api):
+    stub.route("/account", flaky(2))
+    api = make_api(retry=retrying())
+    assert api.get_account_available_balance("KE", "1") == {"status": "SUCCESS"}
+    assert len(stub.paths("/account")) == 3
+
+
+def test_retries_stop_at_max_attempts(stub, make_api):
+    stub.route("/account", flaky(5))
+    with pytest.raises(ServiceUnavailableError):
+        make_api(retry=retrying()).get_account_available_balance("KE", "1")
+    assert len(stub.paths("/account")) == 3
+
+
+def test_payment_is_resent_unchanged_with_its_reference(stub, make_api):
+    stub.route(REMITTANCE, flaky(1))
+    make_api(retry=retrying()).send_money(transfer("692194625798"))
+    first, second = [call for call in stub.calls if call.path == REMITTANCE]
+    assert first.body == second.body
+    assert first.headers["signature"] == second.headers["signature"]
+
+
+def test_payment_without_reference_is_not_retried(stub, make_api):
+    stub.route(REMITTANCE, flaky(1))
+    with pytest.raises(ServiceUnavailableError):
+        make_api(retry=retrying()).send_money(transfer(None))
+    assert len(stub.paths(REMITTANCE)) == 1
+
+
+def test_payment_retries_can_be_disabled(stub, make_api):
+    stub.route(REMITTANCE, flaky(1))
+    with pytest.raises(ServiceUnavailableError):
+        make_api(retry=retrying(retry_payments=False)).send_money(
+            transfer("692194625798")
+        )
+    assert len(stub.paths(REMITTANCE)) == 1
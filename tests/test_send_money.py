@@ -0,0 +1,103 @@
+import pytest
+from equity_jenga.api.send_money import (
+    EFT,
+    IFT,
+    RTGS,
+    Dest,
+    EFTDest,
+    IFTMobile,
+    MobileDest,
+    MobileTransfer,
+    RTGSDest,
+    Source,
+    Transfer,
+    TransferBatch,
+)
+
+
+def transfers():
+    source = Source("0011547896523", "John Doe")
+    yield IFT(
+        source,
+        Dest("0060161911111", "Jane Doe"),
+        Transfer("10", "000000000001", "KES", "2019-01-01", "Rent"),
+    )
+    yield IFTMobile(
+        source,
+        MobileDest("0722000000", "Jane Doe", walletName="Equitel"),
+        MobileTransfer("20", "000000000002", "KES", "2019-01-01", "Airtime"),
+    )
+    yield RTGS(
+        source,
+        RTGSDest("12365489", "Jane Doe", "70"),
+        Transfer("30", "000000000003", "KES", "2019-01-02", "Fees", type="RTGS"),
+    )
+    yield EFT(
+        Source("0011547896524", "John Doe"),
+        EFTDest("12365489", "Jane Doe", "01", "112"),
+        Transfer("40", "000000000004", "USD", "2019-01-02", "Fees", type="EFT"),
+    )
+
+
+@pytest.mark.parametrize("transfer", list(transfers()), ids=lambda t: type(t).__name__)
+def test_models_are_slotted_and_frozen(transfer):
+    for model in (transfer, transfer.source, transfer.dest, transfer.transfer):
+        assert not hasattr(model, "__dict__")
+        with pytest.raises(AttributeError):
+            model.name = "changed"
+        with pytest.raises(AttributeError):
+            del model.name
+    with pytest.raises(AttributeError):
+        transfer.source.accountNumber = "0"
+    assert transfer.source.accountNumber.startswith("00115")
+
+
+def test_cached_payloads_are_built_once():
+    transfer = next(transfers())
+    payload = transfer.body_payload
+    source = transfer.source.to_json()
+    with pytest.raises(AttributeError):
+        transfer.source.name = "changed"
+    assert transfer.body_payload is payload
+    assert transfer.source.to_json() is source
+    assert payload["source"]["name"] == "John Doe"
+    assert transfer.sigkey == ("0011547896523", "10", "KES", "000000000001")
+
+
+def test_batch_rows_round_trip_to_the_same_payloads():
+    originals = list(transfers())
+    batch = TransferBatch(originals)
+    assert len(batch) == len(originals)
+    for index, original in enumerate(originals):
+        row = batch[index]
+        assert type(row) is type(original)
+        assert batch.payload(index) == original.body_payload
+        assert batch.sigkey(index) == original.sigkey
+    assert batch.column("transfer", "currencyCode") == ["KES", "KES", "KES", "USD"]
+    assert batch[-1].transfer.reference == "000000000004"
+
+
+def test_batch_shares_equal_strings_only():
+    first = next(transfers())
+    second = IFT(
+        Source("".join(["0011547896523"]), "John Doe"),
+        Dest("0060161911111", "Jane Doe"),
+        Transfer("10", "000000000005", "".join(["K", "ES"]), "2019-01-01", "Rent"),
+    )
+    batch = TransferBatch([first, second])
+    assert batch[1].source.accountNumber is batch[0].source.accountNumber
+    assert batch[1].transfer.currencyCode is batch[0].transfer.currencyCode
+
+
+def test_batch_keeps_the_type_of_equal_values():
+    batch = TransferBatch(
+        IFT(
+            Source(account, "John Doe", country_code=country),
+            Dest("0060161911111", "Jane Doe"),
+            Transfer(1, "000000000001", "KES", "2019-01-01", "Rent"),
+        )
+        for account, country in ((1, "KE"), (True, "KE"), (1.0, ["KE"]))
+    )
+    accounts = batch.column("source", "accountNumber")
+    assert [type(account) for account in accounts] == [int, bool, float]
+    assert batch[2].source.countryCode == ["KE"]
@@ -0,0 +1,88 @@
+import datetime
+import decimal
+import importlib
+import json
+import sys
+import types
+import pytest
+from equity_jenga.api import serialization
+
+PAYLOAD = {
+    "customer": [{"countryCode": "KE", "name": "Wanjirũ"}],
+    "amount": decimal.Decimal("100.50"),
+    "date": datetime.date(2019, 1, 1),
+    "count": 3,
+}
+EXPECTED = {
+    "customer": [{"countryCode": "KE", "name": "Wanjirũ"}],
+    "amount": "100.50",
+    "date": "2019-01-01",
+    "count": 3,
+}
+
+
+def fake_module(name, calls):
+    """A stand-in JSON library recording its calls, failing like ujson."""
+    module = types.ModuleType(name)
+
+    def dumps(payload, **kwargs):
+        calls.append(name)
+        text = json.dumps(payload, default=kwargs.get("default"))
+        return text.encode() if name == "orjson" else text
+
+    module.dumps = dumps
+    return module
+
+
+@pytest.fixture
+def reload_with(monkeypatch):
+    """Reload serialization with the given JSON libraries importable."""
+
+    def reload(**modules):
+        for name in ("orjson", "ujson"):
+            monkeypatch.setitem(sys.modules, name, modules.get(name))
+        return importlib.reload(serialization)
+
+    yield reload
+    monkeypatch.undo()
+    importlib.reload(serialization)
+
+
+def test_orjson_is_preferred(reload_with):
+    calls = []
+    module = reload_with(
+        orjson=fake_module("orjson", calls), ujson=fake_module("ujson", calls)
+    )
+    assert json.loads(module.dumps(PAYLOAD)) == EXPECTED
+    assert calls == ["orjson"]
+
+
+def test_ujson_is_used_without_orjson(reload_with):
+    calls = []
+    module = reload_with(ujson=fake_module("ujson", calls))
+    assert module.dumps({"a": 1}) == b'{"a": 1}'
+    assert calls == ["ujson"]
+    # types ujson cannot encode fall back to the standard library
+    assert json.loads(module.dumps(PAYLOAD)) == EXPECTED
+    assert calls == ["ujson", "ujson"]
+
+
+def test_standard_library_is_the_last_resort(reload_with):
+    module = reload_with()
+    assert module.dumps is module.json_dumps
+    encoded = module.dumps(PAYLOAD)
+    assert isinstance(encoded, bytes)
+    assert json.loads(encoded) == EXPECTED
+    assert "Wanjirũ".encode() in encoded
+    assert b": " not in encoded and b", " not in encoded
+
+
+def test_installed_serializer_returns_bytes():
+    encoded = serialization.dumps(PAYLOAD)
+    assert isinstance(encoded, bytes)
+    assert json.loads(encoded) == EXPECTED
+
+
+def test_unknown_types_are_refused():
+    with pytest.raises(TypeError):
+        serialization.json_dumps({"value": object()})
@@ -0,0 +1,111 @@
+import io
+import json
+import threading
+from datetime import date, timedelta
+from equity_jenga.api.statement import (
+    CSV_FIELDS,
+    iter_statement,
+    write_csv,
+    write_ndjson,
+)
+
+
+def transaction(day, serial=1):
+    return {
+        "reference": "R%s" % day.strftime("%m%d"),
+        "serial": serial,
+        "date": day.isoformat() + "T00:00:00.000",
+        "postedDateTime": day.isoformat() + "T09:00:0%d.000" % serial,
+        "description": "Rent",
+        "amount": "10",
+        "type": "Debit",
+        "runningBalance": {"amount": "90", "currency": "KES"},
+    }
+
+
+class StatementAPI:
+    """
+    A client answering full statement requests from a list of transactions,
+    repeating the first day after each window as the live API may.
+    """
+
+    def __init__(self, transactions):
+        self.transactions = transactions
+        self.windows = []
+        self._lock = threading.Lock()
+
+    def get_account_full_statement(
+        self, countryCode, accountNumber, fromDate, toDate, limit=1000
+    ):
+        with self._lock:
+            self.windows.append((fromDate, toDate))
+        last = (date.fromisoformat(toDate) + timedelta(days=1)).isoformat()
+        rows = [
+            row for row in self.transactions if fromDate <= row["date"][:10] <= last
+        ]
+        # newest first, as the API answers
+        return {"transactions": rows[::-1][:limit]}
+
+
+def days(first, count):
+    return [date.fromisoformat(first) + timedelta(days=n) for n in range(count)]
+
+
+def test_transactions_come_in_order_without_window_repeats():
+    api = StatementAPI([transaction(day) for day in days("2019-01-01", 31)])
+    transactions = list(
+        iter_statement(api, "KE", "1", "2019-01-01", "2019-01-31", window_days=7)
+    )
+    assert [row["date"][:10] for row in transactions] == [
+        day.isoformat() for day in days("2019-01-01", 31)
+    ]
+    assert sorted(api.windows)[0] == ("2019-01-01", "2019-01-07")
+    assert len(api.windows) == 5
+
+
+def test_truncated_windows_are_split():
+    rows = [
+        transaction(day, serial) for day in days("2019-01-01", 4) for serial in (1, 2)
+    ]
+    api = StatementAPI(rows)
+    transactions = list(
+        iter_statement(
+            api, "KE", "1", "2019-01-01", "2019-01-04", window_days=4, limit=5
+        )
+    )
+    assert [(row["date"][:10], row["serial"]) for row in transactions] == [
+        (row["date"][:10], row["serial"]) for row in rows
+    ]
+    assert ("2019-01-01", "2019-01-04") in api.windows
+    assert ("2019-01-01", "2019-01-02") in api.windows
+
+
+def test_transactions_are_streamed_before_every_window_is_fetched():
+    api = StatementAPI([transaction(day) for day in days("2019-01-01", 70)])
+    iterator = iter_statement(
+        api, "KE", "1", "2019-01-01", "2019-03-11", window_days=7, max_workers=2
+    )
+    first = next(iterator)
+    assert first["date"].startswith("2019-01-01")
+    assert len(api.windows) <= 2
+    iterator.close()
+
+
+def test_write_csv_flattens_the_running_balance():
+    fh = io.StringIO()
+    rows = [transaction(date(2019, 1, 1)), transaction(date(2019, 1, 2), 2)]
+    assert write_csv(iter(rows), fh) == 2
+    assert fh.getvalue().splitlines() == [
+        ",".join(CSV_FIELDS),
+        "R0101,2019-01-01T00:00:00.000,Rent,10,1,2019-01-01T09:00:01.000,Debit,KES,90",
+        "R0102,2019-01-02T00:00:00.000,Rent,10,2,2019-01-02T09:00:02.000,Debit,KES,90",
+    ]
+
+
+def test_write_ndjson_writes_one_object_per_line():
+    fh = io.StringIO()
+    rows = [transaction(date(2019, 1, 1)), transaction(date(2019, 1, 2))]
+    assert write_ndjson(iter(rows), fh) == 2
+    lines = fh.getvalue().split("\n")
+    assert lines[-1] == ""
+    assert [json.loads(line) for line in lines[:-1]] == rows
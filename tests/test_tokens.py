@@ -0,0 +1,82 @@
+import asyncio
+import threading
+import pytest
+from equity_jenga.api.aio import AsyncJengaAPI
+from equity_jenga.api.tokenstore import FileTokenStore, MemoryTokenStore
+
+
+@pytest.fixture
+def file_store(tmp_path):
+    store = FileTokenStore(str(tmp_path / "token"))
+    yield store
+    store.close()
+
+
+def test_concurrent_calls_fetch_one_token(stub, make_api):
+    api = make_api()
+    barrier = threading.Barrier(8)
+
+    def call():
+        barrier.wait()
+        api.get_account_available_balance("KE", "1")
+
+    threads = [threading.Thread(target=call) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert stub.token_calls() == 1
+    assert len(stub.paths("/account")) == 8
+
+
+def test_clients_sharing_a_store_elect_one_refresher(stub, make_api, file_store):
+    clients = [make_api(token_store=file_store) for _ in range(6)]
+    barrier = threading.Barrier(len(clients))
+
+    def call(api):
+        barrier.wait()
+        api.get_account_available_balance("KE", "1")
+
+    threads = [threading.Thread(target=call, args=(api,)) for api in clients]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert stub.token_calls() == 1
+
+
+def test_async_clients_sharing_a_store_elect_one_refresher(stub, make_api, file_store):
+    async def main():
+        clients = [
+            make_api(cls=AsyncJengaAPI, token_store=file_store) for _ in range(6)
+        ]
+        try:
+            tokens = await asyncio.gather(
+                *(api.get_authorization_token() for api in clients)
+            )
+        finally:
+            for api in clients:
+                await api.close()
+        return tokens
+
+    assert asyncio.run(main()) == ["Bearer tok"] * 6
+    assert stub.token_calls() == 1
+
+
+def test_token_is_reused_until_the_refresh_margin(stub, make_api):
+    api = make_api(token_store=MemoryTokenStore())
+    for _ in range(5):
+        api.get_account_available_balance("KE", "1")
+    assert stub.token_calls() == 1
+
+
+def test_short_lived_token_is_not_refetched_on_every_call(stub, make_api):
+    stub.expires_in = 30
+    api = make_api(background_refresh=True)
+    try:
+        for _ in range(5):
+            api.get_account_available_balance("KE", "1")
+        assert stub.token_calls() == 1
+        assert api._refresh_timer.interval >= 14
+    finally:
+        api._refresh_timer.cancel()
@@ -0,0 +1,80 @@
+import threading
+import time
+import pytest
+from equity_jenga.api.tokenstore import RedisTokenStore
+from .fake_redis import FakeRedis
+
+ENTRY = {"token": "Bearer tok", "issued_at": 1500000000.5, "expires_in": 3599}
+
+
+@pytest.fixture
+def store():
+    return RedisTokenStore(FakeRedis(), lock_timeout=0.2, poll_interval=0.01)
+
+
+def test_entry_round_trips(store):
+    assert store.get("k") is None
+    store.set("k", ENTRY)
+    assert store.get("k") == ENTRY
+
+
+def test_entry_expires_with_the_token(store):
+    store.set("k", dict(ENTRY, expires_in=0.05))
+    time.sleep(0.1)
+    assert store.get("k") is None
+
+
+def test_lock_is_held_by_one_caller(store):
+    held = []
+    overlaps = []
+
+    def refresh():
+        with store.lock("k"):
+            held.append(1)
+            overlaps.append(len(held))
+            time.sleep(0.01)
+            held.pop()
+
+    threads = [threading.Thread(target=refresh) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert overlaps == [1] * 5
+
+
+def test_lock_wait_times_out(store):
+    with store.lock("k"):
+        start = time.monotonic()
+        with pytest.raises(TimeoutError):
+            with store.lock("k", timeout=0.05):
+                pass
+        assert time.monotonic() - start < 0.15
+
+
+def test_lock_of_a_crashed_holder_expires(store):
+    crashed = store.lock("k")
+    crashed.__enter__()
+    start = time.monotonic()
+    with store.lock("k", timeout=1):
+        assert time.monotonic() - start >= 0.15
+        # the late release of the expired holder leaves the new lock alone
+        crashed.__exit__(None, None, None)
+        assert store.client.get(store.prefix + "k:lock") is not None
+    assert store.client.get(store.prefix + "k:lock") is None
+
+
+def test_clients_sharing_redis_fetch_one_token(stub, make_api, store):
+    clients = [make_api(token_store=store) for _ in range(6)]
+    barrier = threading.Barrier(len(clients))
+
+    def call(api):
+        barrier.wait()
+        api.get_account_available_balance("KE", "1")
+
+    threads = [threading.Thread(target=call, args=(api,)) for api in clients]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert stub.token_calls() == 1
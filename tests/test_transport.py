@@ -0,0 +1,46 @@
+import base64
+import json
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import padding
+from equity_jenga.api.send_money import IFT, Dest, Source, Transfer
+
+
+def verify(private_key, signature, fields):
+    """Check a signature header against the key pair of private_key."""
+    with open(private_key, "rb") as fh:
+        key = serialization.load_pem_private_key(fh.read(), password=None)
+    key.public_key().verify(
+        base64.b64decode(signature),
+        "".join(map(str, fields)).encode(),
+        padding.PKCS1v15(),
+        hashes.SHA256(),
+    )
+
+
+def test_get_sends_token_and_signature(stub, make_api, private_key):
+    api = make_api()
+    assert api.get_account_available_balance("KE", "0011547896523") == {
+        "status": "SUCCESS"
+    }
+    token, call = stub.calls
+    assert token.path == "/identity/v2/token"
+    assert token.headers["Authorization"] == "Basic key"
+    assert call.method == "GET"
+    assert call.path == "/account/v2/accounts/balances/KE/0011547896523"
+    assert call.headers["Authorization"] == "Bearer tok"
+    verify(private_key, call.headers["signature"], ("KE", "0011547896523"))
+
+
+def test_post_sends_the_json_body(stub, make_api, private_key):
+    transfer = IFT(
+        Source("0011547896523", "John Doe"),
+        Dest("0060161911111", "Jane Doe"),
+        Transfer("10", "692194625798", "KES", "2019-01-01", "Rent"),
+    )
+    make_api().send_money(transfer)
+    call = stub.calls[-1]
+    assert call.method == "POST"
+    assert call.path == "/transaction/v2/remittance"
+    assert call.headers["Content-Type"] == "application/json"
+    assert json.loads(call.body) == transfer.body_payload
+    verify(private_key, call.headers["signature"], transfer.sigkey)